@@ -0,0 +1,74 @@
+"""
+Benchmark: per-`Character` attribute access vs. the columnar arrays.
+
+Runs the three operations from the layouts tutorial against a synthetic
+document, once walking the protobuf messages and once with `ColumnarLayouts`:
+
+    python bench_columnar.py [pages] [chars_per_page]
+"""
+
+import sys
+import time
+
+from columnar import ColumnarLayouts
+from synthetic import make_document
+
+
+def timed(label, fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f'   {label:<12} {best * 1000:10.2f} ms')
+    return best, result
+
+
+def main(pages=200, chars_per_page=3000):
+    doc = make_document(pages=pages, chars_per_page=chars_per_page)
+    print(f'{len(doc.pages)} pages, {len(doc.characters)} characters')
+
+    started = time.perf_counter()
+    columns = ColumnarLayouts.from_document(doc)
+    print(f'from_document: {(time.perf_counter() - started) * 1000:.2f} ms (paid once)\n')
+
+    def protobuf_text():
+        return "".join([chr(c.unicode) for c in doc.characters])
+
+    def protobuf_pages():
+        # The tutorial's get_page_number, applied to every character.
+        def get_page_number(char_loc):
+            for i, page in enumerate(doc.pages, 1):
+                if char_loc >= page.range.start and char_loc < page.range.end:
+                    return i
+            return None
+        return [get_page_number(i) for i in range(len(doc.characters))]
+
+    def protobuf_metadata():
+        return [(p.width, p.height, p.dpi_x, p.dpi_y, p.range.start, p.range.end)
+                for p in doc.pages]
+
+    def protobuf_bboxes():
+        return [(c.bounding_box.x1, c.bounding_box.y1,
+                 c.bounding_box.x2, c.bounding_box.y2) for c in doc.characters]
+
+    cases = [
+        ('text', protobuf_text, columns.text),
+        ('page number', protobuf_pages, columns.page_numbers),
+        ('metadata', protobuf_metadata, columns.page_metadata),
+        ('bboxes', protobuf_bboxes, lambda: columns.bboxes.copy()),
+    ]
+    for name, slow, fast in cases:
+        print(f'{name}:')
+        slow_time, slow_result = timed('protobuf', slow, repeat=1)
+        fast_time, fast_result = timed('columnar', fast)
+        print(f'   speedup      {slow_time / fast_time:10.1f}x')
+
+        if name == 'text':
+            assert slow_result == fast_result
+        elif name == 'page number':
+            assert list(fast_result) == slow_result
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
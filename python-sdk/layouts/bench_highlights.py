@@ -0,0 +1,72 @@
+"""
+Benchmark: character-by-character highlight rectangles vs. `span_rectangles`.
+
+Generates random spans over a synthetic document, the way a document with
+many extraction results looks, and merges them into per-line rectangles:
+
+    python bench_highlights.py [pages] [chars_per_page] [spans]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from columnar import ColumnarLayouts
+from highlights import span_rectangles
+from page_index import PageIndex
+from synthetic import make_document
+
+
+def by_hand(doc, spans):
+    """One character at a time, as done per extraction result before."""
+    index = PageIndex.from_document(doc)
+    rectangles = []
+    for span, (start, end) in enumerate(spans):
+        current = None
+        previous = None
+        for i in range(start, end):
+            box = doc.characters[i].bounding_box
+            page = index.page_of(i)
+            if (current is None or page != current[1] or box.x1 < previous.x1 or
+                    2 * (min(box.y2, previous.y2) - max(box.y1, previous.y1)) <
+                    min(box.y2 - box.y1, previous.y2 - previous.y1)):
+                current = [span, page, box.x1, box.y1, box.x2, box.y2]
+                rectangles.append(current)
+            else:
+                current[2] = min(current[2], box.x1)
+                current[3] = min(current[3], box.y1)
+                current[4] = max(current[4], box.x2)
+                current[5] = max(current[5], box.y2)
+            previous = box
+    return rectangles
+
+
+def main(pages=200, chars_per_page=3000, spans=20_000):
+    doc = make_document(pages=pages, chars_per_page=chars_per_page)
+    columns = ColumnarLayouts.from_document(doc)
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, columns.num_characters - 500, spans)
+    spans = np.stack([starts, starts + rng.integers(5, 500, spans)], axis=1)
+    print(f'{pages} pages, {columns.num_characters} characters, '
+          f'{len(spans)} spans covering {int((spans[:, 1] - spans[:, 0]).sum())} characters\n')
+
+    started = time.perf_counter()
+    expected = by_hand(doc, spans.tolist())
+    slow = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rectangles = span_rectangles(columns, spans, normalize=False)
+    fast = time.perf_counter() - started
+
+    got = [[int(r['span']), int(r['page']), int(r['x1']), int(r['y1']),
+            int(r['x2']), int(r['y2'])] for r in rectangles]
+    assert got == expected
+
+    print(f'character by character: {slow * 1000:10.2f} ms')
+    print(f'span_rectangles:        {fast * 1000:10.2f} ms ({slow / fast:.0f}x), '
+          f'{len(rectangles)} rectangles')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
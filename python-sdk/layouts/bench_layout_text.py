@@ -0,0 +1,51 @@
+"""
+Benchmark: `"".join([chr(c.unicode) ...])` vs. `LayoutText`.
+
+    python bench_layout_text.py [pages] [chars_per_page]
+"""
+
+import sys
+import time
+
+from columnar import ColumnarLayouts
+from layout_text import LayoutText
+from synthetic import make_document
+
+
+def main(pages=300, chars_per_page=3000):
+    doc = make_document(pages=pages, chars_per_page=chars_per_page)
+    columns = ColumnarLayouts.from_document(doc)
+    print(f'{pages} pages, {columns.num_characters} characters\n')
+
+    started = time.perf_counter()
+    joined = "".join([chr(c.unicode) for c in doc.characters])
+    slow = time.perf_counter() - started
+
+    started = time.perf_counter()
+    text = LayoutText(columns).text
+    fast = time.perf_counter() - started
+    assert text == joined
+
+    started = time.perf_counter()
+    separated = LayoutText(columns, page_separator='\n\n')
+    separated.text
+    mapped = time.perf_counter() - started
+
+    started = time.perf_counter()
+    LayoutText(columns).page(pages // 2)
+    one_page = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matches = separated.find_all('governing law')
+    search = time.perf_counter() - started
+    assert all(columns.text(start, end) == 'governing law' for start, end in matches)
+
+    print(f'join of chr():                  {slow * 1000:10.2f} ms')
+    print(f'LayoutText:                     {fast * 1000:10.2f} ms ({slow / fast:.0f}x)')
+    print(f'LayoutText with page separator: {mapped * 1000:10.2f} ms (builds the offset map)')
+    print(f'one page, lazily:               {one_page * 1000:10.2f} ms')
+    print(f'find_all + map to layouts:      {search * 1000:10.2f} ms, {len(matches)} matches')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
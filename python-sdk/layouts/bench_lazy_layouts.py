@@ -0,0 +1,93 @@
+"""
+Benchmark: full `ParseFromString` vs. `LazyDocument` for serving one page.
+
+Writes a synthetic layouts file to a temporary directory and times how long it
+takes, and how much the peak RSS grows, to get the characters of one page:
+
+    python bench_lazy_layouts.py [pages] [chars_per_page]
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import recognition_results_pb2 as rr_pb2
+from lazy_layouts import LazyDocument
+from synthetic import make_document
+
+
+def full_parse(path, page_number):
+    with open(path, 'rb') as f:
+        parsed = rr_pb2.Document.FromString(f.read())
+    page = parsed.pages[page_number - 1]
+    return [c.SerializeToString() for c in
+            parsed.characters[page.range.start:page.range.end]]
+
+
+def lazy_page(path, page_number):
+    lazy = LazyDocument.open(path)
+    return [c.SerializeToString() for c in lazy.page_characters(page_number)]
+
+
+def peak_rss_kib():
+    # ru_maxrss survives the exec of a spawned child, so prefer the per-process
+    # high-water mark where /proc is available.
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _child(fn, path, page_number, queue):
+    baseline = peak_rss_kib()
+    started = time.perf_counter()
+    result = fn(path, page_number)
+    elapsed = time.perf_counter() - started
+    queue.put((elapsed, (peak_rss_kib() - baseline) / 1024, result))
+
+
+def measure(label, fn, path, page_number):
+    """Run `fn` in a fresh interpreter so its peak RSS is not hidden by ours."""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(fn, path, page_number, queue))
+    process.start()
+    elapsed, peak_mib, result = queue.get()
+    process.join()
+    print(f'{label:<28} {elapsed * 1000:10.2f} ms  {peak_mib:8.1f} MiB peak RSS growth')
+    return result
+
+
+def main(pages=200, chars_per_page=5000):
+    doc = make_document(pages=pages, chars_per_page=chars_per_page)
+    page_number = pages // 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'layouts.pb')
+        with open(path, 'wb') as f:
+            f.write(doc.SerializeToString())
+        print(f'{pages} pages, {len(doc.characters)} characters, '
+              f'{os.path.getsize(path) / 2**20:.1f} MiB\n')
+        del doc
+
+        full = measure('ParseFromString + slice', full_parse, path, page_number)
+        lazy = measure('LazyDocument.page_characters', lazy_page, path, page_number)
+        assert full == lazy
+
+        started = time.perf_counter()
+        document = LazyDocument.open(path)
+        print(f'  skim only                  {(time.perf_counter() - started) * 1000:10.2f} ms')
+        started = time.perf_counter()
+        document.page_characters(page_number)
+        print(f'  decode one page            {(time.perf_counter() - started) * 1000:10.2f} ms')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
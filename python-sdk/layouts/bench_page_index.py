@@ -0,0 +1,79 @@
+"""
+Benchmark: the tutorial's linear `get_page_number` vs. `PageIndex`.
+
+Only the page ranges matter for this lookup, so the document is described by
+its page count and characters per page rather than built as a full `Document`:
+
+    python bench_page_index.py [pages] [chars_per_page] [sample]
+
+`sample` characters, spread evenly over the document, are looked up with the
+linear scan (it is far too slow to run on every character); the index looks up
+every character.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import recognition_results_pb2 as rr_pb2
+from page_index import CharacterOutsidePagesError, PageIndex
+
+
+def make_pages(pages, chars_per_page):
+    doc = rr_pb2.Document()
+    for i in range(pages):
+        page = doc.pages.add()
+        page.range.start = i * chars_per_page
+        page.range.end = (i + 1) * chars_per_page
+    return doc
+
+
+def main(pages=800, chars_per_page=50_000, sample=2_000):
+    doc = make_pages(pages, chars_per_page)
+    total = pages * chars_per_page
+    print(f'{pages} pages, {total} characters')
+
+    def get_page_number(char_loc: int):
+        for i, page in enumerate(doc.pages, 1):
+            if char_loc >= page.range.start and char_loc < page.range.end:
+                return i
+        return None
+
+    sampled = np.linspace(0, total - 1, sample, dtype=np.int64).tolist()
+
+    started = time.perf_counter()
+    linear = [get_page_number(i) for i in sampled]
+    linear_each = (time.perf_counter() - started) / sample
+
+    started = time.perf_counter()
+    index = PageIndex.from_document(doc)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    bisected = [index.page_of(i) for i in sampled]
+    bisect_each = (time.perf_counter() - started) / sample
+    assert bisected == linear
+
+    offsets = np.arange(total, dtype=np.int64)
+    started = time.perf_counter()
+    bulk = index.pages_of(offsets)
+    bulk_total = time.perf_counter() - started
+    assert bulk[sampled].tolist() == linear
+
+    print(f'build index:           {build * 1000:10.2f} ms')
+    print(f'linear, per lookup:    {linear_each * 1e6:10.2f} us '
+          f'(all characters: ~{linear_each * total:.0f} s)')
+    print(f'bisect, per lookup:    {bisect_each * 1e6:10.2f} us')
+    print(f'bulk, all characters:  {bulk_total * 1000:10.2f} ms '
+          f'({bulk_total / total * 1e9:.1f} ns per character)')
+
+    # Offsets past the last page are reported rather than silently dropped.
+    try:
+        index.pages_of([0, total, total + 5])
+    except CharacterOutsidePagesError as e:
+        print(f'gap error:             {e}')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
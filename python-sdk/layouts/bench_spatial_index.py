@@ -0,0 +1,80 @@
+"""
+Benchmark: scanning `doc.characters` vs. `SpatialIndex` for region queries.
+
+The sample `CANADAGOOS-F1Securiti-2152017.PDF` layouts are letter-sized pages
+at 300 DPI with a few thousand characters each; `synthetic.make_document`
+produces pages of the same shape, scaled up to any page and character count:
+
+    python bench_spatial_index.py [pages] [chars_per_page] [queries]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from columnar import ColumnarLayouts
+from spatial_index import SpatialIndex
+from synthetic import PAGE_HEIGHT, PAGE_WIDTH, make_document
+
+
+def main(pages=50, chars_per_page=5000, queries=200):
+    doc = make_document(pages=pages, chars_per_page=chars_per_page)
+    columns = ColumnarLayouts.from_document(doc)
+    index = SpatialIndex(columns)
+    print(f'{pages} pages, {columns.num_characters} characters, {queries} queries\n')
+
+    rng = random.Random(1)
+    rects = []
+    for _ in range(queries):
+        x, y = rng.randrange(PAGE_WIDTH), rng.randrange(PAGE_HEIGHT)
+        rects.append((rng.randint(1, pages), x, y,
+                      x + rng.randrange(20, 400), y + rng.randrange(20, 200)))
+
+    def scan(page_number, x1, y1, x2, y2):
+        # What a viewer backend does without an index: compare every box.
+        page = doc.pages[page_number - 1]
+        found = []
+        for i in range(page.range.start, page.range.end):
+            box = doc.characters[i].bounding_box
+            if box.x1 <= x2 and box.x2 >= x1 and box.y1 <= y2 and box.y2 >= y1:
+                found.append(i)
+        return found
+
+    started = time.perf_counter()
+    for page_number in range(1, pages + 1):
+        index.page(page_number)
+    print(f'build grids:          {(time.perf_counter() - started) * 1000:10.2f} ms '
+          f'for all pages')
+
+    started = time.perf_counter()
+    scanned = [scan(*rect) for rect in rects]
+    scan_each = (time.perf_counter() - started) / queries
+
+    started = time.perf_counter()
+    indexed = [index.intersecting(*rect) for rect in rects]
+    index_each = (time.perf_counter() - started) / queries
+    assert all(a == b.tolist() for a, b in zip(scanned, indexed))
+
+    started = time.perf_counter()
+    for page_number, x, y, _, _ in rects:
+        index.nearest(page_number, x, y)
+    nearest_each = (time.perf_counter() - started) / queries
+
+    spans = [(s, s + rng.randrange(10, 400)) for s in
+             np.random.default_rng(2).integers(0, columns.num_characters - 400, queries)]
+    started = time.perf_counter()
+    for start, end in spans:
+        index.span_characters(int(start), int(end))
+    span_each = (time.perf_counter() - started) / queries
+
+    print(f'scan, intersecting:   {scan_each * 1000:10.3f} ms per query')
+    print(f'index, intersecting:  {index_each * 1000:10.3f} ms per query '
+          f'({scan_each / index_each:.0f}x)')
+    print(f'index, nearest:       {nearest_each * 1000:10.3f} ms per query')
+    print(f'index, span box:      {span_each * 1000:10.3f} ms per query')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
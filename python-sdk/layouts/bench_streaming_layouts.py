@@ -0,0 +1,132 @@
+"""
+Benchmark: buffering the layouts response vs. decoding it as it downloads.
+
+Serves a synthetic layouts `Document` from a local HTTP server limited to
+`bandwidth` MB/s, standing in for `GET /files/ocr/{request_id}/layouts`, and
+gets its `ColumnarLayouts` three ways, each in a fresh interpreter: reading
+`response.content` and calling `ColumnarLayouts.from_bytes` (what
+`sdk.ocr.get_layouts(...).response.content` amounts to), `stream_layouts`,
+and `download_layouts` to a file followed by `LazyDocument.open` for the
+first page only. Reports the time until the first page can be used, the total
+time and the peak RSS growth:
+
+    python bench_streaming_layouts.py [pages] [chars_per_page] [bandwidth]
+"""
+
+import http.server
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from bench_lazy_layouts import peak_rss_kib
+from columnar import ColumnarLayouts
+from lazy_layouts import LazyDocument
+from streaming_layouts import download_layouts, stream_layouts
+from synthetic import make_document
+
+REQUEST_ID = 'bench'
+BLOCK_SIZE = 64 << 10
+
+
+def serve(path, bandwidth):
+    """Serve `path` as the layouts of every OCR request, at `bandwidth` bytes per second."""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            size = os.path.getsize(path)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(size))
+            self.end_headers()
+            started = time.perf_counter()
+            sent = 0
+            with open(path, 'rb') as f:
+                while block := f.read(BLOCK_SIZE):
+                    self.wfile.write(block)
+                    sent += len(block)
+                    delay = started + sent / bandwidth - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/api/v2'
+
+
+def buffered(url, first_page):
+    response = requests.get(f'{url}/files/ocr/{REQUEST_ID}/layouts',
+                            headers={'Authorization': 'Bearer fake'})
+    columns = ColumnarLayouts.from_bytes(response.content)
+    first_page()
+    return columns
+
+
+def streamed(url, first_page):
+    return stream_layouts(url, 'fake', REQUEST_ID,
+                          on_page=lambda number, columns: number == 1 and first_page())
+
+
+def to_file(url, first_page):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'layouts.pb')
+        download_layouts(url, 'fake', REQUEST_ID, path)
+        LazyDocument.open(path).page_columns(1)
+        first_page()
+
+
+def _child(fn, url, queue):
+    baseline = peak_rss_kib()
+    started = time.perf_counter()
+    first = []
+    columns = fn(url, lambda: first.append(time.perf_counter() - started))
+    elapsed = time.perf_counter() - started
+    summary = None if columns is None else \
+        (columns.num_characters, int(columns.codepoints.sum()), int(columns.bboxes.sum()),
+         columns.page_ranges.tolist())
+    queue.put((first[0], elapsed, (peak_rss_kib() - baseline) / 1024, summary))
+
+
+def measure(label, fn, url):
+    """Run `fn` in a fresh interpreter so its peak RSS is not hidden by ours."""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(fn, url, queue))
+    process.start()
+    first, elapsed, peak_mib, summary = queue.get()
+    process.join()
+    print(f'{label:<28} {first:7.2f} s first page {elapsed:7.2f} s total '
+          f'{peak_mib:8.1f} MiB peak RSS growth')
+    return summary
+
+
+def main(pages=300, chars_per_page=5000, bandwidth=20):
+    doc = make_document(pages=pages, chars_per_page=chars_per_page)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'layouts.pb')
+        with open(path, 'wb') as f:
+            f.write(doc.SerializeToString())
+        columns = ColumnarLayouts.from_document(doc)
+        arrays = sum(getattr(columns, name).nbytes for name in ColumnarLayouts.__slots__)
+        print(f'{pages} pages, {len(doc.characters)} characters, '
+              f'{os.path.getsize(path) / 2**20:.1f} MiB of layouts '
+              f'({arrays / 2**20:.1f} MiB of arrays) at {bandwidth} MB/s\n')
+        del doc, columns
+
+        server, url = serve(path, bandwidth * 1e6)
+        try:
+            expected = measure('content + from_bytes', buffered, url)
+            assert measure('stream_layouts', streamed, url) == expected
+            measure('download_layouts + LazyDocument', to_file, url)
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,151 @@
+"""
+Columnar (struct-of-arrays) view of a layouts `Document`.
+
+The tutorial in `layouts.py` walks `doc.characters` one `Character` message at
+a time. That is fine for a handful of characters, but every attribute access
+goes through the protobuf runtime, so walking the millions of characters of a
+large filing is slow and keeps the whole message tree alive.
+
+`ColumnarLayouts` copies the layouts once into flat NumPy arrays:
+
+- `codepoints`:  `(N,)` `uint32` unicode value of every character
+- `bboxes`:      `(N, 4)` `uint32` `x1, y1, x2, y2` of every character
+- `errors`:      `(N,)` `uint32` OCR error value of every character
+- `page_ranges`: `(P, 2)` `uint32` `range.start, range.end` of every page
+- `page_sizes`:  `(P, 2)` `uint32` `width, height` of every page
+- `page_dpi`:    `(P, 2)` `uint32` `dpi_x, dpi_y` of every page
+
+after which the operations from the tutorial (text of a character slice, the
+page of every character, the page metadata) are vectorized array operations.
+
+    doc = rr_pb2.Document()
+    doc.ParseFromString(layouts)
+    columns = ColumnarLayouts.from_document(doc)
+
+    columns.text(0, 15)          # 'Exhibit 10.10 2'
+    columns.page_numbers()[:15]  # array([1, 1, ..., 1])
+"""
+
+import numpy as np
+
+import recognition_results_pb2 as rr_pb2
+from page_index import PageIndex
+
+# Little-endian so the codepoint buffer can be decoded as UTF-32-LE directly.
+CODEPOINT_DTYPE = np.dtype('<u4')
+COORD_DTYPE = np.dtype('<u4')
+
+
+def pack_characters(characters) -> np.ndarray:
+    """`(N, 6)` `uint32` array of `unicode, error, x1, y1, x2, y2` for a sequence of `Character`s."""
+    n = len(characters)
+    return np.fromiter(
+        ((c.unicode, c.error,
+          c.bounding_box.x1, c.bounding_box.y1,
+          c.bounding_box.x2, c.bounding_box.y2) for c in characters),
+        dtype=np.dtype((np.uint32, 6)), count=n).reshape(n, 6)
+
+
+class ColumnarLayouts:
+    """Struct-of-arrays copy of the characters and pages of a layouts `Document`."""
+
+    __slots__ = ('codepoints', 'bboxes', 'errors',
+                 'page_ranges', 'page_sizes', 'page_dpi')
+
+    def __init__(self, codepoints, bboxes, errors,
+                 page_ranges, page_sizes, page_dpi):
+        self.codepoints = np.asarray(codepoints, dtype=CODEPOINT_DTYPE)
+        self.bboxes = np.asarray(bboxes, dtype=COORD_DTYPE).reshape(-1, 4)
+        self.errors = np.asarray(errors, dtype=np.uint32)
+        self.page_ranges = np.asarray(page_ranges, dtype=np.uint32).reshape(-1, 2)
+        self.page_sizes = np.asarray(page_sizes, dtype=np.uint32).reshape(-1, 2)
+        self.page_dpi = np.asarray(page_dpi, dtype=np.uint32).reshape(-1, 2)
+
+        if not (len(self.codepoints) == len(self.bboxes) == len(self.errors)):
+            raise ValueError('Character arrays must all have the same length.')
+        if not (len(self.page_ranges) == len(self.page_sizes) == len(self.page_dpi)):
+            raise ValueError('Page arrays must all have the same length.')
+
+    @classmethod
+    def from_document(cls, doc: rr_pb2.Document) -> 'ColumnarLayouts':
+        """
+        Copy a parsed `Document` into arrays.
+
+        Each `Character` is visited exactly once; all six of its values are
+        read in that single visit and packed straight into one `(N, 6)` array.
+        """
+        packed = pack_characters(doc.characters)
+
+        pages = np.array(
+            [(p.range.start, p.range.end, p.width, p.height, p.dpi_x, p.dpi_y)
+             for p in doc.pages],
+            dtype=np.uint32).reshape(-1, 6)
+
+        return cls(codepoints=np.ascontiguousarray(packed[:, 0]),
+                   errors=np.ascontiguousarray(packed[:, 1]),
+                   bboxes=np.ascontiguousarray(packed[:, 2:6]),
+                   page_ranges=np.ascontiguousarray(pages[:, 0:2]),
+                   page_sizes=np.ascontiguousarray(pages[:, 2:4]),
+                   page_dpi=np.ascontiguousarray(pages[:, 4:6]))
+
+    @classmethod
+    def from_bytes(cls, layouts: bytes) -> 'ColumnarLayouts':
+        """Parse serialized layouts (e.g. `sdk.ocr.get_layouts(...).response.content`)."""
+        doc = rr_pb2.Document()
+        doc.ParseFromString(layouts)
+        return cls.from_document(doc)
+
+    @property
+    def num_characters(self) -> int:
+        return len(self.codepoints)
+
+    @property
+    def num_pages(self) -> int:
+        return len(self.page_ranges)
+
+    def text(self, start: int = 0, end: int = None) -> str:
+        """
+        Text of the characters `start` to `end` (not inclusive).
+
+        Equivalent to `"".join([chr(c.unicode) for c in doc.characters][start:end])`,
+        but decodes the codepoint buffer as UTF-32 in one call instead of
+        building a one-character string per character.
+        """
+        chunk = self.codepoints[start:end]
+        return chunk.tobytes().decode('utf-32-le', errors='surrogatepass')
+
+    def page_numbers(self, offsets=None) -> np.ndarray:
+        """
+        1-based page number of every character (or of the given character offsets).
+
+        Offsets that do not fall within any page's range are reported as 0,
+        which is the array equivalent of `get_page_number` returning `None`.
+        """
+        if offsets is None:
+            offsets = np.arange(self.num_characters, dtype=np.int64)
+        return self.page_index().lookup(offsets)
+
+    def page_index(self) -> PageIndex:
+        """`PageIndex` over this document's page ranges."""
+        return PageIndex.from_ranges(self.page_ranges)
+
+    def page_characters(self, page_number: int) -> slice:
+        """Slice of the character arrays that belongs to the 1-based `page_number`."""
+        start, end = self.page_ranges[page_number - 1]
+        return slice(int(start), int(end))
+
+    def page_metadata(self) -> np.ndarray:
+        """
+        Metadata of every page as one structured array.
+
+        Fields are named after the `Page` message: `width`, `height`, `dpi_x`,
+        `dpi_y`, `range_start` and `range_end`.
+        """
+        metadata = np.empty(self.num_pages, dtype=[
+            ('width', np.uint32), ('height', np.uint32),
+            ('dpi_x', np.uint32), ('dpi_y', np.uint32),
+            ('range_start', np.uint32), ('range_end', np.uint32)])
+        metadata['width'], metadata['height'] = self.page_sizes.T
+        metadata['dpi_x'], metadata['dpi_y'] = self.page_dpi.T
+        metadata['range_start'], metadata['range_end'] = self.page_ranges.T
+        return metadata
@@ -0,0 +1,110 @@
+"""
+Highlight rectangles for character spans.
+
+To show an extraction in a document viewer, its `(character_start,
+character_end)` span has to become one rectangle per line of text it covers,
+on the right page. `span_rectangles` does that for any number of spans at
+once: all characters of all spans are gathered in one pass over the bounding
+box arrays of a `ColumnarLayouts`, split into lines, and every line is merged
+into a single rectangle.
+
+    spans = spans_from_results(extraction_request.get_results())
+    rectangles = span_rectangles(columns, spans)
+    for r in rectangles:
+        print(r['span'], r['page'], r['x1'], r['y1'], r['x2'], r['y2'])
+
+Coordinates are divided by the page's `dpi_x`/`dpi_y`, i.e. given in inches
+from the top left corner of the page, which a viewer can scale to whatever
+resolution it renders the page at. Pass `normalize=False` to get pixels.
+"""
+
+import numpy as np
+
+from columnar import ColumnarLayouts
+
+RECTANGLE_DTYPE = np.dtype([('span', np.int64), ('page', np.int64),
+                            ('x1', np.float64), ('y1', np.float64),
+                            ('x2', np.float64), ('y2', np.float64)])
+
+
+def spans_from_results(results) -> np.ndarray:
+    """
+    `(S, 2)` array of `start, end` character offsets.
+
+    Accepts `(start, end)` pairs, the extraction results returned by
+    `get_results()` (every span of every result is included, in order), or
+    the validation details returned by `sdk.fields.get_validation_details`.
+    """
+    spans = []
+    for result in results:
+        if hasattr(result, 'spans'):
+            spans.extend((span.start, span.end) for span in result.spans)
+        elif hasattr(result, 'location'):
+            spans.append((result.location.character_start, result.location.character_end))
+        else:
+            start, end = result
+            spans.append((start, end))
+    return np.array(spans, dtype=np.int64).reshape(-1, 2)
+
+
+def span_rectangles(columns: ColumnarLayouts, spans, normalize: bool = True) -> np.ndarray:
+    """
+    Merged per-line rectangles of every span.
+
+    Returns a structured array with one row per line of every span, with the
+    fields `span` (index into `spans`), `page` (1-based), `x1`, `y1`, `x2`
+    and `y2`, ordered by span and then by position in the text. Characters
+    without a bounding box (all zero) are left out.
+    """
+    spans = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+    starts = np.clip(spans[:, 0], 0, columns.num_characters)
+    ends = np.clip(spans[:, 1], starts, columns.num_characters)
+    lengths = ends - starts
+
+    # Every character of every span, with the span it belongs to.
+    total = int(lengths.sum())
+    span_of = np.repeat(np.arange(len(spans)), lengths)
+    characters = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+
+    boxes = columns.bboxes[characters].astype(np.int64)
+    keep = boxes.any(axis=1)
+    characters, span_of, boxes = characters[keep], span_of[keep], boxes[keep]
+    pages = columns.page_numbers(characters)
+    keep = pages > 0
+    characters, span_of, boxes, pages = characters[keep], span_of[keep], boxes[keep], pages[keep]
+
+    if not len(characters):
+        return np.empty(0, dtype=RECTANGLE_DTYPE)
+
+    # A new line starts with every new span or page, when the next character
+    # moves left (the text wrapped), or when it does not overlap the previous
+    # character vertically by at least half the smaller of the two heights.
+    x1, y1, x2, y2 = boxes.T
+    overlap = np.minimum(y2[1:], y2[:-1]) - np.maximum(y1[1:], y1[:-1])
+    smaller = np.minimum(y2[1:] - y1[1:], y2[:-1] - y1[:-1])
+    breaks = np.empty(len(characters), dtype=bool)
+    breaks[0] = True
+    breaks[1:] = ((span_of[1:] != span_of[:-1]) |
+                  (pages[1:] != pages[:-1]) |
+                  (x1[1:] < x1[:-1]) |
+                  (2 * overlap < smaller))
+    line_starts = np.flatnonzero(breaks)
+
+    rectangles = np.empty(len(line_starts), dtype=RECTANGLE_DTYPE)
+    rectangles['span'] = span_of[line_starts]
+    rectangles['page'] = pages[line_starts]
+    rectangles['x1'] = np.minimum.reduceat(x1, line_starts)
+    rectangles['y1'] = np.minimum.reduceat(y1, line_starts)
+    rectangles['x2'] = np.maximum.reduceat(x2, line_starts)
+    rectangles['y2'] = np.maximum.reduceat(y2, line_starts)
+
+    if normalize:
+        dpi = columns.page_dpi[rectangles['page'] - 1].astype(np.float64)
+        # Pages without DPI information are left in pixels rather than
+        # dividing by zero.
+        dpi[dpi == 0] = 1
+        rectangles['x1'] /= dpi[:, 0]
+        rectangles['x2'] /= dpi[:, 0]
+        rectangles['y1'] /= dpi[:, 1]
+        rectangles['y2'] /= dpi[:, 1]
+    return rectangles
@@ -0,0 +1,147 @@
+"""
+Document text built from the layouts, with an exact map back to characters.
+
+The tutorial rebuilds the text with `"".join([chr(c.unicode) for c in
+doc.characters])`, creating a one-character string per character first.
+`LayoutText` decodes the whole `uint32` codepoint array of a
+`ColumnarLayouts` as UTF-32 in a single call instead.
+
+It also keeps track of which layout character every position of the text
+came from, so a match found by searching the text maps straight back to
+bounding boxes without rescanning the layouts:
+
+    text = LayoutText(columns, page_separator='\\n')
+    i = text.text.find('Governing Law')
+    start, end = text.layout_span(i, i + len('Governing Law'))
+    columns.bboxes[start:end]
+
+Without a `page_separator` the text position and the layout character offset
+are the same number; with one, the separator is inserted between pages and
+the offsets shift accordingly. Per-page text is available through `page()`,
+which only decodes that page's characters until the full text has been built.
+"""
+
+import numpy as np
+
+from columnar import ColumnarLayouts
+
+REPLACEMENT_CHARACTER = 0xFFFD
+_MAX_CODEPOINT = 0x10FFFF
+
+
+def decode_codepoints(codepoints: np.ndarray) -> str:
+    """
+    Decode a codepoint array to a `str` with exactly one character per codepoint.
+
+    Values that are not valid unicode become U+FFFD; lone surrogates are
+    kept, as `chr()` would.
+    """
+    codepoints = np.asarray(codepoints, dtype='<u4')
+    invalid = codepoints > _MAX_CODEPOINT
+    if invalid.any():
+        codepoints = np.where(invalid, REPLACEMENT_CHARACTER, codepoints).astype('<u4')
+    return codepoints.tobytes().decode('utf-32-le', errors='surrogatepass')
+
+
+class LayoutText:
+    """Text of a document, with a position map between the text and the layouts."""
+
+    def __init__(self, columns: ColumnarLayouts, page_separator: str = ''):
+        self.columns = columns
+        self.page_separator = page_separator
+        self._text = None
+        self._pages = {}
+        self._text_to_layout = None
+        self._layout_to_text = None
+
+    @property
+    def text(self) -> str:
+        """The full text, built on first access."""
+        self._ensure_built()
+        return self._text
+
+    def _ensure_built(self):
+        if self._text is not None:
+            return
+        codepoints = self.columns.codepoints
+        if not self.page_separator or self.columns.num_pages < 2:
+            self._text = decode_codepoints(codepoints)
+            return
+
+        # Insert the separator before the first character of every page but
+        # the first, and remember where each text position came from (-1 for
+        # the separators).
+        separator = np.frombuffer(self.page_separator.encode('utf-32-le'), dtype='<u4')
+        page_starts = self.columns.page_ranges[1:, 0].astype(np.int64)
+        at = np.repeat(page_starts, len(separator))
+        inserted = np.tile(separator, len(page_starts))
+
+        self._text = decode_codepoints(np.insert(codepoints, at, inserted))
+        self._text_to_layout = np.insert(
+            np.arange(len(codepoints), dtype=np.int64), at, -1)
+        self._layout_to_text = np.flatnonzero(self._text_to_layout >= 0)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def page(self, page_number: int) -> str:
+        """Text of the 1-based `page_number`, without any separator."""
+        characters = self.columns.page_characters(page_number)
+        if self._text is not None and self._layout_to_text is None:
+            return self._text[characters]
+
+        text = self._pages.get(page_number)
+        if text is None:
+            text = decode_codepoints(self.columns.codepoints[characters])
+            self._pages[page_number] = text
+        return text
+
+    def pages(self):
+        """Text of every page, decoded one page at a time."""
+        for page_number in range(1, self.columns.num_pages + 1):
+            yield self.page(page_number)
+
+    def to_layout(self, positions) -> np.ndarray:
+        """Layout character offset of text position(s); -1 for separator characters."""
+        positions = np.asarray(positions, dtype=np.int64)
+        self._ensure_built()
+        if self._text_to_layout is None:
+            return positions.copy()
+        return self._text_to_layout[positions]
+
+    def to_text(self, offsets) -> np.ndarray:
+        """Text position of layout character offset(s)."""
+        offsets = np.asarray(offsets, dtype=np.int64)
+        self._ensure_built()
+        if self._layout_to_text is None:
+            return offsets.copy()
+        return self._layout_to_text[offsets]
+
+    def layout_span(self, start: int, end: int):
+        """
+        Layout character range `[start, end)` covered by the text range `[start, end)`.
+
+        Separators at the edges of the text range are ignored.
+        """
+        self._ensure_built()
+        if self._text_to_layout is None:
+            return start, end
+        covered = self._text_to_layout[start:end]
+        covered = covered[covered >= 0]
+        if not len(covered):
+            offset = int(np.searchsorted(self._layout_to_text, start))
+            return offset, offset
+        return int(covered[0]), int(covered[-1]) + 1
+
+    def find_all(self, needle: str):
+        """Layout character ranges of every (non-overlapping) occurrence of `needle`."""
+        text = self.text
+        spans = []
+        i = text.find(needle)
+        while i != -1 and needle:
+            spans.append(self.layout_span(i, i + len(needle)))
+            i = text.find(needle, i + len(needle))
+        return spans
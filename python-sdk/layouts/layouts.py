@@ -86,13 +86,21 @@ import time
 
 import recognition_results_pb2 as rr_pb2
 
+# 'UploadLedger' remembers the files already uploaded to Zuva, so
+# running this tutorial again does not upload the same content twice
+import sys
+sys.path.append('..')
+from zuva_pipeline import UploadLedger
+
 
 # ### Create an instance of the SDK
 # 
 # 
 # At this point in the tutorial you have imported the necessary Python packages. You should also have a token that was created, as mentioned in the [requirements](#requirements).
 
-sdk = ZDAISDK(url   = 'https://us.app.zuva.ai/api/v2',
+# 'ZUVA_URL' may point to another region, or to a local fake API
+# started with 'python -m zuva_pipeline.fake_server' for offline runs
+sdk = ZDAISDK(url   = os.getenv('ZUVA_URL', 'https://us.app.zuva.ai/api/v2'),
               token = os.getenv('ZUVA_TOKEN'))
 
 
@@ -107,13 +115,14 @@ sdk = ZDAISDK(url   = 'https://us.app.zuva.ai/api/v2',
 
 local_file = 'upload_files/CANADAGOOS-F1Securiti-2152017.PDF'
 
-with open(local_file, 'rb') as f:
-   file, _ = sdk.file.create(f.read())
-   file.name = os.path.basename(local_file)
+ledger = UploadLedger(sdk)
+file = ledger.upload(local_file)
 
 
 # The file variable will be used going forward to refer to the unique identifier, since Zuva has no concept of filenames. It is possible to obtain the file’s unique identifier by running `print(file.id)`.
 # 
+# `ledger.upload` sends the file's content with `sdk.file.create`, and records the file ID against a SHA-256 hash of the content (in `~/.cache/zuva`). Running the tutorial again reuses that file ID instead of uploading the document again, until Zuva deletes it (`file.expiration`).
+# 
 # ### Create an OCR request
 # 
 # This request will run an [OCR](#ocr) on the document that was [provided earlier](#submit-document). This process will create the layouts.
@@ -0,0 +1,285 @@
+"""
+On-disk cache of layouts, keyed by the content hash of the source file.
+
+Getting layouts means uploading the PDF, running an OCR request and
+downloading the result. `LayoutsCache` stores the layouts of every file it
+has seen once, in a fixed-width binary format that is memory-mapped when read
+back, so opening a cached document takes the same small amount of memory no
+matter how many characters it has.
+
+File format (all values little-endian):
+
+    header      magic b'ZLYC', format version (u32), characters (u64), pages (u64),
+                8 reserved bytes, 32 bytes in total
+    codepoints  characters x u32
+    errors      characters x u32
+    bboxes      characters x 4 x u32 (x1, y1, x2, y2)
+    page_ranges pages x 2 x u32 (start, end)
+    page_sizes  pages x 2 x u32 (width, height)
+    page_dpi    pages x 2 x u32 (dpi_x, dpi_y)
+
+The cache is bounded in size: whenever an entry is added, the least recently
+used entries are removed until the total size is under `max_bytes`.
+
+It can also be used from the command line:
+
+    python layouts_cache.py inspect
+    python layouts_cache.py warm upload_files/*.PDF
+    python layouts_cache.py prune --max-bytes 500000000
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from columnar import ColumnarLayouts
+
+PACKAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+MAGIC = b'ZLYC'
+FORMAT_VERSION = 1
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'zuva', 'layouts')
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+SUFFIX = '.zlc'
+CHUNK_SIZE = 1 << 20
+
+_HEADER = struct.Struct('<4sIQQ8x')
+_U32 = np.dtype('<u4')
+
+
+def content_sha256(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """
+    Hex SHA-256 of a file's content, the cache key; the same as
+    `zuva_pipeline.ledger.content_sha256`, without importing the SDK.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_layouts(path: str, columns: ColumnarLayouts):
+    """Write `columns` to `path` in the cache's binary format."""
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION,
+                             columns.num_characters, columns.num_pages))
+        for array in (columns.codepoints, columns.errors, columns.bboxes,
+                      columns.page_ranges, columns.page_sizes, columns.page_dpi):
+            f.write(np.ascontiguousarray(array, dtype=_U32).tobytes())
+
+
+def read_layouts(path: str) -> ColumnarLayouts:
+    """
+    Memory-map a file written by `write_layouts`.
+
+    The arrays of the returned `ColumnarLayouts` are read-only views of the
+    mapping: nothing is copied, and pages are only read from disk when used.
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(buffer) < _HEADER.size:
+        raise ValueError(f'{path} is not a layouts cache file.')
+    magic, version, characters, pages = _HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f'{path} is not a version {FORMAT_VERSION} layouts cache file.')
+    if len(buffer) != _HEADER.size + 4 * (6 * characters + 6 * pages):
+        raise ValueError(f'{path} is truncated.')
+
+    offset = _HEADER.size
+
+    def view(count, width=1):
+        nonlocal offset
+        array = np.frombuffer(buffer, dtype=_U32, count=count * width, offset=offset)
+        offset += array.nbytes
+        return array.reshape(count, width) if width > 1 else array
+
+    return ColumnarLayouts(codepoints=view(characters),
+                           errors=view(characters),
+                           bboxes=view(characters, 4),
+                           page_ranges=view(pages, 2),
+                           page_sizes=view(pages, 2),
+                           page_dpi=view(pages, 2))
+
+
+class LayoutsCache:
+    """Size-bounded, least-recently-used cache of layouts on disk."""
+
+    def __init__(self, directory: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or os.getenv('ZUVA_LAYOUTS_CACHE', DEFAULT_DIRECTORY)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str):
+        """The cached `ColumnarLayouts` for `key`, or `None` on a cache miss."""
+        path = self.path(key)
+        try:
+            columns = read_layouts(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Empty, truncated or corrupt, e.g. left behind by a crash: a
+            # miss, so that the layouts are fetched and written again.
+            self.evict(key)
+            return None
+        # The modification time doubles as the "last used" time for eviction.
+        os.utime(path)
+        return columns
+
+    def evict(self, key: str):
+        """Remove the entry for `key`, if there is one."""
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def put(self, key: str, layouts) -> ColumnarLayouts:
+        """
+        Store layouts under `key` and return them memory-mapped from the cache.
+
+        `layouts` is either the serialized layouts returned by
+        `sdk.ocr.get_layouts` or a `ColumnarLayouts`.
+        """
+        columns = layouts if isinstance(layouts, ColumnarLayouts) \
+            else ColumnarLayouts.from_bytes(layouts)
+
+        # Written under a temporary name first so that readers never see a
+        # partially written entry.
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            write_layouts(temporary, columns)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+        self.prune(keep=key)
+        return self.get(key)
+
+    def get_or_fetch(self, file_path: str, fetch) -> ColumnarLayouts:
+        """
+        Layouts of the file at `file_path`, calling `fetch(file_path)` on a miss.
+
+        `fetch` must return the serialized layouts, e.g. `fetch_layouts` below.
+        """
+        key = content_sha256(file_path)
+        columns = self.get(key)
+        if columns is None:
+            columns = self.put(key, fetch(file_path))
+        return columns
+
+    def entries(self):
+        """`(key, size in bytes, last used timestamp)` of every entry, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((name[:-len(SUFFIX)], stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def prune(self, max_bytes: int = None, keep: str = None):
+        """Remove least recently used entries until at most `max_bytes` remain; returns the removed keys."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for key, size, _ in entries:
+            if total <= max_bytes:
+                break
+            if key == keep:
+                continue
+            os.remove(self.path(key))
+            total -= size
+            removed.append(key)
+        return removed
+
+
+def fetch_layouts(sdk, file_path: str, poll_interval: float = 2) -> bytes:
+    """Upload a file, run an OCR request on it and download its layouts, as in `layouts.py`."""
+    # Imported here: `zuva_pipeline` imports the SDK, which only uploads need.
+    if PACKAGE_DIRECTORY not in sys.path:
+        sys.path.append(PACKAGE_DIRECTORY)
+    from zuva_pipeline.file_stream import FileStream
+
+    with FileStream(file_path) as content:
+        file, _ = sdk.file.create(content)
+
+    [ocr_request], _ = sdk.ocr.create(file_ids=[file.id])
+    while not ocr_request.is_finished():
+        time.sleep(poll_interval)
+        ocr_request.update()
+
+    if not ocr_request.is_successful():
+        raise Exception(f'Unable to obtain layouts for {file_path}.')
+    return sdk.ocr.get_layouts(request_id=ocr_request.id).response.content
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect, warm and prune the local layouts cache.')
+    parser.add_argument('--directory', default=None,
+                        help=f'cache directory (default: $ZUVA_LAYOUTS_CACHE or {DEFAULT_DIRECTORY})')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('inspect', help='list the cached documents')
+    warm = commands.add_parser('warm', help='OCR files that are not cached yet')
+    warm.add_argument('files', nargs='+')
+    warm.add_argument('--url', default=os.getenv('ZUVA_URL', 'https://us.app.zuva.ai/api/v2'),
+                      help='API url (default: $ZUVA_URL or the US region)')
+    prune = commands.add_parser('prune', help='evict least recently used entries')
+    prune.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES)
+    args = parser.parse_args(argv)
+
+    cache = LayoutsCache(args.directory)
+
+    if args.command == 'inspect':
+        total = 0
+        for key, size, last_used in cache.entries():
+            total += size
+            last_used = time.strftime("%Y-%m-%d %H:%M", time.localtime(last_used))
+            try:
+                columns = read_layouts(cache.path(key))
+            except (OSError, ValueError) as e:
+                # As in `get()`: the entry will be fetched again when next used.
+                print(f'{key}  {size:>12} bytes  corrupt ({e})  last used {last_used}')
+                continue
+            print(f'{key}  {size:>12} bytes  {columns.num_pages:>5} pages  '
+                  f'{columns.num_characters:>9} characters  last used {last_used}')
+        print(f'{total} bytes in {cache.directory}')
+
+    elif args.command == 'warm':
+        from zdai import ZDAISDK
+        sdk = ZDAISDK(url=args.url, token=os.getenv('ZUVA_TOKEN'))
+        for file_path in args.files:
+            key = content_sha256(file_path)
+            if key in cache:
+                print(f'{file_path}: already cached')
+                continue
+            columns = cache.put(key, fetch_layouts(sdk, file_path))
+            print(f'{file_path}: cached {columns.num_pages} pages as {key}')
+
+    elif args.command == 'prune':
+        for key in cache.prune(args.max_bytes):
+            print(f'removed {key}')
+        print(f'{cache.size()} bytes in {cache.directory}')
+
+
+if __name__ == '__main__':
+    main()
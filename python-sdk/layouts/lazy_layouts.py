@@ -0,0 +1,255 @@
+"""
+Lazy reader for the `recognition_results.proto` wire format.
+
+`doc.ParseFromString(layouts)` materializes every `Character` of the document
+before the first one can be used. `LazyDocument` instead skims the top-level
+`Document` fields once, without creating any message objects, and remembers
+where each repeated field lives in the buffer:
+
+- the scalar fields (`version`, `md5`) and the `pages` are decoded right away,
+  as they are small;
+- for `characters` a checkpoint (byte offset) is kept every
+  `CHECKPOINT_INTERVAL` characters;
+- for `tables`, `table_cells`, `fonts`, `font_sizes`, `font_styles`, `headers`
+  and `footers` the byte span of every entry is kept.
+
+A page's characters are then decoded on demand: the bytes between the offsets
+of its first and last character are themselves a valid serialized `Document`
+containing only those characters, so the protobuf parser only ever sees that
+slice. Backed by `mmap` (see `LazyDocument.open`), serving a single page of a
+300 MB layouts file reads little more than that page from disk.
+
+    lazy = LazyDocument.open('layouts.pb')
+    print(lazy.num_pages, lazy.num_characters)
+    for character in lazy.page_characters(42):
+        ...
+"""
+
+import mmap
+
+from google.protobuf.message import DecodeError
+
+import recognition_results_pb2 as rr_pb2
+from columnar import ColumnarLayouts
+
+# A checkpoint is the byte offset of every CHECKPOINT_INTERVAL-th character,
+# bounding how many entries have to be skipped to reach any character.
+CHECKPOINT_INTERVAL = 1024
+
+# Field numbers and wire types from recognition_results.proto
+_FIELD_VERSION = 1
+_FIELD_CHARACTERS = 2
+_FIELD_PAGES = 3
+_FIELD_MD5 = 18
+_REPEATED_FIELDS = {
+    4: ('tables', rr_pb2.Table),
+    5: ('table_cells', rr_pb2.TableCell),
+    6: ('fonts', rr_pb2.Font),
+    7: ('font_sizes', rr_pb2.FontSize),
+    8: ('font_styles', rr_pb2.FontStyle),
+    9: ('headers', rr_pb2.Header),
+    10: ('footers', rr_pb2.Footer),
+}
+_WIRE_VARINT = 0
+_WIRE_FIXED64 = 1
+_WIRE_LENGTH_DELIMITED = 2
+_WIRE_FIXED32 = 5
+_CHARACTER_KEY = (_FIELD_CHARACTERS << 3) | _WIRE_LENGTH_DELIMITED
+
+
+def _read_varint(buf, pos: int):
+    result = 0
+    shift = 0
+    while True:
+        try:
+            b = buf[pos]
+        except IndexError:
+            raise DecodeError('Truncated layouts: a varint runs past the end of the buffer.')
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _skip_field(buf, pos: int, wire_type: int) -> int:
+    if wire_type == _WIRE_VARINT:
+        return _read_varint(buf, pos)[1]
+    if wire_type == _WIRE_LENGTH_DELIMITED:
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    if wire_type == _WIRE_FIXED64:
+        return pos + 8
+    if wire_type == _WIRE_FIXED32:
+        return pos + 4
+    raise DecodeError(f'Unsupported wire type {wire_type} in layouts.')
+
+
+class LazyDocument:
+    """A layouts `Document` whose characters are only decoded when asked for."""
+
+    def __init__(self, buffer):
+        """`buffer` is anything indexable as bytes: `bytes`, `memoryview` or `mmap`."""
+        self._buf = buffer
+        self._end = len(buffer)
+        self.version = 0
+        self.md5 = b''
+        self.num_characters = 0
+        # Byte offset of character i * CHECKPOINT_INTERVAL, for every i.
+        self._checkpoints = []
+        # Byte offset just past the last character entry seen.
+        self._characters_end = 0
+        self._spans = {name: [] for name, _ in _REPEATED_FIELDS.values()}
+        self.pages = []
+        self._skim()
+
+    @classmethod
+    def open(cls, path: str) -> 'LazyDocument':
+        """Memory-map a layouts file from disk instead of reading it into memory."""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    def _skim(self):
+        buf = self._buf
+        pos = 0
+        while pos < self._end:
+            key, pos = _read_varint(buf, pos)
+            field, wire_type = key >> 3, key & 0x7
+
+            if field == _FIELD_CHARACTERS and wire_type == _WIRE_LENGTH_DELIMITED:
+                pos = self._skim_characters(pos)
+            elif field == _FIELD_PAGES and wire_type == _WIRE_LENGTH_DELIMITED:
+                length, pos = _read_varint(buf, pos)
+                self.pages.append(rr_pb2.Page.FromString(bytes(buf[pos:pos + length])))
+                pos += length
+            elif field == _FIELD_VERSION and wire_type == _WIRE_VARINT:
+                version, pos = _read_varint(buf, pos)
+                # int32 values are sign-extended to 64 bits on the wire.
+                self.version = version - (1 << 64) if version >= 1 << 63 else version
+            elif field == _FIELD_MD5 and wire_type == _WIRE_LENGTH_DELIMITED:
+                length, pos = _read_varint(buf, pos)
+                self.md5 = bytes(buf[pos:pos + length])
+                pos += length
+            elif field in _REPEATED_FIELDS and wire_type == _WIRE_LENGTH_DELIMITED:
+                start = pos
+                length, pos = _read_varint(buf, pos)
+                pos += length
+                self._spans[_REPEATED_FIELDS[field][0]].append((start, pos))
+            else:
+                # Unknown fields are skipped, like the protobuf parser does.
+                pos = _skip_field(buf, pos, wire_type)
+
+        if pos != self._end:
+            raise DecodeError('Truncated layouts: a field runs past the end of the buffer.')
+
+    def _skim_characters(self, pos: int) -> int:
+        """
+        Skip over a run of consecutive `characters` entries.
+
+        `pos` points just past the key of the first entry. Serializers write
+        all characters back to back, so this loop usually consumes the whole
+        field in one go, touching two bytes per character.
+        """
+        buf = self._buf
+        end = self._end
+        count = self.num_characters
+        checkpoints = self._checkpoints
+        interval = CHECKPOINT_INTERVAL
+
+        while True:
+            if count % interval == 0:
+                # Offsets point at the key, so that a slice starting there is
+                # a serialized Document.
+                checkpoints.append(pos - 1)
+            if pos >= end:
+                raise DecodeError('Truncated layouts: a character runs past the end of the buffer.')
+            length = buf[pos]
+            if length < 0x80:
+                pos += 1 + length
+            else:
+                length, pos = _read_varint(buf, pos)
+                pos += length
+            count += 1
+            if pos >= end or buf[pos] != _CHARACTER_KEY:
+                break
+            pos += 1
+
+        self.num_characters = count
+        self._characters_end = pos
+        return pos
+
+    @property
+    def num_pages(self) -> int:
+        return len(self.pages)
+
+    def _character_offset(self, index: int) -> int:
+        """Byte offset of the key of character `index` (or the end of the last one)."""
+        if index >= self.num_characters:
+            return self._characters_end
+        buf = self._buf
+        pos = self._checkpoints[index // CHECKPOINT_INTERVAL]
+        remaining = index % CHECKPOINT_INTERVAL
+
+        # Walk forward from the checkpoint. Entries of other fields only show
+        # up here if the characters were not written back to back.
+        while True:
+            key, after_key = _read_varint(buf, pos)
+            if key == _CHARACTER_KEY:
+                if remaining == 0:
+                    return pos
+                remaining -= 1
+            pos = _skip_field(buf, after_key, key & 0x7)
+
+    def characters(self, start: int = 0, end: int = None):
+        """
+        Decode the characters `start` to `end` (not inclusive).
+
+        Returns the repeated `Character` field of a `Document` that holds
+        only those characters.
+        """
+        end = self.num_characters if end is None else min(end, self.num_characters)
+        if start < 0 or start > end:
+            raise IndexError(f'Invalid character range {start} to {end}.')
+        if start == end:
+            return rr_pb2.Document().characters
+
+        first = self._character_offset(start)
+        last = self._character_offset(end)
+        partial = rr_pb2.Document.FromString(bytes(self._buf[first:last]))
+        # When characters are interleaved with other fields the slice can
+        # also contain those, but the characters are still exactly [start, end).
+        return partial.characters
+
+    def page_characters(self, page_number: int):
+        """Decode only the characters of the 1-based `page_number`."""
+        page = self.pages[page_number - 1]
+        return self.characters(page.range.start, page.range.end)
+
+    def page_columns(self, page_number: int) -> ColumnarLayouts:
+        """
+        Columnar arrays for a single page.
+
+        The result holds that page only; its range is shifted so that the
+        page's first character is character 0.
+        """
+        page = self.pages[page_number - 1]
+        doc = rr_pb2.Document()
+        doc.characters.extend(self.page_characters(page_number))
+        only_page = doc.pages.add()
+        only_page.CopyFrom(page)
+        only_page.range.start = 0
+        only_page.range.end = len(doc.characters)
+        return ColumnarLayouts.from_document(doc)
+
+    def count(self, field: str) -> int:
+        """Number of entries in one of the other repeated fields, e.g. `'fonts'`."""
+        return len(self._spans[field])
+
+    def iter_field(self, field: str):
+        """Decode the entries of a repeated field such as `'fonts'` one at a time."""
+        message_type = {name: cls for name, cls in _REPEATED_FIELDS.values()}[field]
+        buf = self._buf
+        for start, end in self._spans[field]:
+            _, payload = _read_varint(buf, start)
+            yield message_type.FromString(bytes(buf[payload:end]))
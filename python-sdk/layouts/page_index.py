@@ -0,0 +1,107 @@
+"""
+Character-to-page lookup for layouts.
+
+The tutorial's `get_page_number(char_loc)` scans `doc.pages` from the start for
+every character, so looking up every character of a document costs
+O(characters x pages). `PageIndex` reads the `Page.range.start`/`end` values
+once and then answers:
+
+- single lookups by bisection in O(log pages): `index.page_of(1234)`
+- bulk lookups for a whole array of offsets in one vectorized call:
+  `index.pages_of(offsets)`
+
+Page numbers are 1-based, as in the tutorial.
+"""
+
+import bisect
+
+import numpy as np
+
+import recognition_results_pb2 as rr_pb2
+
+
+class CharacterOutsidePagesError(ValueError):
+    """Raised when a character offset does not fall within any page's range."""
+
+    def __init__(self, offsets):
+        self.offsets = list(offsets)
+        shown = ', '.join(str(o) for o in self.offsets[:10])
+        more = '' if len(self.offsets) <= 10 else f' (+{len(self.offsets) - 10} more)'
+        super().__init__(f'Character location(s) {shown}{more} '
+                         f'do not fall within the range of any pages.')
+
+
+class PageIndex:
+    """Sorted page ranges supporting O(log P) single and vectorized bulk lookups."""
+
+    __slots__ = ('starts', 'ends', '_starts_list', '_ends_list')
+
+    def __init__(self, starts, ends):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        if starts.shape != ends.shape:
+            raise ValueError('Page starts and ends must have the same length.')
+        if np.any(ends < starts):
+            raise ValueError('A page range ends before it starts.')
+        # The end of a page is not inclusive, so the next page may start at
+        # the very same offset, but never before it.
+        if np.any(starts[1:] < ends[:-1]):
+            raise ValueError('Page ranges must be sorted and must not overlap.')
+
+        self.starts = starts
+        self.ends = ends
+        # Plain lists make single bisect lookups cheaper than indexing NumPy.
+        self._starts_list = starts.tolist()
+        self._ends_list = ends.tolist()
+
+    @classmethod
+    def from_document(cls, doc: rr_pb2.Document) -> 'PageIndex':
+        return cls([p.range.start for p in doc.pages],
+                   [p.range.end for p in doc.pages])
+
+    @classmethod
+    def from_ranges(cls, page_ranges) -> 'PageIndex':
+        """Build from a `(P, 2)` array of `start, end` (e.g. `ColumnarLayouts.page_ranges`)."""
+        page_ranges = np.asarray(page_ranges, dtype=np.int64).reshape(-1, 2)
+        return cls(page_ranges[:, 0], page_ranges[:, 1])
+
+    def __len__(self) -> int:
+        return len(self._starts_list)
+
+    def find(self, char_loc: int):
+        """1-based page containing `char_loc`, or `None` when it falls in a gap."""
+        i = bisect.bisect_right(self._starts_list, char_loc) - 1
+        if i >= 0 and char_loc < self._ends_list[i]:
+            return i + 1
+        return None
+
+    def page_of(self, char_loc: int) -> int:
+        """1-based page containing `char_loc`; raises `CharacterOutsidePagesError` otherwise."""
+        page = self.find(char_loc)
+        if page is None:
+            raise CharacterOutsidePagesError([char_loc])
+        return page
+
+    def lookup(self, offsets) -> np.ndarray:
+        """
+        1-based page of every offset in `offsets`, with 0 for offsets in a gap.
+
+        Runs as a single `searchsorted` over the page starts.
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if len(self) == 0:
+            return np.zeros(offsets.shape, dtype=np.int64)
+
+        candidate = np.searchsorted(self.starts, offsets, side='right') - 1
+        clipped = np.clip(candidate, 0, len(self) - 1)
+        inside = (candidate >= 0) & (offsets < self.ends[clipped])
+        return np.where(inside, clipped + 1, 0)
+
+    def pages_of(self, offsets) -> np.ndarray:
+        """Like `lookup`, but raises `CharacterOutsidePagesError` listing every offset in a gap."""
+        offsets = np.asarray(offsets, dtype=np.int64)
+        pages = self.lookup(offsets)
+        missing = pages == 0
+        if missing.any():
+            raise CharacterOutsidePagesError(offsets[missing].tolist())
+        return pages
@@ -0,0 +1,200 @@
+"""
+Font, style, header, footer and table information per character.
+
+Besides characters and pages, a layouts `Document` describes its text with
+lists of character ranges: `fonts`, `font_sizes`, `font_styles`, `headers`
+and `footers`. Tables are described by `tables` (with their page) and
+`table_cells` (with their bounding box). `LayoutSegments` merges all of these
+into one sorted list of segments, i.e. runs of characters that share the same
+font, size, styles, header/footer membership and table:
+
+    segments = LayoutSegments.from_document(doc)
+    segments.at(1234)            # attributes of a single character, O(log n)
+    segments.attributes()        # structured array for every character
+    segments.body_text()         # text without headers, footers and tables
+
+Table cells carry no character range, so a character is considered to be in a
+table cell when the center of its bounding box is inside the cell's box on the
+page of the table with the same `id` as the cell (cells without a matching
+table are looked up on every page). A cell's `id` is the `id` of its table, so
+the `table` attribute of a character is that table's `id`; `Table.page_number`
+is 0-based.
+"""
+
+import collections
+
+import numpy as np
+
+import recognition_results_pb2 as rr_pb2
+from columnar import ColumnarLayouts
+from layout_text import decode_codepoints
+
+CharacterAttributes = collections.namedtuple(
+    'CharacterAttributes',
+    ['font', 'serif', 'monospace', 'font_size', 'bold', 'italic',
+     'header', 'footer', 'table'])
+
+ATTRIBUTES_DTYPE = np.dtype([('font', np.int32), ('font_size', np.uint32),
+                             ('bold', bool), ('italic', bool),
+                             ('header', bool), ('footer', bool),
+                             ('table', np.int64)])
+
+
+def _ranges(messages):
+    starts = np.array([m.range.start for m in messages], dtype=np.int64)
+    ends = np.array([m.range.end for m in messages], dtype=np.int64)
+    return starts, ends
+
+
+class LayoutSegments:
+    """All range-based layouts information merged into one interval structure."""
+
+    def __init__(self, columns: ColumnarLayouts, fonts, font_ranges, font_sizes,
+                 bold, italic, headers, footers, tables):
+        """
+        Build from already extracted ranges; see `from_document`.
+
+        `font_ranges`, `font_sizes` and `tables` are `(starts, ends,
+        values)` triples of non-overlapping ranges (the values of `tables`
+        are table ids); `bold`, `italic`,
+        `headers` and `footers` are `(starts, ends)` pairs that may overlap.
+        `fonts` lists the distinct `(name, serif, monospace)` the values of
+        `font_ranges` index into.
+        """
+        self.columns = columns
+        self.fonts = fonts
+        n = columns.num_characters
+
+        boundaries = [np.array([0, n], dtype=np.int64)]
+        for ranges in (font_ranges, font_sizes, bold, italic, headers, footers, tables):
+            boundaries.extend(ranges[:2])
+        self.bounds = np.unique(np.clip(np.concatenate(boundaries), 0, n))
+        starts = self.bounds[:-1]
+
+        def paint(ranges, default):
+            range_starts, range_ends, values = ranges
+            if not len(range_starts):
+                return np.full(len(starts), default)
+            order = np.argsort(range_starts, kind='stable')
+            range_starts, range_ends, values = range_starts[order], range_ends[order], values[order]
+            i = np.searchsorted(range_starts, starts, side='right') - 1
+            clipped = np.clip(i, 0, len(range_starts) - 1)
+            inside = (i >= 0) & (starts < range_ends[clipped])
+            return np.where(inside, values[clipped], default)
+
+        def cover(ranges):
+            range_starts, range_ends = ranges
+            depth = np.zeros(len(self.bounds), dtype=np.int64)
+            np.add.at(depth, np.searchsorted(self.bounds, np.clip(range_starts, 0, n)), 1)
+            np.add.at(depth, np.searchsorted(self.bounds, np.clip(range_ends, 0, n)), -1)
+            return np.cumsum(depth)[:-1] > 0
+
+        segments = np.empty(len(starts), dtype=ATTRIBUTES_DTYPE)
+        segments['font'] = paint(font_ranges, -1)
+        segments['font_size'] = paint(font_sizes, 0)
+        segments['bold'] = cover(bold)
+        segments['italic'] = cover(italic)
+        segments['header'] = cover(headers)
+        segments['footer'] = cover(footers)
+        segments['table'] = paint(tables, -1)
+        self.segments = segments
+
+    @classmethod
+    def from_document(cls, doc: rr_pb2.Document, columns: ColumnarLayouts = None) -> 'LayoutSegments':
+        columns = columns or ColumnarLayouts.from_document(doc)
+
+        fonts = []
+        font_ids = {}
+        font_values = []
+        for font in doc.fonts:
+            key = (font.name, font.serif, font.monospace)
+            if key not in font_ids:
+                font_ids[key] = len(fonts)
+                fonts.append(key)
+            font_values.append(font_ids[key])
+        font_ranges = _ranges(doc.fonts) + (np.array(font_values, dtype=np.int64),)
+        font_sizes = _ranges(doc.font_sizes) + (
+            np.array([s.size for s in doc.font_sizes], dtype=np.int64),)
+
+        styles = np.array([s.style for s in doc.font_styles], dtype=np.int64)
+        style_starts, style_ends = _ranges(doc.font_styles)
+        bold = (style_starts[styles == rr_pb2.FontStyle.BOLD],
+                style_ends[styles == rr_pb2.FontStyle.BOLD])
+        italic = (style_starts[styles == rr_pb2.FontStyle.ITALIC],
+                  style_ends[styles == rr_pb2.FontStyle.ITALIC])
+
+        table_pages = {table.id: table.page_number for table in doc.tables}
+        tables = cls._table_runs(columns, doc.table_cells, table_pages)
+
+        return cls(columns, fonts, font_ranges, font_sizes, bold, italic,
+                   _ranges(doc.headers), _ranges(doc.footers), tables)
+
+    @staticmethod
+    def _table_runs(columns, cells, table_pages):
+        """`(starts, ends, table ids)` of the runs of characters inside the cells of each table."""
+        table_of = np.full(columns.num_characters, -1, dtype=np.int64)
+        boxes = columns.bboxes.astype(np.int64)
+        center_x = (boxes[:, 0] + boxes[:, 2]) // 2
+        center_y = (boxes[:, 1] + boxes[:, 3]) // 2
+
+        for cell in cells:
+            page = table_pages.get(cell.id)
+            # `page_number` is 0-based, `page_characters` takes 1-based pages.
+            if page is not None and 0 <= page < columns.num_pages:
+                characters = columns.page_characters(page + 1)
+            else:
+                characters = slice(0, columns.num_characters)
+            box = cell.bounding_box
+            inside = ((center_x[characters] >= box.x1) & (center_x[characters] < box.x2) &
+                      (center_y[characters] >= box.y1) & (center_y[characters] < box.y2))
+            table_of[characters][inside] = cell.id
+
+        changes = np.flatnonzero(np.diff(table_of)) + 1
+        run_starts = np.concatenate([[0], changes]) if len(table_of) else changes
+        run_ends = np.concatenate([changes, [len(table_of)]]) if len(table_of) else changes
+        values = table_of[run_starts]
+        in_cell = values >= 0
+        return run_starts[in_cell], run_ends[in_cell], values[in_cell]
+
+    def segment_of(self, offsets):
+        """Index into `segments` of character offset(s)."""
+        return np.searchsorted(self.bounds, offsets, side='right') - 1
+
+    def at(self, offset: int) -> CharacterAttributes:
+        """Everything the layouts say about character `offset`."""
+        if not 0 <= offset < self.columns.num_characters:
+            raise IndexError(f'Character {offset} is not in the document.')
+        segment = self.segments[int(self.segment_of(offset))]
+        font, serif, monospace = self.fonts[segment['font']] \
+            if segment['font'] >= 0 else (None, None, None)
+        return CharacterAttributes(
+            font=font, serif=serif, monospace=monospace,
+            font_size=int(segment['font_size']) or None,
+            bold=bool(segment['bold']), italic=bool(segment['italic']),
+            header=bool(segment['header']), footer=bool(segment['footer']),
+            table=int(segment['table']) if segment['table'] >= 0 else None)
+
+    def attributes(self, offsets=None) -> np.ndarray:
+        """
+        Structured array of the attributes of every character (or of `offsets`).
+
+        For the whole document this is a single `np.repeat` of the segments.
+        The `font` field indexes into `fonts` (-1: none); `font_size` is 0 and
+        `table` is -1 where the layouts do not say.
+        """
+        if offsets is None:
+            return np.repeat(self.segments, np.diff(self.bounds))
+        return self.segments[self.segment_of(np.asarray(offsets, dtype=np.int64))]
+
+    def body_mask(self) -> np.ndarray:
+        """Boolean mask of the characters outside headers, footers and tables."""
+        attributes = self.attributes()
+        return ~attributes['header'] & ~attributes['footer'] & (attributes['table'] < 0)
+
+    def body_characters(self) -> np.ndarray:
+        """Offsets of the characters outside headers, footers and tables."""
+        return np.flatnonzero(self.body_mask())
+
+    def body_text(self) -> str:
+        """Text of the document without its headers, footers and tables."""
+        return decode_codepoints(self.columns.codepoints[self.body_mask()])
@@ -0,0 +1,189 @@
+"""
+Spatial index over the character bounding boxes of each page.
+
+Mapping a click or a selection in a document viewer back to characters used
+to mean comparing the `bounding_box` of every `Character` in `doc.characters`.
+`SpatialIndex` buckets each page's characters into a uniform grid laid over
+the page's `width` x `height`, so a query only looks at the characters in
+the grid cells it touches:
+
+    index = SpatialIndex(ColumnarLayouts.from_document(doc))
+    index.intersecting(page_number=1, x1=2180, y1=150, x2=2430, y2=200)
+    index.nearest(page_number=1, x=2200, y=175)
+    index.span_characters(character_start=0, character_end=13)
+
+Grids are built the first time a page is queried. All character numbers are
+offsets into the document's characters, as used by `Page.range` and the
+`character_start`/`character_end` of extraction results.
+"""
+
+import numpy as np
+
+from columnar import ColumnarLayouts
+from page_index import CharacterOutsidePagesError
+
+# Aim for a few characters per cell: each cell spans this many median-sized
+# characters in both directions.
+CHARACTERS_PER_CELL = 4
+
+
+class PageGrid:
+    """Uniform grid over one page, storing its characters in CSR form per cell."""
+
+    def __init__(self, bboxes: np.ndarray, first_character: int,
+                 width: int, height: int):
+        self.first_character = first_character
+        self.bboxes = bboxes.astype(np.int64)
+
+        if len(bboxes):
+            char_width = np.median(self.bboxes[:, 2] - self.bboxes[:, 0])
+            char_height = np.median(self.bboxes[:, 3] - self.bboxes[:, 1])
+        else:
+            char_width = char_height = 1
+        self.cell_width = max(int(char_width * CHARACTERS_PER_CELL), 1)
+        self.cell_height = max(int(char_height * CHARACTERS_PER_CELL), 1)
+
+        # Characters outside of the stated page size still need a home, so
+        # the grid grows to cover them.
+        if len(bboxes):
+            width = max(width, int(self.bboxes[:, 2].max()) + 1)
+            height = max(height, int(self.bboxes[:, 3].max()) + 1)
+        self.columns = max(-(-width // self.cell_width), 1)
+        self.rows = max(-(-height // self.cell_height), 1)
+
+        cx1, cy1, cx2, cy2 = self._cells(self.bboxes)
+        spans_x = cx2 - cx1 + 1
+        spans_y = cy2 - cy1 + 1
+        counts = spans_x * spans_y
+
+        # One (cell, character) pair for every cell a character overlaps.
+        # Most characters fit in one cell, so this is barely larger than N.
+        items = np.repeat(np.arange(len(bboxes), dtype=np.int64), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(cy1, counts) + within // np.repeat(spans_x, counts)
+        cols = np.repeat(cx1, counts) + within % np.repeat(spans_x, counts)
+        cells = rows * self.columns + cols
+
+        order = np.argsort(cells, kind='stable')
+        self.items = items[order]
+        self.cell_starts = np.searchsorted(cells[order],
+                                           np.arange(self.rows * self.columns + 1))
+
+    def _cells(self, boxes):
+        cx1 = np.clip(boxes[..., 0] // self.cell_width, 0, self.columns - 1)
+        cy1 = np.clip(boxes[..., 1] // self.cell_height, 0, self.rows - 1)
+        cx2 = np.clip(boxes[..., 2] // self.cell_width, 0, self.columns - 1)
+        cy2 = np.clip(boxes[..., 3] // self.cell_height, 0, self.rows - 1)
+        return cx1, cy1, cx2, cy2
+
+    def _candidates(self, cx1, cy1, cx2, cy2) -> np.ndarray:
+        rows = np.arange(cy1, cy2 + 1)
+        firsts = rows * self.columns + cx1
+        starts = self.cell_starts[firsts]
+        ends = self.cell_starts[firsts + (cx2 - cx1) + 1]
+        # Cells of one grid row are adjacent in `items`, so every row is a
+        # single contiguous slice.
+        if len(rows) == 1:
+            return self.items[starts[0]:ends[0]]
+        return np.concatenate([self.items[s:e] for s, e in zip(starts, ends)])
+
+    def intersecting(self, x1, y1, x2, y2) -> np.ndarray:
+        x1, x2 = sorted((int(x1), int(x2)))
+        y1, y2 = sorted((int(y1), int(y2)))
+        cx1, cy1, cx2, cy2 = (int(v) for v in self._cells(np.array([x1, y1, x2, y2])))
+        candidates = np.unique(self._candidates(cx1, cy1, cx2, cy2))
+        boxes = self.bboxes[candidates]
+        hit = ((boxes[:, 0] <= x2) & (boxes[:, 2] >= x1) &
+               (boxes[:, 1] <= y2) & (boxes[:, 3] >= y1))
+        return candidates[hit] + self.first_character
+
+    def nearest(self, x, y):
+        """`(character, distance)` of the character box closest to the point, or `None`."""
+        if not len(self.items):
+            return None
+        col = min(max(int(x) // self.cell_width, 0), self.columns - 1)
+        row = min(max(int(y) // self.cell_height, 0), self.rows - 1)
+        step = min(self.cell_width, self.cell_height)
+        best = None
+
+        # Search rings of cells around the point's cell. A character in ring
+        # r is at least (r - 1) cells away, which bounds when to stop.
+        for ring in range(max(self.columns, self.rows) + 1):
+            if best is not None and (ring - 1) * step > best[1]:
+                break
+            cx1, cx2 = max(col - ring, 0), min(col + ring, self.columns - 1)
+            cy1, cy2 = max(row - ring, 0), min(row + ring, self.rows - 1)
+            candidates = np.unique(self._candidates(cx1, cy1, cx2, cy2))
+            if not len(candidates):
+                continue
+            boxes = self.bboxes[candidates]
+            dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0)
+            dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0)
+            distances = np.hypot(dx, dy)
+            i = int(np.argmin(distances))
+            if best is None or distances[i] < best[1]:
+                best = (int(candidates[i]) + self.first_character, float(distances[i]))
+        return best
+
+
+class SpatialIndex:
+    """Per-page grids over the character bounding boxes of a document."""
+
+    def __init__(self, columns: ColumnarLayouts):
+        self.columns = columns
+        self._grids = {}
+
+    def page(self, page_number: int) -> PageGrid:
+        """The grid of the 1-based `page_number`, built on first use."""
+        grid = self._grids.get(page_number)
+        if grid is None:
+            characters = self.columns.page_characters(page_number)
+            width, height = (int(v) for v in self.columns.page_sizes[page_number - 1])
+            grid = PageGrid(self.columns.bboxes[characters], characters.start,
+                            width, height)
+            self._grids[page_number] = grid
+        return grid
+
+    def intersecting(self, page_number: int, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """Sorted offsets of the characters whose box intersects the rectangle, in page pixels."""
+        return self.page(page_number).intersecting(x1, y1, x2, y2)
+
+    def nearest(self, page_number: int, x: int, y: int):
+        """`(character, distance in pixels)` of the character closest to the point, or `None`."""
+        return self.page(page_number).nearest(x, y)
+
+    def span_characters(self, character_start: int, character_end: int) -> dict:
+        """
+        Characters inside the box of a span, per page.
+
+        For every page the span `[character_start, character_end)` touches,
+        the bounding box of the span's characters on that page is computed and
+        all characters intersecting that box are returned, keyed by page
+        number. This includes characters of neighbouring lines or columns that
+        overlap the span's box, which is what a viewer highlighting that box
+        shows the user.
+
+        Characters of the span in a gap between pages are left out; if none
+        of its characters are on a page, `CharacterOutsidePagesError` is
+        raised.
+        """
+        result = {}
+        if character_end <= character_start:
+            return result
+        # The pages overlapping the span. Ends of the span that fall in a gap
+        # between pages are clamped to the nearest page the span covers.
+        index = self.columns.page_index()
+        first = int(np.searchsorted(index.ends, character_start, side='right')) + 1
+        last = int(np.searchsorted(index.starts, character_end, side='left'))
+        for page_number in range(first, last + 1):
+            page = self.columns.page_characters(page_number)
+            start, end = max(page.start, character_start), min(page.stop, character_end)
+            if start >= end:
+                continue
+            boxes = self.columns.bboxes[start:end]
+            result[page_number] = self.intersecting(
+                page_number, boxes[:, 0].min(), boxes[:, 1].min(),
+                boxes[:, 2].max(), boxes[:, 3].max())
+        if not result:
+            raise CharacterOutsidePagesError([character_start, character_end - 1])
+        return result
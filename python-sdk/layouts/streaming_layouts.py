@@ -0,0 +1,354 @@
+"""
+Decoding layouts while they download.
+
+`sdk.ocr.get_layouts(request_id=...).response.content` holds the whole
+serialized `Document` in memory before `ParseFromString` even starts, and
+the parsed message tree is several times bigger again; only then can
+`ColumnarLayouts.from_document` copy it into arrays. For a large filing the
+first page is available only after the download, the parse and the copy,
+and the peak memory is a multiple of the layouts' size.
+
+`LayoutsDecoder` is fed the response body as it arrives instead. As soon as
+a run of complete `characters` entries has been received, it decodes them
+straight into the character arrays of a `ColumnarLayouts`, with array
+operations on the raw bytes rather than through `Character` messages (which
+it only falls back to for entries with unexpected fields). Besides the
+arrays, only a batch of undecoded bytes is ever held in memory.
+`stream_layouts` downloads and decodes the layouts of an OCR request this
+way:
+
+    columns = stream_layouts(url, token, ocr_request.id,
+                             on_page=lambda number, columns: print(number))
+
+`on_page` is called for every page as soon as it and its characters have
+been decoded. The serializers write all the characters before the pages,
+so the pages themselves come at the end of the body, but by then all of
+the characters have been decoded, overlapping with the download.
+
+`download_layouts` streams the body to a file instead, to be opened with
+`LazyDocument.open` without ever holding it in memory.
+"""
+
+import numpy as np
+import requests
+from google.protobuf.message import DecodeError
+
+import recognition_results_pb2 as rr_pb2
+from columnar import CODEPOINT_DTYPE, COORD_DTYPE, ColumnarLayouts, pack_characters
+from lazy_layouts import (_CHARACTER_KEY, _FIELD_PAGES, _WIRE_FIXED32, _WIRE_FIXED64,
+                          _WIRE_LENGTH_DELIMITED, _WIRE_VARINT, _read_varint)
+
+# Bytes of the response body read at a time.
+CHUNK_SIZE = 256 << 10
+
+# Bytes of the character entries decoded at a time.
+_BATCH_SIZE = 256 << 10
+
+# Keys of the `Character` and `BoundingBox` fields, and their column in the
+# array returned by `pack_characters`.
+_CHARACTER_COLUMNS = {(1 << 3) | _WIRE_VARINT: 0, (2 << 3) | _WIRE_VARINT: 1}
+_BOUNDING_BOX_KEY = (3 << 3) | _WIRE_LENGTH_DELIMITED
+_BOUNDING_BOX_COLUMNS = {(field << 3) | _WIRE_VARINT: column
+                         for field, column in ((1, 2), (2, 3), (3, 4), (4, 5))}
+# The same, as a lookup table of the keys outside and inside a bounding box.
+_COLUMNS = np.full(128, -1, dtype=np.int8)
+for _key, _column in _CHARACTER_COLUMNS.items():
+    _COLUMNS[_key] = _column
+for _key, _column in _BOUNDING_BOX_COLUMNS.items():
+    _COLUMNS[64 + _key] = _column
+
+# Size of a serialized `characters` entry, to size the arrays from the
+# Content-Length: one-byte codepoints with two-byte coordinates take 17.
+_BYTES_PER_CHARACTER = 17
+
+
+def _field_end(buf, pos: int, wire_type: int):
+    """End of the field whose value starts at `pos`, or `None` if it has not all arrived yet."""
+    end = len(buf)
+    try:
+        if wire_type == _WIRE_VARINT:
+            return _read_varint(buf, pos)[1]
+        if wire_type == _WIRE_LENGTH_DELIMITED:
+            length, pos = _read_varint(buf, pos)
+            pos += length
+        elif wire_type == _WIRE_FIXED64:
+            pos += 8
+        elif wire_type == _WIRE_FIXED32:
+            pos += 4
+        else:
+            raise DecodeError(f'Unsupported wire type {wire_type} in layouts.')
+    except DecodeError:
+        if wire_type in (_WIRE_VARINT, _WIRE_LENGTH_DELIMITED):
+            return None
+        raise
+    return pos if pos <= end else None
+
+
+def _decode_varints(data: np.ndarray):
+    """Values, start offsets and end offsets of the complete varints in `data`."""
+    ends = np.flatnonzero(data < 0x80) + 1
+    starts = np.zeros_like(ends)
+    starts[1:] = ends[:-1]
+    values = (data[starts] & 0x7f).astype(np.int64)
+    lengths = ends - starts
+    # Mostly one or two bytes long: a pass for each byte of the longest.
+    for i in range(1, min(int(lengths.max(initial=0)), 9)):
+        longer = np.flatnonzero(lengths > i)
+        values[longer] |= (data[starts[longer] + i] & 0x7f).astype(np.int64) << (7 * i)
+    return values, starts, ends
+
+
+def _unpack_characters(data: np.ndarray):
+    """
+    Decode the complete `characters` entries at the start of `data` with
+    array operations, returning `(packed, size)`: the `(N, 6)` array of
+    `pack_characters` and the bytes they take up.
+
+    Every byte of a `characters` entry is part of a varint (keys, lengths
+    and values), so the entries are a sequence of key/value pairs, the
+    `bounding_box` coming last in each entry. `packed` is `None` if an
+    entry has any other field or layout, for the protobuf parser to decode
+    the `size` bytes instead.
+    """
+    values, starts, ends = _decode_varints(data)
+    pairs = len(values) // 2
+    keys, values = values[0:2 * pairs:2], values[1:2 * pairs:2]
+    key_starts, value_ends = starts[0:2 * pairs:2], ends[1:2 * pairs:2]
+
+    # Past the run of characters the bytes are not necessarily varints, so
+    # only the entries that follow each other from the start are kept.
+    entries = np.flatnonzero(keys == _CHARACTER_KEY)
+    entry_ends = value_ends[entries] + values[entries]
+    complete = (entry_ends <= len(data)) & (values[entries] >= 0)
+    complete[1:] &= key_starts[entries[1:]] == entry_ends[:-1]
+    count = len(entries) if complete.all() else int(np.argmin(complete))
+    if count == 0:
+        return None, 0
+    size = int(entry_ends[count - 1])
+    pairs = int(np.searchsorted(key_starts, size))
+    keys, values, value_ends = keys[:pairs], values[:pairs], value_ends[:pairs]
+    entries, entry_ends = entries[:count], entry_ends[:count]
+
+    character = np.cumsum(keys == _CHARACTER_KEY) - 1
+    is_box = keys == _BOUNDING_BOX_KEY
+    boxes = np.flatnonzero(is_box)
+    seen_boxes = np.cumsum(is_box)
+    in_box = seen_boxes > seen_boxes[entries][character]
+    # At most one bounding box per character, at the end of it.
+    if (np.diff(character[boxes]) <= 0).any() or \
+            (value_ends[boxes] + values[boxes] != entry_ends[character[boxes]]).any():
+        return None, size
+
+    columns = _COLUMNS[np.where((keys >= 0) & (keys < 64), keys, 0) + 64 * in_box]
+    fields = columns >= 0
+    if fields.sum() + count + len(boxes) != pairs:
+        return None, size
+
+    packed = np.zeros((count, 6), dtype=np.uint32)
+    packed[character[fields], columns[fields]] = values[fields]
+    return packed, size
+
+
+class LayoutsDecoder:
+    """Incremental decoder of a serialized layouts `Document` into `ColumnarLayouts` arrays."""
+
+    def __init__(self, expected_size: int = None, on_page=None):
+        """
+        `expected_size` is the size of the serialized layouts, if known (the
+        Content-Length of an uncompressed response), to allocate the
+        character arrays once. `on_page(page_number, columns)` is called with
+        the 1-based number of every page once it is complete, and the
+        `ColumnarLayouts` decoded so far.
+        """
+        capacity = (expected_size or 0) // _BYTES_PER_CHARACTER
+        self._codepoints = np.empty(capacity, dtype=CODEPOINT_DTYPE)
+        self._errors = np.empty(capacity, dtype=np.uint32)
+        self._bboxes = np.empty((capacity, 4), dtype=COORD_DTYPE)
+        self.num_characters = 0
+        # range.start, range.end, width, height, dpi_x and dpi_y of every page.
+        self._pages = []
+        self._pages_reported = 0
+        self.on_page = on_page
+        # Undecoded bytes: at most a partial field at the end of the last chunk.
+        self._buffer = bytearray()
+        # Every other top-level field, as serialized.
+        self._remainder = bytearray()
+        self.bytes_received = 0
+        self.closed = False
+        # Whether views of the arrays have been handed out by `columns()`.
+        self._shared = False
+        self._page_array = np.empty((0, 6), dtype=np.uint32)
+
+    def _reserve(self, size: int):
+        if size <= len(self._codepoints):
+            return
+        size = max(size, len(self._codepoints) * 3 // 2, 1024)
+        self._resize(size)
+
+    def _resize(self, size: int):
+        arrays = {}
+        for name in ('_codepoints', '_errors', '_bboxes'):
+            array = getattr(self, name)
+            shape = (size,) + array.shape[1:]
+            if not self._shared:
+                # Nothing else refers to the array, so it can be resized in
+                # place (`realloc`), which usually avoids a copy.
+                array.resize(shape, refcheck=False)
+            else:
+                resized = np.empty(shape, dtype=array.dtype)
+                count = min(size, self.num_characters)
+                resized[:count] = array[:count]
+                array = resized
+            arrays[name] = array
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self._shared = False
+
+    def _add_characters(self, buf, pos: int) -> int:
+        """Decode the complete `characters` entries at `pos`, returning the bytes they take up."""
+        # Wait for the first entry to arrive before going to the arrays.
+        if _field_end(buf, pos + 1, _WIRE_LENGTH_DELIMITED) is None:
+            return 0
+        data = np.frombuffer(bytes(buf[pos:pos + _BATCH_SIZE]), dtype=np.uint8)
+        packed, size = _unpack_characters(data)
+        if not size and len(buf) - pos > _BATCH_SIZE:
+            # A single entry bigger than a batch.
+            data = np.frombuffer(bytes(buf[pos:]), dtype=np.uint8)
+            packed, size = _unpack_characters(data)
+        if not size:
+            return 0
+        if packed is None:
+            # A run of `characters` entries is itself a serialized `Document`.
+            document = rr_pb2.Document.FromString(data[:size].tobytes())
+            packed = pack_characters(document.characters)
+
+        start = self.num_characters
+        end = start + len(packed)
+        self._reserve(end)
+        self._codepoints[start:end] = packed[:, 0]
+        self._errors[start:end] = packed[:, 1]
+        self._bboxes[start:end] = packed[:, 2:6]
+        self.num_characters = end
+        return size
+
+    def _add_page(self, serialized: bytes):
+        page = rr_pb2.Page.FromString(serialized)
+        self._pages.append((page.range.start, page.range.end,
+                            page.width, page.height, page.dpi_x, page.dpi_y))
+
+    def feed(self, chunk: bytes):
+        """Decode the next bytes of the serialized layouts."""
+        if self.closed:
+            raise ValueError('The layouts decoder is closed.')
+        self.bytes_received += len(chunk)
+        buf = self._buffer
+        buf += chunk
+        pos = 0
+        end = len(buf)
+
+        while pos < end:
+            try:
+                key, value = _read_varint(buf, pos)
+            except DecodeError:
+                break
+
+            if key == _CHARACTER_KEY:
+                size = self._add_characters(buf, pos)
+                if not size:
+                    break
+                pos += size
+                continue
+
+            field_end = _field_end(buf, value, key & 0x7)
+            if field_end is None:
+                break
+            if key == (_FIELD_PAGES << 3) | _WIRE_LENGTH_DELIMITED:
+                _, value = _read_varint(buf, value)
+                self._add_page(bytes(buf[value:field_end]))
+            else:
+                # Version, md5, tables, fonts, headers, ... and unknown fields.
+                self._remainder += buf[pos:field_end]
+            pos = field_end
+
+        del buf[:pos]
+        self._report_pages()
+
+    def _report_pages(self, force: bool = False):
+        if self.on_page is None:
+            self._pages_reported = len(self._pages)
+            return
+        while self._pages_reported < len(self._pages):
+            page_end = self._pages[self._pages_reported][1]
+            if page_end > self.num_characters and not force:
+                break
+            self._pages_reported += 1
+            self.on_page(self._pages_reported, self.columns())
+
+    def columns(self) -> ColumnarLayouts:
+        """The characters and pages decoded so far, as views of the arrays being filled."""
+        n = self.num_characters
+        if len(self._page_array) != len(self._pages):
+            self._page_array = np.array(self._pages, dtype=np.uint32).reshape(-1, 6)
+        pages = self._page_array
+        self._shared = True
+        return ColumnarLayouts(codepoints=self._codepoints[:n], bboxes=self._bboxes[:n],
+                               errors=self._errors[:n],
+                               page_ranges=pages[:, 0:2], page_sizes=pages[:, 2:4],
+                               page_dpi=pages[:, 4:6])
+
+    def close(self) -> ColumnarLayouts:
+        """Finish decoding, returning the `ColumnarLayouts` of the whole document."""
+        if not self.closed:
+            if self._buffer:
+                raise DecodeError('Truncated layouts: a field runs past the end of the body.')
+            self.closed = True
+            # Give the spare capacity back, unless `on_page` has been handed
+            # views of the arrays: then trimming them would take a copy.
+            if not self._shared and len(self._codepoints) != self.num_characters:
+                self._resize(self.num_characters)
+            self._report_pages(force=True)
+        return self.columns()
+
+    def remainder(self) -> rr_pb2.Document:
+        """The `Document` without its characters and pages: version, md5, tables, fonts, ..."""
+        return rr_pb2.Document.FromString(bytes(self._remainder))
+
+
+def open_layouts(url: str, token: str, request_id: str, session=None) -> requests.Response:
+    """
+    Send `GET /files/ocr/{request_id}/layouts`, returning the response
+    without reading its body.
+    """
+    session = session or requests
+    response = session.get(f'{url.rstrip("/")}/files/ocr/{request_id}/layouts',
+                           headers={'Authorization': f'Bearer {token}'}, stream=True)
+    response.raise_for_status()
+    return response
+
+
+def stream_layouts(url: str, token: str, request_id: str, session=None,
+                   chunk_size: int = CHUNK_SIZE, on_page=None) -> ColumnarLayouts:
+    """
+    Download and decode the layouts of the OCR request `request_id` at the
+    same time. `session` is a `requests.Session` (e.g. a `PooledSession`)
+    to send the request with; see `LayoutsDecoder` for `on_page`.
+    """
+    with open_layouts(url, token, request_id, session) as response:
+        expected_size = None
+        if 'Content-Encoding' not in response.headers:
+            expected_size = int(response.headers.get('Content-Length', 0)) or None
+        decoder = LayoutsDecoder(expected_size, on_page)
+        for chunk in response.iter_content(chunk_size):
+            decoder.feed(chunk)
+    return decoder.close()
+
+
+def download_layouts(url: str, token: str, request_id: str, path: str, session=None,
+                     chunk_size: int = CHUNK_SIZE) -> int:
+    """Stream the layouts of the OCR request `request_id` to `path`, returning their size."""
+    size = 0
+    with open_layouts(url, token, request_id, session) as response, open(path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size):
+            f.write(chunk)
+            size += len(chunk)
+    return size
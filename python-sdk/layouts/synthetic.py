@@ -0,0 +1,90 @@
+"""
+Synthetic layouts documents.
+
+Real layouts are only available after running an OCR request against Zuva, so
+the benchmarks in this folder build their input with `make_document` instead
+(and `document_from_text` lays out a given text).
+The generated `Document` mimics the shape of the sample
+`CANADAGOOS-F1Securiti-2152017.PDF` layouts: letter-sized pages at 300 DPI,
+lines of words laid out left to right, top to bottom.
+"""
+
+import random
+
+import recognition_results_pb2 as rr_pb2
+
+PAGE_WIDTH = 2550
+PAGE_HEIGHT = 3300
+DPI = 300
+
+_MARGIN = 130
+_CHAR_WIDTH = 21
+_LINE_HEIGHT = 52
+_GLYPH_HEIGHT = 29
+_WORDS = ('the', 'agreement', 'party', 'shall', 'company', 'of', 'and',
+          'terminate', 'notice', 'confidential', 'information', 'law',
+          'governing', 'section', 'Exhibit', '10.10', 'hereby', 'in', 'to')
+
+
+def _page_text(rng: random.Random, chars_per_page: int) -> str:
+    words = []
+    length = 0
+    while length < chars_per_page:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:chars_per_page]
+
+
+def _add_page(doc: rr_pb2.Document, text: str):
+    start = len(doc.characters)
+    x, y = _MARGIN, _MARGIN
+
+    for ch in text:
+        if x + _CHAR_WIDTH > PAGE_WIDTH - _MARGIN:
+            x = _MARGIN
+            y += _LINE_HEIGHT
+            # Very dense pages start overprinting from the top again
+            # rather than running off the bottom of the page.
+            if y + _GLYPH_HEIGHT > PAGE_HEIGHT - _MARGIN:
+                y = _MARGIN
+        character = doc.characters.add()
+        character.unicode = ord(ch)
+        character.bounding_box.x1 = x
+        character.bounding_box.y1 = y
+        character.bounding_box.x2 = x + _CHAR_WIDTH
+        character.bounding_box.y2 = y + _GLYPH_HEIGHT
+        x += _CHAR_WIDTH
+
+    page = doc.pages.add()
+    page.width = PAGE_WIDTH
+    page.height = PAGE_HEIGHT
+    page.dpi_x = DPI
+    page.dpi_y = DPI
+    page.range.start = start
+    page.range.end = len(doc.characters)
+
+
+def make_document(pages: int = 50, chars_per_page: int = 3000,
+                  seed: int = 0) -> rr_pb2.Document:
+    """
+    Build a `Document` with `pages` pages of `chars_per_page` characters each.
+
+    Characters wrap onto a new line when they would cross the right margin and
+    every page carries the usual width/height/DPI metadata and character range.
+    """
+    rng = random.Random(seed)
+    doc = rr_pb2.Document()
+    doc.version = 1
+    for _ in range(pages):
+        _add_page(doc, _page_text(rng, chars_per_page))
+    return doc
+
+
+def document_from_text(text: str, chars_per_page: int = 3000) -> rr_pb2.Document:
+    """Lay out `text` the same way, `chars_per_page` characters per page."""
+    doc = rr_pb2.Document()
+    doc.version = 1
+    for start in range(0, max(len(text), 1), chars_per_page):
+        _add_page(doc, text[start:start + chars_per_page])
+    return doc
@@ -0,0 +1,23 @@
+import pytest
+from google.protobuf.message import DecodeError
+
+from lazy_layouts import LazyDocument
+from synthetic import make_document
+
+
+def test_truncated_layouts_raise_decode_error():
+    data = make_document(pages=2, chars_per_page=50).SerializeToString()
+    for size in range(len(data)):
+        try:
+            LazyDocument(data[:size])
+        except DecodeError:
+            pass
+
+
+def test_characters_match_the_document():
+    doc = make_document(pages=2, chars_per_page=50)
+    lazy = LazyDocument(doc.SerializeToString())
+    assert lazy.num_pages == 2 and lazy.num_characters == len(doc.characters)
+    assert list(lazy.page_characters(2)) == list(doc.characters[50:100])
+    with pytest.raises(DecodeError):
+        LazyDocument(doc.SerializeToString() + b'\x0a')
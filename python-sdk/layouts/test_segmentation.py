@@ -0,0 +1,41 @@
+from segmentation import LayoutSegments
+from synthetic import document_from_text
+
+
+def document_with_table(page_number):
+    # Two pages with the same text, so the same boxes are on both pages.
+    text = 'Exhibit 10.10 the parties agree'
+    doc = document_from_text(text + text, chars_per_page=len(text))
+    assert len(doc.pages) == 2
+    table = doc.tables.add()
+    table.id = 7
+    table.page_number = page_number
+    cell = doc.table_cells.add()
+    cell.id = 7
+    first = doc.characters[0].bounding_box
+    last = doc.characters[6].bounding_box
+    cell.bounding_box.x1, cell.bounding_box.y1 = first.x1, first.y1
+    cell.bounding_box.x2, cell.bounding_box.y2 = last.x2, last.y2
+    return doc
+
+
+def test_table_on_first_page():
+    doc = document_with_table(page_number=0)
+    segments = LayoutSegments.from_document(doc)
+    second_page = doc.pages[1].range.start
+
+    assert segments.at(0).table == 7
+    assert segments.at(6).table == 7
+    assert segments.at(8).table is None
+    assert segments.at(second_page).table is None
+    assert segments.body_text().startswith(' 10.10')
+
+
+def test_table_on_second_page():
+    doc = document_with_table(page_number=1)
+    segments = LayoutSegments.from_document(doc)
+    second_page = doc.pages[1].range.start
+
+    assert segments.at(0).table is None
+    assert segments.at(second_page).table == 7
+    assert segments.attributes()['table'][second_page:second_page + 7].tolist() == [7] * 7
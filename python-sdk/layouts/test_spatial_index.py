@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from columnar import ColumnarLayouts
+from page_index import CharacterOutsidePagesError
+from spatial_index import SpatialIndex
+
+
+def layouts_with_gaps():
+    # Characters 0-9 come before page 1, 20-24 between pages 1 and 2.
+    n = 35
+    x = (np.arange(n) % 10) * 20
+    y = (np.arange(n) // 10) * 40
+    bboxes = np.stack([x, y, x + 18, y + 30], axis=1)
+    return ColumnarLayouts(codepoints=np.full(n, ord('a')), bboxes=bboxes,
+                           errors=np.zeros(n),
+                           page_ranges=[(10, 20), (25, 35)],
+                           page_sizes=[(300, 300), (300, 300)],
+                           page_dpi=[(300, 300), (300, 300)])
+
+
+def test_span_within_pages():
+    index = SpatialIndex(layouts_with_gaps())
+    result = index.span_characters(15, 30)
+    assert sorted(result) == [1, 2]
+    assert 15 in result[1] and 29 in result[2]
+
+
+def test_span_starting_before_first_page_is_clamped():
+    index = SpatialIndex(layouts_with_gaps())
+    result = index.span_characters(0, 15)
+    assert list(result) == [1]
+    assert set(range(10, 15)) <= set(result[1].tolist())
+
+
+def test_span_ending_in_gap_between_pages_is_clamped():
+    index = SpatialIndex(layouts_with_gaps())
+    assert list(index.span_characters(18, 23)) == [1]
+
+
+def test_span_outside_pages_raises():
+    index = SpatialIndex(layouts_with_gaps())
+    with pytest.raises(CharacterOutsidePagesError):
+        index.span_characters(0, 10)
+    with pytest.raises(CharacterOutsidePagesError):
+        index.span_characters(21, 24)
+    assert index.span_characters(5, 5) == {}
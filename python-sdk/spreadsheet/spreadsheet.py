@@ -51,6 +51,12 @@ import os
 from zdai import ZDAISDK, DocumentClassificationRequest, \
    LanguageClassificationRequest, FieldExtractionRequest
 
+# 'UploadLedger' remembers the files already uploaded to Zuva, so
+# running this tutorial again does not upload the same content twice
+import sys
+sys.path.append('..')
+from zuva_pipeline import FieldCatalog, UploadLedger
+
 
 # ### Get the files
 # 
@@ -72,7 +78,9 @@ docs = [os.path.join(upload_files_directory, f) for f
 # 
 # At this point in the tutorial you have imported the necessary Python packages, as well as loaded the documents that will be sent to Zuva. You should also have a token that was created, as mentioned in the requirements.
 
-sdk = ZDAISDK(url   = 'https://us.app.zuva.ai/api/v2',
+# 'ZUVA_URL' may point to another region, or to a local fake API
+# started with 'python -m zuva_pipeline.fake_server' for offline runs
+sdk = ZDAISDK(url   = os.getenv('ZUVA_URL', 'https://us.app.zuva.ai/api/v2'),
               token = os.getenv('ZUVA_TOKEN'))
 
 
@@ -84,11 +92,11 @@ sdk = ZDAISDK(url   = 'https://us.app.zuva.ai/api/v2',
 # 
 # All Zuva users can utilize the Zuva-maintained AI model catalog in their workflow. These AI models are known as Fields in Zuva: they are used to extract entities, provisions and clauses from legal documents. Zuva is able to extract text written in a non-standard way (i.e. non-templated), which results in an offering that searches based on the AI’s understanding of legal concepts, as opposed to traditional regular expressions and database searches.
 
-fields, _ = sdk.fields.get()
-print(f'Found {len(fields)} fields on region {sdk.url}')
+catalog = FieldCatalog(sdk)
+print(f'Found {len(catalog)} fields on region {sdk.url}')
 
 
-# The `fields` variable contains a reference to all of the Fields available to you. When run, the above will print how many fields were found on the region that you used when creating an instance of the Python SDK.
+# The `catalog` variable contains a reference to all of the Fields available to you. When run, the above will print how many fields were found on the region that you used when creating an instance of the Python SDK. `FieldCatalog` downloads the fields with the sdk function `fields.get` and keeps them in `~/.cache/zuva` for a day, so later runs skip that download. Looking up a field name it does not know (e.g. a custom field created since) makes it download them again.
 # 
 # 
 # ### Submit your documents to Zuva
@@ -98,19 +106,20 @@ print(f'Found {len(fields)} fields on region {sdk.url}')
 # You can submit your documents to Zuva for analysis by running the following:
 
 zuva_files = []
+ledger = UploadLedger(sdk)
 
 for doc in docs:
-    with open(doc, 'rb') as f:
-        file, _ = sdk.file.create(content=f.read())
-        file.name = os.path.basename(doc)
-        zuva_files.append(file)
-        print(f'Submitted "{file.name}" to Zuva. '
-              f'Zuva sees this file as "{file.id}", and will be deleted on {file.expiration}.')
+    file = ledger.upload(doc)
+    zuva_files.append(file)
+    print(f'{"Reused" if file.reused else "Submitted"} "{file.name}" on Zuva. '
+          f'Zuva sees this file as "{file.id}", and will be deleted on {file.expiration}.')
 
 
-# The above will go through all of your documents (from your docs variable) and submit the document to Zuva. This is done by using a function that the sdk exposes: `file.create`, which takes the file content (in this case, `f.read()`). The Zuva response is assigned to a variable named `file`, which contains properties that can be used by you to keep track of this document.
+# The above will go through all of your documents (from your docs variable) and submit the document to Zuva. This is done by `ledger.upload`, which uses a function that the sdk exposes: `file.create`, which takes the file content. The result is assigned to a variable named `file`, which contains properties that can be used by you to keep track of this document.
+# 
+# The three properties used above are: `file.name` (the name of the local file, to make it easier to keep track), `file.id` (the file’s unique identifier) and `file.expiration` (when it will be deleted).
 # 
-# The three properties used above are: `file.name` (set locally to make it easier to keep track), `file.id` (the file’s unique identifier) and `file.expiration` (when it will be deleted).
+# `ledger.upload` records each file’s id and expiration against a SHA-256 hash of the file’s content (in `~/.cache/zuva`). When the same content is uploaded again, whether on a later run or under another file name, the recorded id is reused instead of sending the file again, until Zuva deletes it. Identical files therefore share one `file.id`; their results are collected once, and the spreadsheet gets their rows under each of their names.
 # 
 # These files are loaded in `zuva_files`, which will be used in the next steps to create requests in Zuva.
 # 
@@ -143,14 +152,14 @@ classifications, _ = sdk.classification.create(file_ids = [d.id for d in zuva_fi
 # 
 # ### Choosing the fields
 # 
-# By now you have a variable named `fields` that contain ~1300+ field references. You can filter these using the field names that you would like to use. Below is the list of field names that this tutorial will extract out of your documents, as well as how their unique identifiers (used by the Field Extraction service) are retrieved.
+# By now you have a variable named `catalog` that contains ~1300+ field references. You can look these up using the field names that you would like to use. Below is the list of field names that this tutorial will extract out of your documents, as well as how their unique identifiers (used by the Field Extraction service) are retrieved with `catalog.ids`. Names are matched ignoring case and the difference between straight and curly quotes, and an unknown name raises an error suggesting similar field names.
 
 field_names = ['Title', 'Parties', 'Date',
               'Governing Law', 'Indemnity',
               'Termination for Cause or Breach', 'Termination for Insolvency',
               'Termination for Convenience', '“Confidential Information” Definition']
 
-field_ids = [f.id for f in fields if f.name in field_names]
+field_ids = catalog.ids(field_names)
 
 
 # The `field_ids` variable now contains a `field_id` that represents the fields defined in `field_names`.
@@ -184,8 +193,16 @@ requests.extend(classifications + languages + extractions)
 
 results = {}
 
+# Look-up table from a file's id to its names, so each result is resolved
+# without scanning every file ('catalog.name' does the same for fields).
+# Identical files share one id, so an id can have several names.
+file_names = {}
+for d in zuva_files:
+    file_names.setdefault(d.id, []).append(d.name)
+
 while len(requests) > 0:
-    for request in requests:
+    # Iterate over a copy, as finished requests are removed from 'requests'
+    for request in list(requests):
         print(request.type, request.id, request.status)
         request.update()
         if request.is_finished():
@@ -197,8 +214,7 @@ while len(requests) > 0:
             # Creates the data structure for the file_id if it doesn't already exist
             if request.file_id not in results:
                 results[request.file_id] = {}
-                results[request.file_id]['name'] = [d.name for d in zuva_files
-                                                    if d.id == request.file_id][0]
+                results[request.file_id]['names'] = file_names[request.file_id]
 
             if request.is_type(DocumentClassificationRequest):
                 results[request.file_id]['type'] = request.classification
@@ -211,7 +227,7 @@ while len(requests) > 0:
                 results[request.file_id]['extractions'] = []
 
                 for result in request.get_results():
-                    field_name = [f.name for f in fields if f.id == result.field_id][0]
+                    field_name = catalog.name(result.field_id)
 
                     for span in result.spans:
                         results[request.file_id]['extractions'].append({
@@ -238,7 +254,7 @@ while len(requests) > 0:
 
 # ```json
 # {
-#  "name": "Document.pdf" ,
+#  "names": ["Document.pdf"] ,
 #  "type": "Employment-Related Agt" ,
 #  "is_contract": "Yes" ,
 #  "language": "English" ,
@@ -300,15 +316,16 @@ df_columns = [
 data = []
 
 for file_id, metadata in results.items():
-    filename = metadata.get('name')
     language = metadata.get('language')
     document_type = metadata.get('type')
     is_contract = metadata.get('is_contract')
-    for extraction in metadata.get('extractions'):
-        data.append([filename, language, document_type, is_contract,
-                     extraction.get('field_name'),
-                     extraction.get('page'),
-                     extraction.get('text')])
+    # One set of rows per file name, even when identical files share an id
+    for filename in metadata.get('names'):
+        for extraction in metadata.get('extractions'):
+            data.append([filename, language, document_type, is_contract,
+                         extraction.get('field_name'),
+                         extraction.get('page_start'),
+                         extraction.get('text')])
 
 
 # Using the new data variable, create a `DataFrame`:
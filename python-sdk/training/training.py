@@ -54,9 +54,13 @@ import json
 # 'csv' is used to parse the training data file
 import csv
 
-# 'fuzzysearch' is used to locate annotation text within Zuva's
+# 'UploadLedger' remembers the files already uploaded to Zuva, so
+# running this tutorial again does not upload the same content twice.
+# 'AnnotationLocator' is used to locate annotation text within Zuva's
 # OCRed representation of the documents
-import fuzzysearch
+import sys
+sys.path.append('..')
+from zuva_pipeline import AnnotationLocator, UploadLedger
 
 
 # ### Create an instance of the SDK
@@ -65,7 +69,9 @@ import fuzzysearch
 # 
 # Create an `sdk` instance in the region you will be using. For example, for the United States region and with your token exported as an environment variable called `ZUVA_TOKEN`:
 
-sdk = ZDAISDK(url   = 'https://us.app.zuva.ai/api/v2',
+# 'ZUVA_URL' may point to another region, or to a local fake API
+# started with 'python -m zuva_pipeline.fake_server' for offline runs
+sdk = ZDAISDK(url   = os.getenv('ZUVA_URL', 'https://us.app.zuva.ai/api/v2'),
               token = os.getenv('ZUVA_TOKEN'))
 
 
@@ -95,26 +101,30 @@ with open ('training_examples.csv') as csvfile:
 
 upload_files_directory = 'upload_files'
 
+ledger = UploadLedger(sdk)
+
 for example in training_examples:
     filename = example['file_name']
-    with open(os.path.join(upload_files_directory, filename), 'rb') as file:
-        f, _ = sdk.file.create(content=file.read())
-        example['file_id'] = f.id
-        print(f'Submitted "{filename}" to Zuva. '
-              f'File ID: "{f.id}"')
+    f = ledger.upload(os.path.join(upload_files_directory, filename))
+    example['file_id'] = f.id
+    print(f'{"Reused" if f.reused else "Submitted"} "{filename}" on Zuva. '
+          f'File ID: "{f.id}"')
 
 
 # The above will go through the list of training files and upload each to Zuva, storing the file IDs for later reference. It is important to keep track of the file ID corresponding to each file, since Zuva only has the file content, not the file names.
+# 
+# `ledger.upload` records each file ID against a SHA-256 hash of the file's content (in `~/.cache/zuva`), together with the date Zuva will delete the file. When the same content is uploaded again, whether on a later run or under another file name, the recorded file ID is reused instead of sending the file again, until it expires.
 
 # ### OCR your documents
 # 
 # Prior to training your fields, you must process them using the [Zuva OCR service](https://zuva.ai/documentation/services/using-ocr/).
 # 
-# Start by creating an OCR request for each file:
+# Start by creating an OCR request for each file. `ocr.create` accepts a list of file IDs and returns one request per file, in the same order, so a single call is enough:
 
-for example in training_examples:
-    ocr_requests, _ = sdk.ocr.create(file_ids=[example['file_id']])
-    example['ocr_request'] = ocr_requests[0]
+ocr_requests, _ = sdk.ocr.create(file_ids=[example['file_id'] for example in training_examples])
+
+for example, ocr_request in zip(training_examples, ocr_requests):
+    example['ocr_request'] = ocr_request
 
 
 # Then, use a polling loop to check that all of the requests complete successfully.
@@ -122,7 +132,8 @@ for example in training_examples:
 ocr_waiting = [example['ocr_request'] for example in training_examples]
 
 while len(ocr_waiting) > 0:
-    for request in ocr_waiting:
+    # Iterate over a copy, as finished requests are removed from 'ocr_waiting'
+    for request in list(ocr_waiting):
         print(request.type, request.id, request.status)
         request.update()
         if request.is_finished():
@@ -145,7 +156,7 @@ while len(ocr_waiting) > 0:
 # 
 # For example, if you are building your own document viewer, you would retrieve the documents layouts (see the [layouts tutorial](https://zuva.ai/documentation/tutorials/using-layouts/)) and images, and use them in a viewer such as [spectator](https://github.com/zuvaai/spectator).
 # 
-# In our case, we have already loaded the highlight text from the `training_examples.csv` file, so we just have to figure out where those text strings are located within Zuva's OCRed version of the document. Since there may be small discrepancies between our search string and Zuva's OCRed version of the document, we'll use a fuzzy search to find the string within the OCR text. 
+# In our case, we have already loaded the highlight text from the `training_examples.csv` file, so we just have to figure out where those text strings are located within Zuva's OCRed version of the document. Since there may be small discrepancies between our search string and Zuva's OCRed version of the document, we'll use a fuzzy search to find the string within the OCR text. `AnnotationLocator` returns the closest match, or `None` when no part of the text is within `L_DIST` edits of the annotation. It only compares the annotation with the parts of the text that share enough short substrings with it, which keeps the search fast on long documents. 
 
 # L_DIST sets the "fuzziness" of the search, defined as the maximum Levenshtein distance for a
 # substring of the document to count as a match with the target string
@@ -162,9 +173,12 @@ for example in training_examples:
         continue
     text = example['ocr_request'].get_text()
 
-    matches = fuzzysearch.find_near_matches(example['annotation'], text, max_l_dist=L_DIST)
-    start = matches[0].start
-    end = matches[0].end
+    match = AnnotationLocator(text, max_l_dist=L_DIST).locate(example['annotation'])
+    if match is None:
+        print(example['file_name'], "annotation not found")
+        continue
+    start = match.start
+    end = match.end
 
     print(example['file_name'], start, end)
 
@@ -348,9 +362,8 @@ for vd in validation_details:
 # Now that the field is trained, we can try using it to extract a new document. As usual, we start by uploading the file and creating the extraction request, specifying the field id of our newly trained field.
 
 filename = "NATURADEIN-8KUnschedu-892005.pdf"
-with open(os.path.join(upload_files_directory, filename), 'rb') as file:
-    f, _ = sdk.file.create(content=file.read())
-    file_id = f.id
+f = ledger.upload(os.path.join(upload_files_directory, filename))
+file_id = f.id
 
 [extraction_request], _ = sdk.extraction.create([file_id], [field_id])
 
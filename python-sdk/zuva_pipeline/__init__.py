@@ -0,0 +1,30 @@
+"""
+Building blocks for running the tutorial workflows at scale.
+
+The tutorials in the neighbouring folders show the Zuva API one call at a
+time. The modules in this package wrap the same SDK calls for workloads of
+thousands of documents. To use them from one of the tutorial folders, add the
+`python-sdk` folder to the path first:
+
+    import sys
+    sys.path.append('..')
+    from zuva_pipeline import upload_files
+"""
+
+from .annotation_pool import locate_annotations, locate_in_pool
+from .annotations import AnnotationLocator, AnnotationMatch
+from .async_client import AsyncFile, AsyncRequest, AsyncZDAISDK
+from .export import RowExporter
+from .field_catalog import FieldCatalog
+from .file_stream import ChecksumMismatch, FileStream, upload_stream
+from .ledger import LedgerFile, UploadLedger, content_sha256
+from .planner import OCR, SubmissionPlanner
+from .result_cache import CachedRequest, CachingSubmitter, ResultCache
+from .results import COLUMNS, ExtractionRow, ResultAssembler
+from .retry import call_with_retries, call_with_retries_async, is_transient
+from .throttle import AIMDController, Throttle, TokenBucket
+from .tracker import RequestTracker
+from .training_pipeline import PipelineResult, TrainingPipeline
+from .transport import PooledSession, SDKRequestsPatch, TransportMetrics, patch_sdk_requests, \
+    use_session
+from .uploads import iter_uploads, upload_file, upload_files
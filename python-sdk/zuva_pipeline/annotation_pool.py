@@ -0,0 +1,133 @@
+"""
+Locating training annotations on all cores.
+
+Finding the annotations of a training set in the OCR text of its documents is
+CPU-bound, and `training.py` does it one document after the other on a
+single core. `locate_annotations` spreads the documents over a process pool
+instead. The OCR text is not pickled to the workers: it is written once to a
+`multiprocessing.shared_memory` block, and each task only carries the offset
+and length of its document in it. The results come back in the
+`annotations_dict` shape that `training.py` turns into the training request:
+
+    texts = {example['file_id']: example['ocr_request'].get_text()
+             for example in training_examples}
+    annotations_dict, missing = locate_annotations(
+        texts, [(example['file_id'], example['annotation'])
+                for example in training_examples], max_l_dist=L_DIST)
+
+As in `training.py`, a file with an empty annotation is kept with no
+locations (a negative example), and annotations that cannot be found are
+left out of `annotations_dict` and returned in `missing`.
+"""
+
+import concurrent.futures
+import os
+import sys
+from multiprocessing import shared_memory
+
+from .annotations import AnnotationLocator
+
+# Documents per task sent to a worker.
+DEFAULT_CHUNKSIZE = 8
+
+_shared = None
+
+
+def _attach(name: str):
+    global _shared
+    _shared = shared_memory.SharedMemory(name=name)
+
+
+def _match(text, annotations, max_l_dist):
+    locator = AnnotationLocator(text, max_l_dist=max_l_dist)
+    return [None if match is None else (match.start, match.end)
+            for match in locator.locate_all(annotations)]
+
+
+def _locate(task):
+    offset, length, annotations, max_l_dist = task
+    text = bytes(_shared.buf[offset:offset + length]).decode('utf-8', 'surrogatepass')
+    return _match(text, annotations, max_l_dist)
+
+
+def _locate_block(name, length, annotations, max_l_dist):
+    # The block belongs to the process that created it, which unlinks it.
+    if sys.version_info >= (3, 13):
+        block = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        block = shared_memory.SharedMemory(name=name)
+    try:
+        text = bytes(block.buf[:length]).decode('utf-8', 'surrogatepass')
+    finally:
+        block.close()
+    return _match(text, annotations, max_l_dist)
+
+
+def locate_in_pool(pool: concurrent.futures.ProcessPoolExecutor, text: str, annotations,
+                   max_l_dist: int = 5) -> list:
+    """
+    Locate the `annotations` of one document on `pool`, e.g. as its text
+    becomes available. The text goes to the worker through its own shared
+    memory block rather than being pickled.
+
+    Returns `(start, end)` for every annotation, or `None` where it was not found.
+    """
+    content = text.encode('utf-8', 'surrogatepass')
+    length = len(content)
+    block = shared_memory.SharedMemory(create=True, size=max(length, 1))
+    try:
+        block.buf[:length] = content
+        del content
+        return pool.submit(_locate_block, block.name, length, annotations, max_l_dist).result()
+    finally:
+        block.close()
+        block.unlink()
+
+
+def locate_annotations(texts, annotations, max_l_dist: int = 5, max_workers: int = None,
+                       chunksize: int = DEFAULT_CHUNKSIZE):
+    """
+    Locate `(file_id, annotation)` pairs in `texts` (`{file_id: OCR text}`) on a process pool.
+
+    Returns `(annotations_dict, missing)`: `{file_id: [{'start': ..., 'end': ...}]}`
+    in the order the files first appear in `annotations`, and the
+    `(file_id, annotation)` pairs that were not found within `max_l_dist` edits.
+    """
+    annotations_dict = {}
+    by_file = {}
+    for file_id, annotation in annotations:
+        annotations_dict.setdefault(file_id, [])
+        if annotation:
+            by_file.setdefault(file_id, []).append(annotation)
+
+    encoded = {file_id: texts[file_id].encode('utf-8', 'surrogatepass') for file_id in by_file}
+    size = sum(len(content) for content in encoded.values())
+    shared = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        tasks = []
+        offset = 0
+        for file_id, content in encoded.items():
+            shared.buf[offset:offset + len(content)] = content
+            tasks.append((offset, len(content), by_file[file_id], max_l_dist))
+            offset += len(content)
+        del encoded
+
+        missing = []
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count(),
+                initializer=_attach, initargs=(shared.name,)) as pool:
+            for file_id, matches in zip(by_file, pool.map(_locate, tasks, chunksize=chunksize)):
+                for annotation, match in zip(by_file[file_id], matches):
+                    if match is None:
+                        missing.append((file_id, annotation))
+                    else:
+                        annotations_dict[file_id].append({'start': match[0], 'end': match[1]})
+    finally:
+        shared.close()
+        shared.unlink()
+
+    # A file whose only annotations were not found is not a negative example.
+    for file_id in by_file:
+        if not annotations_dict[file_id]:
+            del annotations_dict[file_id]
+    return annotations_dict, missing
@@ -0,0 +1,224 @@
+"""
+Locating training annotations in the OCR text of a document.
+
+`training.py` finds each annotation of `training_examples.csv` with
+
+    matches = fuzzysearch.find_near_matches(annotation, text, max_l_dist=5)
+    start = matches[0].start
+
+which compares the annotation against every position of the document, so it
+gets slow on long contracts with annotations of a few hundred characters,
+and raises `IndexError` when there is no match. `AnnotationLocator` indexes
+the q-grams (substrings of `q` characters) of the text once. For each
+annotation it only verifies the places that share enough q-grams with it:
+
+- an occurrence with at most `k` edits keeps at least
+  `len(annotation) - q + 1 - k * q` of the annotation's q-grams unchanged,
+  all of them on diagonals (text position minus annotation position) within
+  `k` of each other, so only windows of `k + 1` diagonals reaching that
+  many q-gram hits can contain a match;
+- each such window is verified with an edit distance computed only in the
+  band of diagonals around it.
+
+Text and annotations are compared exactly as given, like `fuzzysearch`.
+An annotation of at most `max_l_dist` characters is within that many edits
+of any part of the text, so no filter applies and a fuzzy match would mean
+nothing: only its first exact occurrence is returned, if there is one.
+
+    locator = AnnotationLocator(ocr_request.get_text(), max_l_dist=5)
+    match = locator.locate(annotation)      # None if there is no match
+    if match is not None:
+        print(match.start, match.end, match.distance, match.score)
+"""
+
+import dataclasses
+
+import numpy as np
+
+DEFAULT_Q = 4
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+@dataclasses.dataclass(slots=True)
+class AnnotationMatch:
+    """Best occurrence of an annotation: `text[start:end]`, `distance` edits away from it."""
+
+    start: int
+    end: int
+    distance: int
+    # 1 for an exact match, down to 0 when every character had to be edited.
+    score: float
+
+
+def _codepoints(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+
+
+def _qgram_keys(codes: np.ndarray, q: int) -> np.ndarray:
+    """A 64-bit hash of every q-gram of `codes`; collisions only add candidates."""
+    count = len(codes) - q + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint64)
+    keys = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for i in range(q):
+            keys = keys * _HASH_MULTIPLIER + codes[i:i + count].astype(np.uint64)
+    return keys
+
+
+class AnnotationLocator:
+    """Fuzzy search of many annotations in one document, through a q-gram index of its text."""
+
+    def __init__(self, text: str, max_l_dist: int = 5, q: int = DEFAULT_Q):
+        """
+        `max_l_dist` is the largest Levenshtein distance of a match, like in
+        `fuzzysearch.find_near_matches`. Shorter q-grams are used for
+        annotations too short for `q` to filter anything.
+        """
+        self.text = text
+        self.max_l_dist = max_l_dist
+        self.q = q
+        self._codes = _codepoints(text)
+        # q -> (sorted q-gram keys, text position of each)
+        self._indexes = {}
+
+    def _index(self, q: int):
+        index = self._indexes.get(q)
+        if index is None:
+            keys = _qgram_keys(self._codes, q)
+            order = np.argsort(keys, kind='stable')
+            index = self._indexes[q] = (keys[order], order)
+        return index
+
+    def _filter_q(self, length: int):
+        """The largest q-gram length (at most `q`) leaving a positive q-gram threshold."""
+        k = self.max_l_dist
+        for q in range(self.q, 0, -1):
+            threshold = length - q + 1 - k * q
+            if threshold > 0:
+                return q, threshold
+        return None, 0
+
+    def candidates(self, annotation: str):
+        """
+        Ranges of diagonals `(first, last)` that may contain a match.
+
+        A match starting at text position `s` lies on diagonals close to `s`.
+        """
+        k = self.max_l_dist
+        n = len(self._codes)
+        q, threshold = self._filter_q(len(annotation))
+        if q is None:
+            # Too short to filter: every position is a candidate.
+            return [(-k, n)]
+
+        sorted_keys, positions = self._index(q)
+        pattern_keys = _qgram_keys(_codepoints(annotation), q)
+        lefts = np.searchsorted(sorted_keys, pattern_keys, side='left')
+        rights = np.searchsorted(sorted_keys, pattern_keys, side='right')
+        counts = rights - lefts
+        total = int(counts.sum())
+        if total < threshold:
+            return []
+
+        # Every (annotation q-gram, text occurrence) pair votes for its diagonal.
+        offsets = np.repeat(np.arange(len(pattern_keys)), counts)
+        hits = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) \
+            + np.repeat(lefts, counts)
+        diagonals = positions[hits] - offsets + len(pattern_keys)
+        votes = np.bincount(diagonals, minlength=n + len(pattern_keys) + 1)
+
+        # Hits per window of k + 1 consecutive diagonals, by first diagonal.
+        cumulative = np.concatenate(([0], np.cumsum(votes)))
+        window = cumulative[k + 1:] - cumulative[:-(k + 1)]
+        starts = np.flatnonzero(window >= threshold)
+        if not len(starts):
+            return []
+
+        breaks = np.flatnonzero(np.diff(starts) > 1)
+        firsts = np.concatenate(([starts[0]], starts[breaks + 1])) - len(pattern_keys)
+        lasts = np.concatenate((starts[breaks], [starts[-1]])) - len(pattern_keys) + k
+        return list(zip(firsts.tolist(), lasts.tolist()))
+
+    def _verify(self, annotation: str, first: int, last: int):
+        """
+        Best alignment of `annotation` with diagonals in `[first - k, last + k]`.
+
+        Banded semi-global edit distance: the alignment may start and end
+        anywhere in the text, but only the cells of the band are computed.
+        Returns `(distance, start, end)`, or None when nothing is within `k`.
+        """
+        k = self.max_l_dist
+        text = self.text
+        n = len(text)
+        low = max(first - k, -len(annotation))
+        high = min(last + k, n)
+        width = high - low + 1
+        infinity = len(annotation) + width + 1
+
+        # Row i, column c holds the cell of annotation[:i] ending at text
+        # position i + low + c, with the start of its best alignment.
+        distances = [0 if 0 <= low + c <= n else infinity for c in range(width)]
+        starts = [low + c for c in range(width)]
+        for i, char in enumerate(annotation, 1):
+            new_distances = [infinity] * width
+            new_starts = [0] * width
+            for c in range(width):
+                j = i + low + c
+                if j < 0 or j > n:
+                    continue
+                # Substitution or match, from (i - 1, j - 1): same diagonal.
+                best = distances[c] + (0 if j >= 1 and text[j - 1] == char else 1) \
+                    if j >= 1 else infinity
+                start = starts[c]
+                # Annotation character missing from the text, from (i - 1, j).
+                if c + 1 < width and distances[c + 1] + 1 < best:
+                    best = distances[c + 1] + 1
+                    start = starts[c + 1]
+                # Extra text character, from (i, j - 1).
+                if c > 0 and new_distances[c - 1] + 1 < best:
+                    best = new_distances[c - 1] + 1
+                    start = new_starts[c - 1]
+                new_distances[c] = best
+                new_starts[c] = start
+            distances, starts = new_distances, new_starts
+
+        best = None
+        for c in range(width):
+            end = len(annotation) + low + c
+            if distances[c] <= k and 0 <= end <= n:
+                found = (distances[c], starts[c], end)
+                if best is None or found < best:
+                    best = found
+        return best
+
+    def locate(self, annotation: str):
+        """
+        The best match of `annotation`: the fewest edits, then the earliest.
+
+        Returns an `AnnotationMatch`, or None when no part of the text is
+        within `max_l_dist` edits of it, or when an annotation of at most
+        `max_l_dist` characters does not occur exactly.
+        """
+        if not annotation:
+            return None
+        if len(annotation) <= self.max_l_dist:
+            # Every position is within `max_l_dist` edits: rather than an
+            # edit distance over the whole text, only look for it as is.
+            start = self.text.find(annotation)
+            if start < 0:
+                return None
+            return AnnotationMatch(start, start + len(annotation), 0, 1.0)
+        best = None
+        for first, last in self.candidates(annotation):
+            found = self._verify(annotation, first, last)
+            if found is not None and (best is None or found < best):
+                best = found
+        if best is None:
+            return None
+        distance, start, end = best
+        return AnnotationMatch(start, end, distance, 1 - distance / len(annotation))
+
+    def locate_all(self, annotations) -> list:
+        """`locate` for every annotation, sharing the index of the text."""
+        return [self.locate(annotation) for annotation in annotations]
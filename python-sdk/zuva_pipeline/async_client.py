@@ -0,0 +1,404 @@
+"""
+An asyncio client for the Zuva API.
+
+The SDK's calls block, so an asyncio service has to run every one of them in
+an executor thread: thousands of documents in flight mean thousands of
+blocked threads, or a queue in front of a small pool. `AsyncZDAISDK` has the
+same surface as the part of `ZDAISDK` used by the tutorials, with every call
+awaitable, on top of an `aiohttp.ClientSession` (`pip install aiohttp`). One
+event loop drives all the uploads, creates, polls and downloads over a
+bounded pool of keep-alive connections:
+
+    async with AsyncZDAISDK(url=url, token=token) as sdk:
+        file, _ = await sdk.file.create(content=content)
+        [ocr_request], _ = await sdk.ocr.create(file_ids=[file.id])
+        await ocr_request.wait()
+        if ocr_request.is_successful():
+            text = await ocr_request.get_text()
+
+Calls return `(result, response)` like the SDK's, and requests have the
+SDK's `update()`, `is_finished()`, `is_successful()`, `is_type()`,
+`get_results()` and `get_text()`, as coroutines where they call the API.
+The results of an extraction request are downloaded by the `update()` that
+sees it succeed, so `get_results()` returns them without a call, as
+`ResultAssembler` expects. `as_completed` waits for many requests at once,
+polling each on its own backoff schedule like `RequestTracker`:
+
+    async for request in as_completed(classifications + languages + extractions):
+        for row in assembler.add(request):
+            ...
+
+Transient failures (connection errors, timeouts, 429 and 5xx) are retried
+with backoff; other errors raise `requests.HTTPError`, as `retry.py` expects.
+"""
+
+import asyncio
+import dataclasses
+import json
+import os
+import types
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .planner import OCR
+from .results import CLASSIFICATION, EXTRACTION, LANGUAGE, REQUEST_CLASSES
+from .retry import call_with_retries_async
+
+TRAINING = 'training'
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_MAX_POLLS = 64
+
+_PATHS = {
+    OCR: '/files/ocr',
+    LANGUAGE: '/files/language',
+    CLASSIFICATION: '/files/classification',
+    EXTRACTION: '/extraction',
+}
+
+
+def _namespace(value):
+    """JSON as attributes: `{'field_id': ...}` becomes `.field_id`."""
+    if isinstance(value, dict):
+        return types.SimpleNamespace(**{key.replace('-', '_'): _namespace(item)
+                                        for key, item in value.items()})
+    if isinstance(value, list):
+        return [_namespace(item) for item in value]
+    return value
+
+
+def _results(payload: dict) -> list:
+    """Extraction results in the SDK's shape: one result per extraction, with its spans."""
+    results = []
+    for result in payload.get('results', []):
+        for extraction in result.get('extractions') or []:
+            spans = [types.SimpleNamespace(start=span.get('start'), end=span.get('end'),
+                                           page_start=span.get('pages', {}).get('start'),
+                                           page_end=span.get('pages', {}).get('end'))
+                     for span in extraction.get('spans', [])]
+            results.append(types.SimpleNamespace(field_id=result['field_id'],
+                                                 text=extraction.get('text'), spans=spans))
+    return results
+
+
+@dataclasses.dataclass(slots=True)
+class AsyncFile:
+    """An uploaded file, like the SDK's `File`."""
+
+    id: str
+    expiration: str = None
+    attributes: dict = None
+    permissions: list = None
+    name: str = None
+
+
+class AsyncRequest:
+    """An OCR, language, classification, extraction or training request."""
+
+    def __init__(self, sdk: 'AsyncZDAISDK', service: str, path: str, attributes: dict):
+        self._sdk = sdk
+        self._path = path
+        self.service = service
+        self.id = attributes['request_id']
+        self.file_id = attributes.get('file_id')
+        self.status = None
+        self._results = None
+        self._updated = False
+        self._set(attributes)
+
+    def _set(self, attributes: dict):
+        for key, value in attributes.items():
+            if key != 'request_id':
+                setattr(self, key, _namespace(value))
+
+    def __repr__(self) -> str:
+        return f'<AsyncRequest {self.service} {self.id} {self.status}>'
+
+    def is_type(self, cls) -> bool:
+        return REQUEST_CLASSES.get(self.service) is cls
+
+    def is_finished(self) -> bool:
+        return self.status in ('complete', 'failed')
+
+    def is_successful(self) -> bool:
+        return self.status == 'complete'
+
+    def is_failed(self) -> bool:
+        return self.status == 'failed'
+
+    async def update(self):
+        """
+        Fetch the latest status (and results of language and classification
+        requests), and the results of an extraction request once it has succeeded.
+        """
+        response = await self._sdk._call('GET', self._path)
+        self._set(response.json())
+        self._updated = True
+        if self.service == EXTRACTION and self.is_successful() and self._results is None:
+            await self.fetch_results()
+        return response
+
+    async def _poll(self, semaphore: asyncio.Semaphore = None):
+        if semaphore is None:
+            await self.update()
+        else:
+            async with semaphore:
+                await self.update()
+
+    async def wait(self, initial_delay: float = 2.0, max_delay: float = 10.0,
+                   multiplier: float = 1.5, semaphore: asyncio.Semaphore = None):
+        """
+        Poll until the request has finished, backing off like `RequestTracker`.
+
+        `semaphore` bounds the `update()` calls made at the same time by
+        many waiting requests.
+        """
+        if self.is_finished() and not self._updated:
+            # Finished when created: the status came without the results.
+            await self._poll(semaphore)
+        delay = initial_delay
+        while not self.is_finished():
+            await asyncio.sleep(delay)
+            await self._poll(semaphore)
+            delay = min(delay * multiplier, max_delay)
+        return self
+
+    async def get_text(self) -> str:
+        response = await self._sdk._call('GET', f'{self._path}/text')
+        return response.json()['text']
+
+    async def get_layouts(self) -> bytes:
+        """The serialized `Document` protobuf of an OCR request."""
+        response = await self._sdk._call('GET', f'{self._path}/layouts')
+        return response.content
+
+    async def fetch_results(self) -> list:
+        """Download the results of an extraction request, kept for `get_results()`."""
+        response = await self._sdk._call('GET', f'{self._path}/results/text')
+        self._results = _results(response.json())
+        return self._results
+
+    def get_results(self) -> list:
+        """The results of a successful extraction request, fetched by `update()` or `wait()`."""
+        if self._results is None:
+            raise ValueError(f'The results of {self.id} have not been fetched; '
+                             f'await wait() or fetch_results() first.')
+        return self._results
+
+
+class _RequestAPI:
+    def __init__(self, sdk: 'AsyncZDAISDK', service: str):
+        self._sdk = sdk
+        self._service = service
+        self._path = _PATHS[service]
+
+    async def create(self, file_ids, **body):
+        response = await self._sdk._call('POST', self._path,
+                                         json={'file_ids': list(file_ids), **body})
+        return [AsyncRequest(self._sdk, self._service, f'{self._path}/{item["request_id"]}', item)
+                for item in response.json()['file_ids']], response
+
+
+class _OCRAPI(_RequestAPI):
+    def __init__(self, sdk: 'AsyncZDAISDK'):
+        super().__init__(sdk, OCR)
+
+    async def get_text(self, request_id: str):
+        response = await self._sdk._call('GET', f'{self._path}/{request_id}/text')
+        return response.json()['text'], response
+
+    async def get_layouts(self, request_id: str):
+        response = await self._sdk._call('GET', f'{self._path}/{request_id}/layouts')
+        return response.content, response
+
+
+class _ExtractionAPI(_RequestAPI):
+    def __init__(self, sdk: 'AsyncZDAISDK'):
+        super().__init__(sdk, EXTRACTION)
+
+    async def create(self, file_ids, field_ids):
+        return await super().create(file_ids, field_ids=list(field_ids))
+
+
+class _FileAPI:
+    def __init__(self, sdk: 'AsyncZDAISDK'):
+        self._sdk = sdk
+
+    async def create(self, content: bytes):
+        response = await self._sdk._call('POST', '/files', data=content,
+                                         headers={'Content-Type': 'application/octet-stream'})
+        body = response.json()
+        return AsyncFile(body['file_id'], body.get('expiration'), body.get('attributes'),
+                         body.get('permissions')), response
+
+    async def upload(self, path: str) -> AsyncFile:
+        """Upload a file from disk, reading it off the event loop."""
+        content = await asyncio.to_thread(_read, path)
+        file, _ = await self.create(content=content)
+        file.name = os.path.basename(path)
+        return file
+
+    async def delete(self, file_id: str):
+        return None, await self._sdk._call('DELETE', f'/files/{file_id}')
+
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class _FieldsAPI:
+    def __init__(self, sdk: 'AsyncZDAISDK'):
+        self._sdk = sdk
+
+    async def get(self):
+        response = await self._sdk._call('GET', '/fields')
+        fields = _namespace(response.json())
+        for field in fields:
+            field.id = field.field_id
+        return fields, response
+
+    async def create(self, field_name: str, description: str = None, from_field_id: str = None):
+        body = {'field_name': field_name}
+        if description is not None:
+            body['description'] = description
+        if from_field_id is not None:
+            body['from_field_id'] = from_field_id
+        response = await self._sdk._call('POST', '/fields', json=body)
+        return response.json()['field_id'], response
+
+    async def train(self, field_id: str, annotations: str):
+        """`annotations` is the JSON string passed to the SDK's `fields.train`."""
+        response = await self._sdk._call('POST', f'/fields/{field_id}/train', data=annotations,
+                                         headers={'Content-Type': 'application/json'})
+        body = response.json()
+        return AsyncRequest(self._sdk, TRAINING, f'/fields/{field_id}/train/{body["request_id"]}',
+                            body), response
+
+    async def _get(self, field_id: str, what: str):
+        response = await self._sdk._call('GET', f'/fields/{field_id}/{what}')
+        return _namespace(response.json()), response
+
+    async def get_accuracy(self, field_id: str):
+        return await self._get(field_id, 'accuracy')
+
+    async def get_metadata(self, field_id: str):
+        return await self._get(field_id, 'metadata')
+
+    async def get_validation_details(self, field_id: str):
+        return await self._get(field_id, 'validation-details')
+
+
+@dataclasses.dataclass(slots=True)
+class AsyncResponse:
+    """The status, headers and body of a call, read in full."""
+
+    status_code: int
+    headers: CaseInsensitiveDict
+    content: bytes
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncZDAISDK:
+    """Awaitable counterpart of `ZDAISDK` for files, OCR, language, classification, extraction and fields."""
+
+    def __init__(self, url: str, token: str, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 timeout: float = 60.0, retries: int = 3):
+        """
+        At most `max_connections` calls are sent at the same time; the others
+        wait for a free connection.
+        """
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError('AsyncZDAISDK requires aiohttp: pip install aiohttp') from None
+        self._aiohttp = aiohttp
+        self.url = url.rstrip('/')
+        self.retries = retries
+        self.max_connections = max_connections
+        self._headers = {'Authorization': f'Bearer {token}'}
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        self.file = _FileAPI(self)
+        self.ocr = _OCRAPI(self)
+        self.language = _RequestAPI(self, LANGUAGE)
+        self.classification = _RequestAPI(self, CLASSIFICATION)
+        self.extraction = _ExtractionAPI(self)
+        self.fields = _FieldsAPI(self)
+
+    def _client(self):
+        # Created on first use, inside the event loop that will run the calls.
+        if self._session is None:
+            aiohttp = self._aiohttp
+            self._session = aiohttp.ClientSession(
+                headers=self._headers, timeout=self._timeout,
+                connector=aiohttp.TCPConnector(limit=self.max_connections))
+        return self._session
+
+    async def _send(self, method: str, path: str, **kwargs) -> AsyncResponse:
+        try:
+            async with self._client().request(method, self.url + path, **kwargs) as response:
+                content = await response.read()
+        except self._aiohttp.ClientError as exc:
+            raise ConnectionError(str(exc)) from exc
+        except asyncio.TimeoutError as exc:
+            # Not the builtin `TimeoutError` before Python 3.11.
+            raise TimeoutError(f'{method} {path} timed out') from exc
+        result = AsyncResponse(response.status, CaseInsensitiveDict(response.headers), content)
+        if result.status_code >= 400:
+            raise requests.HTTPError(f'{result.status_code} for {method} {path}: '
+                                     f'{result.text[:200]}', response=result)
+        return result
+
+    async def _call(self, method: str, path: str, **kwargs) -> AsyncResponse:
+        return await call_with_retries_async(self._send, method, path, retries=self.retries,
+                                             **kwargs)
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'AsyncZDAISDK':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+async def as_completed(requests, initial_delay: float = 2.0, max_delay: float = 10.0,
+                       multiplier: float = 1.5, max_polls: int = DEFAULT_MAX_POLLS):
+    """
+    Yield `AsyncRequest`s as they finish, successfully or not.
+
+    Each request is polled on its own backoff schedule, with at most
+    `max_polls` `update()` calls in flight. Errors that are still failing
+    after the retries are raised.
+    """
+    finished = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max_polls)
+
+    async def watch(request):
+        try:
+            await request.wait(initial_delay, max_delay, multiplier, semaphore)
+            finished.put_nowait((request, None))
+        except Exception as exc:
+            finished.put_nowait((request, exc))
+
+    tasks = [asyncio.create_task(watch(request)) for request in requests]
+    try:
+        for _ in tasks:
+            request, error = await finished.get()
+            if error is not None:
+                raise error
+            yield request
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
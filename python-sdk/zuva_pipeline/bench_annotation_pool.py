@@ -0,0 +1,74 @@
+"""
+Benchmark: serial annotation matching vs. `locate_annotations` on a process pool.
+
+Generates `documents` synthetic documents of `characters` characters, each
+containing one annotation with a few edits, and locates the annotations one
+document after the other and with 1, 2, 4, ... up to `os.cpu_count()`
+worker processes. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_annotation_pool [documents] [characters] [max_l_dist]
+"""
+
+import os
+import random
+import sys
+import time
+
+from .annotation_pool import locate_annotations
+from .annotations import AnnotationLocator
+
+WORDS = ('the', 'parties', 'agree', 'to', 'execute', 'such', 'additional', 'documents', 'and',
+         'perform', 'acts', 'as', 'are', 'reasonably', 'necessary', 'effectuate', 'intent',
+         'of', 'this', 'agreement', 'licensor', 'licensee', 'shall', 'each', 'party', 'hereto',
+         'further', 'assurances', 'in', 'accordance', 'with', 'laws', 'province', 'section')
+
+
+def make_documents(documents, characters, edits, seed=0):
+    rng = random.Random(seed)
+    texts = {}
+    annotations = []
+    for i in range(documents):
+        words = []
+        length = 0
+        while length < characters:
+            words.append(rng.choice(WORDS))
+            length += len(words[-1]) + 1
+        text = ' '.join(words)
+        start = rng.randrange(len(text) - 400)
+        annotation = text[start:start + 300]
+        # The OCR text differs from the annotation by a few characters.
+        text = list(text)
+        for _ in range(edits):
+            text[start + rng.randrange(300)] = rng.choice('.,;:')
+        file_id = f'file-{i}'
+        texts[file_id] = ''.join(text)
+        annotations.append((file_id, annotation))
+    return texts, annotations
+
+
+def main(documents=2000, characters=50_000, max_l_dist=5):
+    texts, annotations = make_documents(documents, characters, edits=max_l_dist // 2)
+    print(f'{documents} documents of {characters} characters, max_l_dist={max_l_dist}, '
+          f'{os.cpu_count()} cores\n')
+
+    started = time.perf_counter()
+    serial = {}
+    for file_id, annotation in annotations:
+        match = AnnotationLocator(texts[file_id], max_l_dist=max_l_dist).locate(annotation)
+        serial[file_id] = [{'start': match.start, 'end': match.end}]
+    serial_time = time.perf_counter() - started
+    print(f'serial:                  {serial_time:8.2f} s')
+
+    workers = 1
+    while workers <= os.cpu_count():
+        started = time.perf_counter()
+        annotations_dict, missing = locate_annotations(texts, annotations, max_l_dist=max_l_dist,
+                                                       max_workers=workers)
+        elapsed = time.perf_counter() - started
+        assert annotations_dict == serial and not missing
+        print(f'{workers:3d} worker processes:    {elapsed:8.2f} s ({serial_time / elapsed:.1f}x)')
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,80 @@
+"""
+Benchmark: `fuzzysearch.find_near_matches` vs. `AnnotationLocator`.
+
+Locates the annotations of `training/training_examples.csv` in the text of
+the bundled training documents, both ways. The text is read from
+`<text_dir>/<file name>.txt` when `text_dir` is given (e.g. the output of
+`ocr_request.get_text()` saved by `training.py`); otherwise it is extracted
+from the PDFs with `pypdf`, which is close enough to the OCR text to time
+the search. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_annotations [text_dir] [max_l_dist]
+"""
+
+import csv
+import os
+import sys
+import time
+
+import fuzzysearch
+
+from .annotations import AnnotationLocator
+
+TRAINING_DIRECTORY = os.path.join(os.path.dirname(__file__), '..', 'training')
+
+
+def load_examples(text_dir=None):
+    """`(file_name, annotation, text)` of every example whose document is available."""
+    with open(os.path.join(TRAINING_DIRECTORY, 'training_examples.csv')) as csvfile:
+        rows = list(csv.reader(csvfile, dialect='excel'))
+
+    examples = []
+    for row in rows:
+        file_name, annotation = row[0], row[1]
+        if text_dir is not None:
+            path = os.path.join(text_dir, file_name + '.txt')
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+        else:
+            path = os.path.join(TRAINING_DIRECTORY, 'upload_files', file_name)
+            if not os.path.exists(path):
+                continue
+            import pypdf
+            text = ''.join(page.extract_text() or '' for page in pypdf.PdfReader(path).pages)
+        examples.append((file_name, annotation, text))
+    return examples
+
+
+def main(text_dir=None, max_l_dist=5):
+    examples = [example for example in load_examples(text_dir) if example[1]]
+    characters = sum(len(text) for _, _, text in examples)
+    print(f'{len(examples)} annotations, {characters} characters of text, '
+          f'max_l_dist={max_l_dist}\n')
+
+    started = time.perf_counter()
+    expected = []
+    for _, annotation, text in examples:
+        matches = fuzzysearch.find_near_matches(annotation, text, max_l_dist=max_l_dist)
+        expected.append(min(match.dist for match in matches) if matches else None)
+    slow = time.perf_counter() - started
+
+    started = time.perf_counter()
+    found = []
+    for _, annotation, text in examples:
+        found.append(AnnotationLocator(text, max_l_dist=max_l_dist).locate(annotation))
+    fast = time.perf_counter() - started
+
+    for (file_name, _, _), distance, match in zip(examples, expected, found):
+        assert distance == (match.distance if match else None), file_name
+        print(f'  {file_name[:50]:<50} ' +
+              (f'{match.start:7d} {match.end:7d}  distance {match.distance}' if match
+               else 'no match'))
+    print(f'\nfuzzysearch:        {slow:8.2f} s')
+    print(f'AnnotationLocator:  {fast:8.2f} s ({slow / fast:.0f}x)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None,
+         *[int(arg) for arg in sys.argv[2:]])
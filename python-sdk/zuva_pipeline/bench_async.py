@@ -0,0 +1,138 @@
+"""
+Benchmark: blocking calls in `run_in_executor` vs. `AsyncZDAISDK`.
+
+Uploads `documents` small text files to a `FakeZuvaServer` running in
+another process, creates their OCR requests (100 files per call), waits for
+them and downloads their text, all from one asyncio event loop. First every
+call is a blocking call sent from a thread pool of `threads` threads with
+`loop.run_in_executor`, the way an asyncio service uses the SDK; then every
+call is awaited on `AsyncZDAISDK`. Prints the time taken and the most
+threads alive at once. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_async [documents] [threads] [latency]
+"""
+
+import asyncio
+import concurrent.futures
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from .async_client import AsyncZDAISDK, as_completed
+from .planner import MAX_FILES_PER_CALL
+from .transport import PooledSession
+
+HEADERS = {'Authorization': 'Bearer fake'}
+POLLING = dict(initial_delay=0.5, max_delay=2.0, multiplier=1.5)
+
+
+async def sample_threads(peak: list):
+    while True:
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.01)
+
+
+async def with_executor(url, contents, threads):
+    loop = asyncio.get_running_loop()
+    session = PooledSession(pool_size=threads)
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+
+    def call(method, path, **kwargs):
+        response = session.request(method, url + path, headers=HEADERS, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    async def blocking(method, path, **kwargs):
+        return await loop.run_in_executor(pool, lambda: call(method, path, **kwargs))
+
+    async def process(request_id):
+        delay = POLLING['initial_delay']
+        while True:
+            await asyncio.sleep(delay)
+            status = (await blocking('GET', f'/files/ocr/{request_id}'))['status']
+            if status in ('complete', 'failed'):
+                break
+            delay = min(delay * POLLING['multiplier'], POLLING['max_delay'])
+        return (await blocking('GET', f'/files/ocr/{request_id}/text'))['text']
+
+    files = await asyncio.gather(*[blocking('POST', '/files', data=content)
+                                   for content in contents])
+    file_ids = [file['file_id'] for file in files]
+    created = await asyncio.gather(*[
+        blocking('POST', '/files/ocr', json={'file_ids': file_ids[i:i + MAX_FILES_PER_CALL]})
+        for i in range(0, len(file_ids), MAX_FILES_PER_CALL)])
+    texts = await asyncio.gather(*[process(item['request_id'])
+                                   for batch in created for item in batch['file_ids']])
+    pool.shutdown()
+    return len(texts)
+
+
+async def with_async_client(url, contents, threads):
+    async with AsyncZDAISDK(url=url, token='fake', max_connections=threads) as sdk:
+        files = await asyncio.gather(*[sdk.file.create(content=content)
+                                       for content in contents])
+        file_ids = [file.id for file, _ in files]
+        created = await asyncio.gather(*[
+            sdk.ocr.create(file_ids=file_ids[i:i + MAX_FILES_PER_CALL])
+            for i in range(0, len(file_ids), MAX_FILES_PER_CALL)])
+        ocr_requests = [request for requests, _ in created for request in requests]
+        texts = []
+
+        async def get_text(request):
+            texts.append(await request.get_text())
+
+        downloads = [asyncio.create_task(get_text(request))
+                     async for request in as_completed(ocr_requests, max_polls=threads, **POLLING)]
+        await asyncio.gather(*downloads)
+        return len(texts)
+
+
+def start_server(latency):
+    """Run `FakeZuvaServer` in its own process, so that it doesn't compete for the GIL."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen([sys.executable, '-m', 'zuva_pipeline.fake_server',
+                                '--port', str(port), '--latency', str(latency),
+                                '--processing-time', '1', '5'], stdout=subprocess.DEVNULL)
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return process, f'http://127.0.0.1:{port}/api/v2'
+        except ConnectionRefusedError:
+            time.sleep(0.1)
+
+
+def measure(label, workflow, *args):
+    async def run():
+        peak = [threading.active_count()]
+        sampler = asyncio.create_task(sample_threads(peak))
+        try:
+            return await workflow(*args), peak[0]
+        finally:
+            sampler.cancel()
+
+    started = time.perf_counter()
+    texts, threads = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    print(f'{label:<24} {elapsed:7.2f} s {threads:4d} threads  ({texts} texts)')
+    return elapsed
+
+
+def main(documents=2000, threads=32, latency=0.02):
+    process, url = start_server(latency)
+    try:
+        contents = [f'Document {i}: the parties agree to further assurances.'.encode()
+                    for i in range(documents)]
+        print(f'{documents} documents, {latency * 1000:.0f} ms latency per call, '
+              f'{threads} connections\n')
+        measure('run_in_executor', with_executor, url, contents, threads)
+        measure('AsyncZDAISDK', with_async_client, url, contents, threads)
+    finally:
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
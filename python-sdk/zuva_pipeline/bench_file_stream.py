@@ -0,0 +1,76 @@
+"""
+Benchmark: uploading `f.read()` vs. streaming a `FileStream`.
+
+Uploads a temporary file of `size_mb` MB to a `FakeZuvaServer` running in
+another process, once read into memory as the tutorials do and once
+streamed from disk with `FileStream` (with `read()` calls, then from a
+memory-mapped view), and reports the time taken and the peak memory
+allocated by Python during the upload. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_file_stream [size_mb]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .bench_async import start_server
+from .file_stream import FileStream
+from .ledger import content_sha256
+from .transport import PooledSession
+
+HEADERS = {'Authorization': 'Bearer fake'}
+
+
+def measure(label, session, url, size, content):
+    tracemalloc.start()
+    started = time.perf_counter()
+    with content() as body:
+        response = session.post(f'{url}/files', data=body, headers=HEADERS)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<24} {elapsed:6.2f} s {size / elapsed / 1e6:7.1f} MB/s '
+          f'{peak / 1e6:8.1f} MB peak')
+    return body
+
+
+class _Read:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def main(size_mb=256):
+    process, url = start_server(0.0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'exhibit.pdf')
+            with open(path, 'wb') as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(1 << 20))
+            size = os.path.getsize(path)
+            expected = content_sha256(path)
+            session = PooledSession(pool_size=1)
+            print(f'{size_mb} MB file\n')
+
+            measure('f.read()', session, url, size, lambda: _Read(path))
+            for label, use_mmap in (('FileStream', False), ('FileStream, mmap', True)):
+                stream = measure(label, session, url, size,
+                                 lambda: FileStream(path, use_mmap=use_mmap))
+                assert stream.hexdigest() == expected
+    finally:
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
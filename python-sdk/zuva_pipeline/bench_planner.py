@@ -0,0 +1,75 @@
+"""
+Benchmark: one create call per file vs. `SubmissionPlanner`.
+
+Creates OCR, language, classification and extraction requests for `files`
+files on a local `FakeZuvaServer` that adds `latency` seconds to every call,
+the way `training.py` does (one call per file and service), the way
+`spreadsheet.py` does (one call per service, one after the other), and with
+`SubmissionPlanner`. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_planner [files] [latency] [max_files]
+"""
+
+import sys
+import time
+
+from zdai import ZDAISDK
+
+from .fake_server import FakeZuvaServer
+from .planner import OCR, SubmissionPlanner
+from .results import CLASSIFICATION, EXTRACTION, LANGUAGE
+
+SERVICES = (OCR, LANGUAGE, CLASSIFICATION, EXTRACTION)
+FIELD_IDS = ['25d677a1-70d0-43c2-9b36-d079733dd020', '98086156-f230-423c-b214-27f542e72708']
+
+
+def create(sdk, service, file_ids):
+    if service == OCR:
+        return sdk.ocr.create(file_ids=file_ids)[0]
+    if service == LANGUAGE:
+        return sdk.language.create(file_ids=file_ids)[0]
+    if service == CLASSIFICATION:
+        return sdk.classification.create(file_ids=file_ids)[0]
+    return sdk.extraction.create(file_ids=file_ids, field_ids=FIELD_IDS)[0]
+
+
+def measure(label, server, fn):
+    server.calls.clear()
+    started = time.perf_counter()
+    created = fn()
+    elapsed = time.perf_counter() - started
+    print(f'{label:<28} {sum(server.calls.values()):6d} calls {elapsed:8.2f} s '
+          f'{created:6d} requests')
+    return elapsed
+
+
+def main(files=1000, latency=0.05, max_files=100):
+    with FakeZuvaServer(latency=latency) as server:
+        sdk = ZDAISDK(url=server.url, token='fake')
+        file_ids = [f'file-{i}' for i in range(files)]
+        # Register the files directly rather than uploading them.
+        server.files.update((file_id, b'') for file_id in file_ids)
+        print(f'{files} files, {len(SERVICES)} services, {latency * 1000:.0f} ms latency per call\n')
+
+        def per_file():
+            return sum(len(create(sdk, service, [file_id]))
+                       for service in SERVICES for file_id in file_ids)
+
+        def per_service():
+            return sum(len(create(sdk, service, file_ids[i:i + max_files]))
+                       for service in SERVICES for i in range(0, files, max_files))
+
+        def planned():
+            planner = SubmissionPlanner(sdk, max_files=max_files)
+            submission = planner.submit(file_ids, SERVICES, FIELD_IDS)
+            assert all(len(submission.requests[service]) == files for service in SERVICES)
+            return len(submission.all())
+
+        slow = measure('one call per file', server, per_file)
+        measure(f'sequential, {max_files} per call', server, per_service)
+        fast = measure('SubmissionPlanner', server, planned)
+        print(f'\nSubmissionPlanner is {slow / fast:.0f}x faster than one call per file')
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,119 @@
+"""
+Benchmark: list-scan result assembly vs. `ResultAssembler`.
+
+Builds synthetic finished requests for `files` files against a catalog of
+`fields` fields, each extraction returning `spans` extracted spans, and
+assembles them both the way `spreadsheet.py` originally did (scanning all
+files and fields for every result) and with `ResultAssembler`:
+
+    python -m zuva_pipeline.bench_results [files] [fields] [spans]
+"""
+
+import random
+import sys
+import time
+import types
+
+from zdai import DocumentClassificationRequest, FieldExtractionRequest, \
+    LanguageClassificationRequest
+
+from .results import ResultAssembler
+
+
+class FinishedRequest:
+    def __init__(self, kind, file_id, **attributes):
+        self.kind = kind
+        self.id = f'{kind.__name__}-{file_id}'
+        self.file_id = file_id
+        self.__dict__.update(attributes)
+
+    def is_type(self, cls):
+        return self.kind is cls
+
+    def is_successful(self):
+        return True
+
+    def get_results(self):
+        return self.results
+
+
+def make_requests(files, fields, spans, seed=0):
+    rng = random.Random(seed)
+    zuva_files = [types.SimpleNamespace(id=f'file-{i}', name=f'document-{i}.pdf')
+                  for i in range(files)]
+    catalog = [types.SimpleNamespace(id=f'field-{i}', name=f'Field {i}')
+               for i in range(fields)]
+
+    requests = []
+    for file in zuva_files:
+        results = []
+        for _ in range(spans):
+            span = types.SimpleNamespace(page_start=rng.randint(1, 50))
+            span.page_end = span.page_start
+            results.append(types.SimpleNamespace(
+                field_id=rng.choice(catalog).id, text='extracted text', spans=[span]))
+        requests.append(FinishedRequest(LanguageClassificationRequest, file.id,
+                                        language='English'))
+        requests.append(FinishedRequest(DocumentClassificationRequest, file.id,
+                                        classification='Agreement', is_contract=True))
+        requests.append(FinishedRequest(FieldExtractionRequest, file.id, results=results))
+    return zuva_files, catalog, requests
+
+
+def scanning_assembly(zuva_files, fields, requests):
+    """The assembly loop of spreadsheet.py before it used dictionaries."""
+    results = {}
+    for request in requests:
+        if request.file_id not in results:
+            results[request.file_id] = {}
+            results[request.file_id]['name'] = [d.name for d in zuva_files
+                                                if d.id == request.file_id][0]
+        if request.is_type(DocumentClassificationRequest):
+            results[request.file_id]['type'] = request.classification
+            results[request.file_id]['is_contract'] = 'Yes' if request.is_contract else 'No'
+        elif request.is_type(LanguageClassificationRequest):
+            results[request.file_id]['language'] = request.language
+        elif request.is_type(FieldExtractionRequest):
+            results[request.file_id]['extractions'] = []
+            for result in request.get_results():
+                field_name = [f.name for f in fields if f.id == result.field_id][0]
+                for span in result.spans:
+                    results[request.file_id]['extractions'].append({
+                        'field_name': field_name,
+                        'page_start': span.page_start,
+                        'page_end': span.page_end,
+                        'text': result.text
+                    })
+
+    data = []
+    for metadata in results.values():
+        for extraction in metadata.get('extractions'):
+            data.append([metadata.get('name'), metadata.get('language'),
+                         metadata.get('type'), metadata.get('is_contract'),
+                         extraction.get('field_name'), extraction.get('page_start'),
+                         extraction.get('text')])
+    return data
+
+
+def main(files=1000, fields=1300, spans=100):
+    zuva_files, catalog, requests = make_requests(files, fields, spans)
+    print(f'{files} files, {fields} fields, {files * spans} extraction rows\n')
+
+    started = time.perf_counter()
+    scanned = scanning_assembly(zuva_files, catalog, requests)
+    slow = time.perf_counter() - started
+
+    started = time.perf_counter()
+    assembler = ResultAssembler(zuva_files, catalog)
+    rows = []
+    for request in requests:
+        rows.extend(assembler.add(request))
+    fast = time.perf_counter() - started
+
+    assert [list(row.values()) for row in rows] == scanned
+    print(f'list scans:       {slow * 1000:10.2f} ms')
+    print(f'ResultAssembler:  {fast * 1000:10.2f} ms ({slow / fast:.0f}x)')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
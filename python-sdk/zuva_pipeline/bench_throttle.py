@@ -0,0 +1,78 @@
+"""
+Benchmark: retrying throttled calls in every thread vs. a shared `Throttle`.
+
+Runs the `spreadsheet.py` workflow for `documents` documents on `threads`
+threads: upload, create language, classification and extraction requests,
+poll them every half second and download the extraction results. The local
+`FakeZuvaServer` allows `rate_limit` calls per second and answers the others
+with HTTP 429 and a `Retry-After`. First every thread retries its own
+throttled calls with `call_with_retries`; then the calls also go through a
+`Throttle` whose every category may use the whole limit, so it is up to
+the AIMD controller to find it. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_throttle [documents] [threads] [rate_limit]
+"""
+
+import concurrent.futures
+import sys
+import time
+
+from .fake_server import FakeZuvaServer
+from .retry import call_with_retries
+from .throttle import DEFAULT_RATES, Throttle
+from .transport import PooledSession
+
+HEADERS = {'Authorization': 'Bearer fake'}
+FIELD_IDS = ['25d677a1-70d0-43c2-9b36-d079733dd020']
+
+
+def process(session, url, i):
+    def call(method, path, **kwargs):
+        def send():
+            response = session.request(method, url + path, headers=HEADERS, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        return call_with_retries(send, retries=8, backoff=0.5)
+
+    file_id = call('POST', '/files', data=f'Document {i}'.encode())['file_id']
+    requests = [call('POST', path, json={'file_ids': [file_id], **body})['file_ids'][0]
+                for path, body in (('/files/language', {}), ('/files/classification', {}),
+                                   ('/extraction', {'field_ids': FIELD_IDS}))]
+    paths = ['/files/language/', '/files/classification/', '/extraction/']
+    for path, request in zip(paths, requests):
+        while request['status'] not in ('complete', 'failed'):
+            time.sleep(0.5)
+            request = call('GET', path + request['request_id'])
+    return call('GET', f'/extraction/{requests[2]["request_id"]}/results/text')
+
+
+def measure(label, server, session, documents, threads):
+    server.calls.clear()
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(process, session, server.url, i) for i in range(documents)]
+        # Documents that still got 429 after all the retries.
+        failed = sum(1 for future in futures if future.exception() is not None)
+    elapsed = time.perf_counter() - started
+    throttled = server.calls['throttled']
+    # Throttled calls are counted under their endpoint and under 'throttled'.
+    calls = sum(server.calls.values()) - 2 * throttled
+    print(f'{label:<16} {elapsed:7.2f} s {calls / elapsed:7.1f} calls/s '
+          f'{throttled:6d} throttled {failed:5d} documents failed')
+    return elapsed
+
+
+def main(documents=300, threads=32, rate_limit=40):
+    with FakeZuvaServer(latency=0.02, processing_time=(1, 3), rate_limit=rate_limit) as server:
+        print(f'{documents} documents, {threads} threads, {rate_limit} calls/s allowed\n')
+        measure('retries only', server, PooledSession(pool_size=threads), documents, threads)
+        throttle = Throttle(rates=dict.fromkeys(DEFAULT_RATES, rate_limit))
+        measure('Throttle', server, PooledSession(pool_size=threads, throttle=throttle),
+                documents, threads)
+        controller = throttle.controller
+        print(f'\nThrottle: {dict(throttle.calls)} calls, {dict(throttle.throttled)} throttled; '
+              f'pacing at {controller.rate:.1f} calls/s at the end')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
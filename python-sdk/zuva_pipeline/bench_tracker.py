@@ -0,0 +1,94 @@
+"""
+Benchmark: the tutorials' polling loop vs. `RequestTracker`.
+
+Simulates `requests` Zuva requests whose processing takes between
+`min_seconds` and `max_seconds`, and whose `update()` call costs `latency`
+seconds of network time:
+
+    python -m zuva_pipeline.bench_tracker [requests] [min_seconds] [max_seconds] [latency]
+"""
+
+import random
+import sys
+import threading
+import time
+
+from .tracker import RequestTracker
+
+
+class SimulatedRequest:
+    """Stands in for e.g. a `FieldExtractionRequest`: done after `duration` seconds."""
+
+    calls = 0
+    _lock = threading.Lock()
+
+    def __init__(self, request_id, duration, latency):
+        self.id = request_id
+        self.status = 'queued'
+        self.started = time.monotonic()
+        self.duration = duration
+        self.latency = latency
+        self.seen_finished_at = None
+
+    def update(self):
+        time.sleep(self.latency)
+        with SimulatedRequest._lock:
+            SimulatedRequest.calls += 1
+        if time.monotonic() - self.started >= self.duration:
+            self.status = 'complete'
+            self.seen_finished_at = time.monotonic()
+        else:
+            self.status = 'processing'
+
+    def is_finished(self):
+        return self.status in ('complete', 'failed')
+
+    def is_successful(self):
+        return self.status == 'complete'
+
+
+def make_requests(count, min_seconds, max_seconds, latency, seed=0):
+    rng = random.Random(seed)
+    return [SimulatedRequest(i, rng.uniform(min_seconds, max_seconds), latency)
+            for i in range(count)]
+
+
+def tutorial_loop(requests):
+    """The loop from spreadsheet.py (iterating over a copy, as removing while iterating skips requests)."""
+    while len(requests) > 0:
+        for request in list(requests):
+            request.update()
+            if request.is_finished():
+                requests.remove(request)
+        time.sleep(2)
+
+
+def report(label, requests, started):
+    finished = [r.seen_finished_at - r.started for r in requests]
+    lag = [r.seen_finished_at - r.started - r.duration for r in requests]
+    print(f'{label:<16} {SimulatedRequest.calls:>7} update() calls, '
+          f'all done after {max(finished):6.2f} s, '
+          f'mean detection lag {sum(lag) / len(lag):5.2f} s')
+
+
+def main(count=200, min_seconds=5.0, max_seconds=60.0, latency=0.02):
+    print(f'{count} requests taking {min_seconds}-{max_seconds} s, '
+          f'{latency * 1000:.0f} ms per update()\n')
+
+    SimulatedRequest.calls = 0
+    requests = make_requests(count, min_seconds, max_seconds, latency)
+    started = time.monotonic()
+    tutorial_loop(list(requests))
+    report('polling loop', requests, started)
+
+    SimulatedRequest.calls = 0
+    requests = make_requests(count, min_seconds, max_seconds, latency)
+    started = time.monotonic()
+    tracker = RequestTracker(max_workers=16)
+    tracker.add_all(requests)
+    tracker.wait()
+    report('RequestTracker', requests, started)
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
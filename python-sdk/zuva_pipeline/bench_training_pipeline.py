@@ -0,0 +1,135 @@
+"""
+Benchmark: the stages of `training.py` vs. `TrainingPipeline`.
+
+Simulates an SDK whose uploads take `latency` seconds and whose OCR requests
+take between `min_seconds` and `max_seconds`, for `documents` synthetic
+documents of `characters` characters with one annotation each. The staged
+version uploads everything, waits for every OCR request, then gets the
+text and locates the annotations one document at a time, like
+`training.py`. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_training_pipeline [documents] [characters] [min_seconds] [max_seconds]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+
+from .annotations import AnnotationLocator
+from .bench_annotation_pool import make_documents
+from .tracker import RequestTracker
+from .training_pipeline import TrainingPipeline
+from .uploads import upload_files
+
+
+class SimulatedOcrRequest:
+    def __init__(self, request_id, file_id, text, duration, latency):
+        self.id = request_id
+        self.file_id = file_id
+        self.status = 'queued'
+        self.text = text
+        self.started = time.monotonic()
+        self.duration = duration
+        self.latency = latency
+
+    def update(self):
+        time.sleep(self.latency)
+        if time.monotonic() - self.started >= self.duration:
+            self.status = 'complete'
+        else:
+            self.status = 'processing'
+
+    def is_finished(self):
+        return self.status in ('complete', 'failed')
+
+    def is_successful(self):
+        return self.status == 'complete'
+
+    def get_text(self):
+        time.sleep(self.latency)
+        return self.text
+
+
+class SimulatedSDK:
+    """Uploads store the content; OCR requests finish after a random duration."""
+
+    def __init__(self, min_seconds, max_seconds, latency, seed=0):
+        self.contents = {}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.file = types.SimpleNamespace(create=self.create_file)
+        self.ocr = types.SimpleNamespace(create=self.create_ocr)
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.latency = latency
+
+    def create_file(self, content):
+        time.sleep(self.latency)
+        with self.lock:
+            file_id = f'file-{len(self.contents)}'
+            self.contents[file_id] = content
+        return types.SimpleNamespace(id=file_id, expiration='2100-01-01T00:00:00Z'), None
+
+    def create_ocr(self, file_ids):
+        time.sleep(self.latency)
+        with self.lock:
+            durations = [self.rng.uniform(self.min_seconds, self.max_seconds) for _ in file_ids]
+        return [SimulatedOcrRequest(f'ocr-{file_id}', file_id, self.contents[file_id].decode(),
+                                    duration, self.latency)
+                for file_id, duration in zip(file_ids, durations)], None
+
+
+def make_tracker():
+    return RequestTracker(initial_delay=0.5, max_delay=2.0)
+
+
+def staged(sdk, examples, max_l_dist):
+    """The order of training.py: upload all, OCR all, then annotate one by one."""
+    files = upload_files(sdk, [path for path, _ in examples])
+    requests, _ = sdk.ocr.create(file_ids=[f.id for f in files])
+    tracker = make_tracker()
+    tracker.add_all(requests)
+    tracker.wait()
+    annotations_dict = {}
+    for (_, annotation), file, request in zip(examples, files, requests):
+        match = AnnotationLocator(request.get_text(), max_l_dist=max_l_dist).locate(annotation)
+        annotations_dict[file.id] = [{'start': match.start, 'end': match.end}]
+    return annotations_dict
+
+
+def main(documents=200, characters=200_000, min_seconds=2.0, max_seconds=20.0,
+         latency=0.05, max_l_dist=5):
+    texts, annotations = make_documents(documents, characters, edits=max_l_dist // 2)
+    print(f'{documents} documents of {characters} characters, OCR taking '
+          f'{min_seconds}-{max_seconds} s, {os.cpu_count()} cores\n')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        examples = []
+        for file_id, annotation in annotations:
+            path = os.path.join(tmp, file_id + '.txt')
+            with open(path, 'w') as f:
+                f.write(texts[file_id])
+            examples.append((path, annotation))
+
+        started = time.perf_counter()
+        expected = staged(SimulatedSDK(min_seconds, max_seconds, latency), examples, max_l_dist)
+        slow = time.perf_counter() - started
+        print(f'stages:            {slow:8.2f} s')
+
+        started = time.perf_counter()
+        pipeline = TrainingPipeline(SimulatedSDK(min_seconds, max_seconds, latency),
+                                    max_l_dist=max_l_dist, tracker=make_tracker())
+        result = pipeline.run(examples)
+        fast = time.perf_counter() - started
+        assert sorted(result.annotations_dict.values(), key=str) == \
+            sorted(expected.values(), key=str)
+        print(f'TrainingPipeline:  {fast:8.2f} s ({slow / fast:.1f}x)')
+        print(f'slowest OCR:       {max_seconds:8.2f} s')
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
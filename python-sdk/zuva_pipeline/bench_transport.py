@@ -0,0 +1,89 @@
+"""
+Benchmark: a new connection per call vs. `PooledSession`.
+
+Polls an OCR request `polls` times and uploads `uploads` text files of
+`size` bytes from `threads` threads on a local `FakeZuvaServer` whose
+connections take `handshake` seconds to set up (as the TCP and TLS
+handshakes to the real API do) and carry `bandwidth` bytes per second. Each
+is done with the module-level `requests` functions, which open a new
+connection for every call, and with a `PooledSession` (for the uploads,
+with and without compression). Compressing and decompressing the uploads
+takes CPU time on both ends, which only pays off when the bandwidth is
+scarce. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_transport [polls] [uploads] [size] [threads] [handshake] [bandwidth]
+"""
+
+import concurrent.futures
+import random
+import sys
+import time
+
+import requests
+
+from .bench_annotation_pool import WORDS
+from .fake_server import FakeZuvaServer
+from .transport import PooledSession
+
+HEADERS = {'Authorization': 'Bearer fake'}
+
+
+def make_text(size, seed=0):
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size:
+        words.append(rng.choice(WORDS))
+        length += len(words[-1]) + 1
+    return ' '.join(words).encode()[:size]
+
+
+def measure(label, server, threads, calls, fn):
+    server.connections = 0
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        for response in pool.map(fn, range(calls)):
+            response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    print(f'  {label:<32} {elapsed:7.2f} s {calls / elapsed:8.1f} calls/s '
+          f'{server.connections:6d} connections')
+    return elapsed
+
+
+def main(polls=2000, uploads=200, size=256 * 1024, threads=8, handshake=0.02,
+         bandwidth=5e6):
+    with FakeZuvaServer(latency=0.005, processing_time=3600, handshake=handshake,
+                        bandwidth=bandwidth) as server:
+        url = server.url
+        session = PooledSession(pool_size=threads, compress_requests=True)
+        file_id = session.post(f'{url}/files', data=b'%PDF', headers=HEADERS).json()['file_id']
+        request_id = session.post(f'{url}/files/ocr', json={'file_ids': [file_id]},
+                                  headers=HEADERS).json()['file_ids'][0]['request_id']
+        contents = [make_text(size, seed) for seed in range(uploads)]
+        print(f'{threads} threads, {handshake * 1000:.0f} ms handshake, '
+              f'{bandwidth / 1e6:.0f} MB/s per connection\n')
+
+        print(f'Polling, {polls} calls:')
+        slow = measure('new connection per call', server, threads, polls,
+                       lambda _: requests.get(f'{url}/files/ocr/{request_id}', headers=HEADERS))
+        session.metrics.reset()
+        fast = measure('PooledSession', server, threads, polls,
+                       lambda _: session.get(f'{url}/files/ocr/{request_id}', headers=HEADERS))
+        print(f'  {session.metrics.reused} of {session.metrics.requests} calls reused a '
+              f'connection, {slow / fast:.1f}x faster\n')
+
+        print(f'Uploads, {uploads} files of {size // 1024} KiB:')
+        slow = measure('new connection per call', server, threads, uploads,
+                       lambda i: requests.post(f'{url}/files', data=contents[i], headers=HEADERS))
+        plain = PooledSession(pool_size=threads)
+        pooled = measure('PooledSession', server, threads, uploads,
+                         lambda i: plain.post(f'{url}/files', data=contents[i], headers=HEADERS))
+        session.metrics.reset()
+        compressed = measure('PooledSession, compressed', server, threads, uploads,
+                             lambda i: session.post(f'{url}/files', data=contents[i],
+                                                    headers=HEADERS))
+        print(f'  {session.metrics.bytes_sent / 1e6:.1f} MB sent for {uploads * size / 1e6:.1f} MB '
+              f'of files, {slow / pooled:.1f}x and {slow / compressed:.1f}x faster')
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg or 'e' in arg else int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,54 @@
+"""
+Benchmark: the tutorials' serial upload loop vs. `upload_files`.
+
+Uploads temporary files to a local `FakeZuvaServer` that adds `latency`
+seconds to every call. Run from the `python-sdk` folder:
+
+    python -m zuva_pipeline.bench_uploads [files] [size_kib] [latency] [workers]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from zdai import ZDAISDK
+
+from .fake_server import FakeZuvaServer
+from .uploads import upload_files
+
+
+def main(files=200, size_kib=256, latency=0.05, workers=16):
+    with tempfile.TemporaryDirectory() as tmp, FakeZuvaServer(latency=latency) as server:
+        docs = []
+        for i in range(files):
+            path = os.path.join(tmp, f'{i}.pdf')
+            with open(path, 'wb') as f:
+                f.write(os.urandom(size_kib * 1024))
+            docs.append(path)
+
+        sdk = ZDAISDK(url=server.url, token='fake')
+        print(f'{files} files of {size_kib} KiB, {latency * 1000:.0f} ms latency per call\n')
+
+        started = time.perf_counter()
+        serial = []
+        for doc in docs:
+            with open(doc, 'rb') as f:
+                file, _ = sdk.file.create(content=f.read())
+                file.name = os.path.basename(doc)
+                serial.append(file)
+        serial_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        concurrent = upload_files(sdk, docs, max_workers=workers)
+        concurrent_time = time.perf_counter() - started
+
+        assert [f.name for f in serial] == [f.name for f in concurrent]
+        print(f'serial loop:            {serial_time:8.2f} s')
+        print(f'upload_files({workers:>2}):       {concurrent_time:8.2f} s '
+              f'({serial_time / concurrent_time:.1f}x)')
+        print(f'server calls:           {dict(server.calls)}')
+
+
+if __name__ == '__main__':
+    main(*[float(arg) if '.' in arg else int(arg) for arg in sys.argv[1:]])
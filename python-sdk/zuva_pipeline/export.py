@@ -0,0 +1,128 @@
+"""
+Writing extraction rows to spreadsheets as they arrive.
+
+`spreadsheet.py` keeps every row in a `data` list, copies it into a pandas
+`DataFrame` and only then calls `df.to_excel`, so memory grows with the
+number of rows. `RowExporter` writes each row out as soon as it is given one,
+to any combination of:
+
+- an `.xlsx` workbook, through openpyxl's write-only mode, which streams rows
+  to disk instead of building the sheet in memory. A new sheet is started
+  whenever one reaches Excel's limit of 1,048,576 rows;
+- a `.csv` file;
+- a `.parquet` file (requires `pyarrow`), written one row group per
+  `batch_size` rows.
+
+    with RowExporter(xlsx='output.xlsx', csv='output.csv') as exporter:
+        for request in tracker.as_completed():
+            exporter.write_rows(assembler.add(request))
+"""
+
+import csv as csv_module
+
+from .results import COLUMNS, ExtractionRow
+
+# Rows per sheet, including the header row.
+EXCEL_MAX_ROWS = 1_048_576
+
+
+class RowExporter:
+    """Streams rows to xlsx, csv and/or parquet files with constant memory."""
+
+    def __init__(self, xlsx: str = None, csv: str = None, parquet: str = None,
+                 columns=COLUMNS, sheet_name: str = 'Sheet', batch_size: int = 10_000,
+                 max_sheet_rows: int = EXCEL_MAX_ROWS):
+        if not (xlsx or csv or parquet):
+            raise ValueError('At least one of xlsx, csv or parquet must be given.')
+        self.columns = list(columns)
+        self.rows_written = 0
+
+        self._xlsx_path = xlsx
+        self._workbook = None
+        self._sheet = None
+        self._sheet_rows = 0
+        self._sheet_name = sheet_name
+        self._max_sheet_rows = max_sheet_rows
+        if xlsx:
+            import openpyxl
+            self._workbook = openpyxl.Workbook(write_only=True)
+            self._new_sheet()
+
+        self._csv_file = None
+        if csv:
+            self._csv_file = open(csv, 'w', newline='', encoding='utf-8')
+            self._csv_writer = csv_module.writer(self._csv_file)
+            self._csv_writer.writerow(self.columns)
+
+        self._parquet_writer = None
+        self._batch = []
+        self._batch_size = batch_size
+        if parquet:
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError('Writing parquet files requires pyarrow: pip install pyarrow')
+            self._pyarrow = pyarrow
+            # Every column is stored as text except the page number.
+            self._schema = pyarrow.schema(
+                [(name, pyarrow.int64() if name == 'Page' else pyarrow.string())
+                 for name in self.columns])
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(parquet, self._schema)
+
+    def _new_sheet(self):
+        number = len(self._workbook.worksheets) + 1
+        title = self._sheet_name if number == 1 else f'{self._sheet_name} {number}'
+        self._sheet = self._workbook.create_sheet(title)
+        self._sheet.append(self.columns)
+        self._sheet_rows = 1
+
+    def write(self, row):
+        """Write one row: an `ExtractionRow` or a sequence in the order of `columns`."""
+        values = row.values() if isinstance(row, ExtractionRow) else tuple(row)
+
+        if self._workbook is not None:
+            if self._sheet_rows >= self._max_sheet_rows:
+                self._new_sheet()
+            self._sheet.append(values)
+            self._sheet_rows += 1
+        if self._csv_file is not None:
+            self._csv_writer.writerow(values)
+        if self._parquet_writer is not None:
+            self._batch.append(values)
+            if len(self._batch) >= self._batch_size:
+                self._flush_parquet()
+        self.rows_written += 1
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def _flush_parquet(self):
+        if not self._batch:
+            return
+        columns = list(zip(*self._batch))
+        table = self._pyarrow.Table.from_arrays(
+            [self._pyarrow.array(column, type=field.type)
+             for column, field in zip(columns, self._schema)],
+            schema=self._schema)
+        self._parquet_writer.write_table(table)
+        self._batch = []
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self._xlsx_path)
+            self._workbook = None
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+        if self._parquet_writer is not None:
+            self._flush_parquet()
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self) -> 'RowExporter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,602 @@
+"""
+A local stand-in for the Zuva API, for benchmarks that must not leave the machine.
+
+`FakeZuvaServer` listens on localhost and answers the endpoints the SDK calls:
+files, OCR (text and layouts), language, classification, extraction, fields
+and field training. Requests are processed in the background for a
+configurable time and can fail at a configurable rate; every call can be
+delayed, fail with a server error, or be throttled with HTTP 429:
+
+    with FakeZuvaServer(latency=0.05, processing_time=(2, 20), failure_rate=0.01,
+                        rate_limit=50, seed=1) as server:
+        sdk = ZDAISDK(url=server.url, token='fake')
+        ...
+        print(server.calls)
+
+`latency` and `processing_time` are a number of seconds, a `(low, high)`
+range to draw from uniformly, or a function of a `random.Random`. Every call
+is counted per endpoint in `server.calls`, along with the `errors` and
+`throttled` calls. With the same `seed`, the same sequence of calls gets the
+same processing times, failures and results.
+
+Calls are served over keep-alive HTTP/1.1 connections; `server.connections`
+counts the connections opened. `handshake` delays the first call on every
+connection, like the TCP and TLS handshakes to the real API, and `bandwidth`
+limits the bytes per second of request and response bodies. Bodies sent
+chunked (`Transfer-Encoding: chunked`, e.g. from a generator) or with
+`Content-Encoding: gzip` are accepted, and responses of 1 KiB or more are
+compressed for clients that send `Accept-Encoding: gzip`.
+
+OCR text is the content of the uploaded file when it is UTF-8 text, and
+generated text otherwise; layouts are built from it with
+`layouts/synthetic.py`. The server can also be run on its own, to point the
+tutorials at it through `ZUVA_URL`:
+
+    python -m zuva_pipeline.fake_server --port 8080 --processing-time 1 5
+    ZUVA_URL=http://127.0.0.1:8080/api/v2 python training.py
+"""
+
+import argparse
+import collections
+import datetime
+import gzip
+import hashlib
+import http.server
+import json
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+
+API_PREFIX = '/api/v2'
+LAYOUTS_DIRECTORY = os.path.join(os.path.dirname(__file__), '..', 'layouts')
+
+CLASSIFICATIONS = (('Agreement', True), ('Lease Agreement', True), ('Employment Agreement', True),
+                   ('Credit Agreement', True), ('Letter', False), ('Form', False))
+# Smaller responses are sent uncompressed.
+MIN_COMPRESS_SIZE = 1024
+FIELD_NAMES = ('Title', 'Parties', 'Date', 'Governing Law', 'Indemnity',
+               'Termination for Cause or Breach', 'Termination for Insolvency',
+               'Termination for Convenience', '“Confidential Information” Definition',
+               'Assignment', 'Change of Control', 'Further Assurances', 'Non-Compete',
+               'Notices', 'Survival')
+
+
+def _seconds(spec, rng: random.Random) -> float:
+    """Draw a duration from a number, a `(low, high)` range or a function of `rng`."""
+    if callable(spec):
+        return spec(rng)
+    if isinstance(spec, (tuple, list)):
+        return rng.uniform(*spec)
+    return spec or 0.0
+
+
+class _TokenBucket:
+    """`rate` calls per second on average, in bursts of up to `burst` calls."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """0 if the call may go ahead, otherwise the seconds until it could."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def _read_body(handler) -> bytes:
+    """The request body, sent with a `Content-Length` or chunked (e.g. streamed uploads)."""
+    if 'chunked' not in handler.headers.get('Transfer-Encoding', '').lower():
+        length = int(handler.headers.get('Content-Length') or 0)
+        return handler.rfile.read(length) if length else b''
+    chunks = []
+    while size := int(handler.rfile.readline().split(b';', 1)[0], 16):
+        chunks.append(handler.rfile.read(size))
+        handler.rfile.readline()
+    # Trailers, up to the blank line that ends the body.
+    while handler.rfile.readline() not in (b'\r\n', b'\n', b''):
+        pass
+    return b''.join(chunks)
+
+
+class FakeZuvaServer:
+    """Threaded HTTP server imitating the Zuva API on a free localhost port."""
+
+    def __init__(self, latency=0.0, processing_time=0.0, failure_rate: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: float = None, burst: float = None,
+                 pages: int = 2, chars_per_page: int = 3000, handshake=0.0,
+                 bandwidth: float = None, seed: int = 0, host: str = '127.0.0.1', port: int = 0):
+        """
+        `failure_rate` is the share of requests (OCR, extraction, ...) that end
+        as `failed`, and `error_rate` the share of calls answered with HTTP 503.
+        `rate_limit` calls per second are allowed (in bursts of `burst`, by
+        default one second's worth); calls beyond it get HTTP 429 with a
+        `Retry-After` header. Uploads that are not UTF-8 text are OCRed as
+        `pages` generated pages of `chars_per_page` characters. `handshake` is
+        added to the first call of every connection, and `bandwidth` is in
+        bytes per second.
+        """
+        self.latency = latency
+        self.processing_time = processing_time
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.pages = pages
+        self.chars_per_page = chars_per_page
+        self.handshake = handshake
+        self.bandwidth = bandwidth
+        self.seed = seed
+        self.calls = collections.Counter()
+        self.connections = 0
+        self.files = {}
+        self.requests = {}
+        self.fields = {}
+        self._rng = random.Random(seed)
+        self._ids = 0
+        self._documents = {}
+        self._bucket = _TokenBucket(rate_limit, burst or max(rate_limit, 1)) \
+            if rate_limit else None
+        self._lock = threading.Lock()
+        for name in FIELD_NAMES:
+            self._add_field(name, is_custom=False, is_trained=True)
+
+        self._routes = [
+            ('POST', r'/files', 'files.create', self._create_file),
+            ('DELETE', r'/files/(\w+)', 'files.delete', self._delete_file),
+            ('POST', r'/files/ocr', 'ocr.create', self._create_requests('ocr')),
+            ('GET', r'/files/ocr/(\w+)', 'ocr.get', self._get_request('ocr')),
+            ('GET', r'/files/ocr/(\w+)/text', 'ocr.text', self._ocr_text),
+            ('GET', r'/files/ocr/(\w+)/layouts', 'ocr.layouts', self._ocr_layouts),
+            ('POST', r'/files/language', 'language.create', self._create_requests('language')),
+            ('GET', r'/files/language/(\w+)', 'language.get', self._get_request('language')),
+            ('POST', r'/files/classification', 'classification.create',
+             self._create_requests('classification')),
+            ('GET', r'/files/classification/(\w+)', 'classification.get',
+             self._get_request('classification')),
+            ('POST', r'/extraction', 'extraction.create', self._create_requests('extraction')),
+            ('GET', r'/extraction/(\w+)', 'extraction.get', self._get_request('extraction')),
+            ('GET', r'/extraction/(\w+)/results/text', 'extraction.results',
+             self._extraction_results),
+            ('GET', r'/fields', 'fields.get', self._list_fields),
+            ('POST', r'/fields', 'fields.create', self._create_field),
+            ('POST', r'/fields/([\w-]+)/train', 'fields.train', self._train_field),
+            ('GET', r'/fields/([\w-]+)/train/(\w+)', 'fields.train.get',
+             self._get_training),
+            ('GET', r'/fields/([\w-]+)/accuracy', 'fields.accuracy', self._field_accuracy),
+            ('GET', r'/fields/([\w-]+)/metadata', 'fields.metadata', self._field_metadata),
+            ('GET', r'/fields/([\w-]+)/validation-details', 'fields.validation',
+             self._field_validation),
+        ]
+        self._routes = [(method, re.compile(pattern + '$'), name, action)
+                        for method, pattern, name, action in self._routes]
+        self._httpd = http.server.ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}{API_PREFIX}'
+
+    def start(self) -> 'FakeZuvaServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'FakeZuvaServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _new_id(self) -> str:
+        # Called with self._lock held; sequential so runs are reproducible.
+        self._ids += 1
+        return f'{self.seed:04x}{self._ids:016x}'
+
+    # Files
+
+    def _create_file(self, request):
+        expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=7)
+        with self._lock:
+            file_id = self._new_id()
+            self.files[file_id] = request.body
+        return 201, {
+            'file_id': file_id,
+            'attributes': {'content-type': 'application/pdf'},
+            'permissions': ['delete'],
+            'expiration': expiration.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+
+    def _delete_file(self, request, file_id):
+        with self._lock:
+            if self.files.pop(file_id, None) is None:
+                return 404, {'error': {'code': 'not_found', 'message': file_id}}
+        return 204, b''
+
+    # Requests
+
+    def _new_request(self, kind: str, **entry) -> dict:
+        # Called with self._lock held.
+        request_id = self._new_id()
+        entry.update(request_id=request_id, kind=kind, created=time.monotonic(),
+                     duration=_seconds(self.processing_time, self._rng),
+                     fails=self._rng.random() < self.failure_rate)
+        self.requests[request_id] = entry
+        return entry
+
+    @staticmethod
+    def _status(entry: dict) -> str:
+        elapsed = time.monotonic() - entry['created']
+        if elapsed < entry['duration']:
+            return 'queued' if elapsed < entry['duration'] / 10 else 'processing'
+        return 'failed' if entry['fails'] else 'complete'
+
+    def _create_requests(self, kind: str):
+        def create(request):
+            body = json.loads(request.body or b'{}')
+            created = []
+            with self._lock:
+                for file_id in body.get('file_ids', []):
+                    if file_id not in self.files:
+                        return 400, {'error': {'code': 'invalid_file', 'message': file_id}}
+                for file_id in body.get('file_ids', []):
+                    entry = self._new_request(kind, file_id=file_id)
+                    if kind == 'extraction':
+                        entry['field_ids'] = list(body.get('field_ids', []))
+                    created.append(self._describe(entry))
+            return 202, {'file_ids': created}
+        return create
+
+    def _describe(self, entry: dict) -> dict:
+        described = {'file_id': entry['file_id'], 'request_id': entry['request_id'],
+                     'status': self._status(entry)}
+        if 'field_ids' in entry:
+            described['field_ids'] = entry['field_ids']
+        return described
+
+    def _finished(self, kind: str, request_id: str):
+        """`(entry, None)` for a complete request, or `(None, error response)`."""
+        entry = self.requests.get(request_id)
+        if entry is None or entry['kind'] != kind:
+            return None, (404, {'error': {'code': 'not_found', 'message': request_id}})
+        if self._status(entry) != 'complete':
+            return None, (409, {'error': {'code': 'not_complete',
+                                          'message': f'{request_id} is {self._status(entry)}'}})
+        return entry, None
+
+    def _get_request(self, kind: str):
+        def get(request, request_id):
+            entry = self.requests.get(request_id)
+            if entry is None or entry['kind'] != kind:
+                return 404, {'error': {'code': 'not_found', 'message': request_id}}
+            described = self._describe(entry)
+            if described['status'] == 'complete':
+                rng = self._file_rng(entry['file_id'])
+                if kind == 'language':
+                    described['language'] = 'English'
+                elif kind == 'classification':
+                    described['classification'], described['is_contract'] = \
+                        rng.choice(CLASSIFICATIONS)
+                elif kind == 'ocr':
+                    text, document = self._document(entry['file_id'])
+                    described['page_count'] = len(document.pages)
+                    described['character_count'] = len(text)
+            return 200, described
+        return get
+
+    # OCR
+
+    def _file_rng(self, file_id: str) -> random.Random:
+        """Random numbers that only depend on the seed and the content of a file."""
+        content = self.files.get(file_id, b'')
+        return random.Random(hashlib.sha256(str(self.seed).encode() + content).digest())
+
+    def _document(self, file_id: str):
+        """OCR text and layouts `Document` of a file, built on first use."""
+        with self._lock:
+            cached = self._documents.get(file_id)
+        if cached is not None:
+            return cached
+
+        if LAYOUTS_DIRECTORY not in sys.path:
+            sys.path.append(LAYOUTS_DIRECTORY)
+        import synthetic
+
+        content = self.files.get(file_id, b'')
+        try:
+            text = content.decode('utf-8')
+            if content.startswith(b'%PDF'):
+                raise ValueError('not text')
+            document = synthetic.document_from_text(text, self.chars_per_page)
+        except ValueError:
+            document = synthetic.make_document(self.pages, self.chars_per_page,
+                                               seed=self._file_rng(file_id).getrandbits(32))
+            text = ''.join(chr(c.unicode) for c in document.characters)
+        with self._lock:
+            self._documents[file_id] = (text, document)
+        return text, document
+
+    def _ocr_text(self, request, request_id):
+        entry, error = self._finished('ocr', request_id)
+        if error:
+            return error
+        text, _ = self._document(entry['file_id'])
+        return 200, {'file_id': entry['file_id'], 'request_id': request_id, 'text': text}
+
+    def _ocr_layouts(self, request, request_id):
+        entry, error = self._finished('ocr', request_id)
+        if error:
+            return error
+        _, document = self._document(entry['file_id'])
+        return 200, document.SerializeToString()
+
+    # Extraction
+
+    def _extraction_results(self, request, request_id):
+        entry, error = self._finished('extraction', request_id)
+        if error:
+            return error
+        text, document = self._document(entry['file_id'])
+        rng = self._file_rng(entry['file_id'])
+        page_starts = [page.range.start for page in document.pages]
+
+        def page_of(offset):
+            page = 1
+            while page < len(page_starts) and page_starts[page] <= offset:
+                page += 1
+            return page
+
+        results = []
+        for field_id in entry['field_ids']:
+            extractions = []
+            for _ in range(rng.randint(0, 2)):
+                if len(text) < 2:
+                    break
+                start = rng.randrange(len(text) - 1)
+                end = min(len(text), start + rng.randint(20, 400))
+                extractions.append({
+                    'text': text[start:end],
+                    'spans': [{'start': start, 'end': end,
+                               'pages': {'start': page_of(start), 'end': page_of(end - 1)}}],
+                })
+            results.append({'field_id': field_id, 'extractions': extractions})
+        return 200, {'file_id': entry['file_id'], 'request_id': request_id, 'results': results}
+
+    # Fields and training
+
+    def _add_field(self, name: str, description: str = '', is_custom: bool = True,
+                   is_trained: bool = False) -> str:
+        # Field ids are UUIDs derived from the name, like the built-in fields' ids.
+        digest = hashlib.sha256(f'{self.seed} {name} {len(self.fields)}'.encode()).hexdigest()
+        field_id = f'{digest[:8]}-{digest[8:12]}-{digest[12:16]}-{digest[16:20]}-{digest[20:32]}'
+        self.fields[field_id] = {
+            'field_id': field_id, 'name': name, 'description': description,
+            'bias': 0.0, 'f_score': 0.0, 'precision': 0.0, 'recall': 0.0,
+            'document_count': 0, 'is_custom': is_custom, 'is_trained': is_trained,
+            'file_ids': [], 'annotations': [],
+        }
+        return field_id
+
+    _PUBLIC_FIELD_KEYS = ('field_id', 'name', 'description', 'bias', 'f_score', 'precision',
+                          'recall', 'document_count', 'is_custom', 'is_trained')
+
+    def _list_fields(self, request):
+        with self._lock:
+            return 200, [{key: field[key] for key in self._PUBLIC_FIELD_KEYS}
+                         for field in self.fields.values()]
+
+    def _create_field(self, request):
+        body = json.loads(request.body or b'{}')
+        with self._lock:
+            field_id = self._add_field(body.get('field_name', ''), body.get('description', ''))
+            source = self.fields.get(body.get('from_field_id'))
+            if source is not None:
+                self.fields[field_id]['is_trained'] = source['is_trained']
+        return 201, {'field_id': field_id}
+
+    def _field(self, field_id):
+        field = self.fields.get(field_id)
+        if field is None:
+            return None, (404, {'error': {'code': 'not_found', 'message': field_id}})
+        return field, None
+
+    def _train_field(self, request, field_id):
+        body = json.loads(request.body or b'[]')
+        # The SDK sends the annotations list itself, or wrapped in an object.
+        annotations = body.get('annotations', body) if isinstance(body, dict) else body
+        if isinstance(annotations, str):
+            annotations = json.loads(annotations)
+        with self._lock:
+            field, error = self._field(field_id)
+            if error:
+                return error
+            field['annotations'] = annotations
+            field['file_ids'] = [annotation['file_id'] for annotation in annotations]
+            entry = self._new_request('training', file_id=None, field_id=field_id)
+        return 202, {'field_id': field_id, 'request_id': entry['request_id'],
+                     'status': self._status(entry)}
+
+    def _get_training(self, request, field_id, request_id):
+        entry = self.requests.get(request_id)
+        if entry is None or entry['kind'] != 'training' or entry['field_id'] != field_id:
+            return 404, {'error': {'code': 'not_found', 'message': request_id}}
+        status = self._status(entry)
+        if status == 'complete':
+            with self._lock:
+                field = self.fields[field_id]
+                field['is_trained'] = True
+                field['document_count'] = len(field['file_ids'])
+                field['precision'], field['recall'] = 0.75, 0.9
+                field['f_score'] = 2 * 0.75 * 0.9 / (0.75 + 0.9)
+        return 200, {'field_id': field_id, 'request_id': request_id, 'status': status}
+
+    def _field_accuracy(self, request, field_id):
+        field, error = self._field(field_id)
+        if error:
+            return error
+        return 200, {'field_id': field_id, 'precision': field['precision'],
+                     'recall': field['recall'], 'f_score': field['f_score'],
+                     'example_count': field['document_count']}
+
+    def _field_metadata(self, request, field_id):
+        field, error = self._field(field_id)
+        if error:
+            return error
+        return 200, {'field_id': field_id, 'name': field['name'],
+                     'description': field['description'], 'file_ids': field['file_ids']}
+
+    def _field_validation(self, request, field_id):
+        field, error = self._field(field_id)
+        if error:
+            return error
+        details = []
+        for i, annotation in enumerate(field['annotations']):
+            for location in annotation.get('locations', []):
+                # The first examples train the initial model and are never validated.
+                details.append({'file_id': annotation['file_id'], 'type': 'fn' if i < 10 else 'tp',
+                                'location': {'character_start': location['start'],
+                                             'character_end': location['end']}})
+        return 200, details
+
+    # HTTP
+
+    def _dispatch(self, handler, method: str):
+        path = handler.path.split('?', 1)[0]
+        if path.startswith(API_PREFIX):
+            path = path[len(API_PREFIX):]
+        handler.body = _read_body(handler)
+        self._transfer(len(handler.body))
+        if handler.headers.get('Content-Encoding') == 'gzip':
+            handler.body = gzip.decompress(handler.body)
+        headers = {}
+
+        for route_method, pattern, name, action in self._routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                with self._lock:
+                    self.calls[name] += 1
+                    wait = self._bucket.take() if self._bucket else 0.0
+                    error = not wait and self._rng.random() < self.error_rate
+                    latency = _seconds(self.latency, self._rng)
+                if latency:
+                    time.sleep(latency)
+                if wait:
+                    with self._lock:
+                        self.calls['throttled'] += 1
+                    headers['Retry-After'] = f'{wait:.3f}'
+                    status, payload = 429, {'error': {'code': 'too_many_requests',
+                                                      'message': 'Rate limit exceeded'}}
+                elif error:
+                    with self._lock:
+                        self.calls['errors'] += 1
+                    status, payload = 503, {'error': {'code': 'unavailable',
+                                                      'message': 'Try again later'}}
+                else:
+                    status, payload = action(handler, *match.groups())
+                break
+        else:
+            status, payload = 404, {'error': {'code': 'not_found', 'message': path}}
+
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        if len(body) >= MIN_COMPRESS_SIZE and \
+                'gzip' in handler.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        self._transfer(len(body))
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/octet-stream'
+                            if isinstance(payload, bytes) else 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _transfer(self, size: int):
+        if self.bandwidth:
+            time.sleep(size / self.bandwidth)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; don't let them wait for an ACK.
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server._lock:
+                    server.connections += 1
+                    handshake = _seconds(server.handshake, server._rng)
+                if handshake:
+                    time.sleep(handshake)
+
+            def do_GET(self):
+                server._dispatch(self, 'GET')
+
+            def do_POST(self):
+                server._dispatch(self, 'POST')
+
+            def do_PUT(self):
+                server._dispatch(self, 'PUT')
+
+            def do_DELETE(self):
+                server._dispatch(self, 'DELETE')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a fake Zuva API on localhost.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, nargs='+', default=[0.0],
+                        help='seconds per call, or a range: LOW HIGH')
+    parser.add_argument('--processing-time', type=float, nargs='+', default=[0.0],
+                        help='seconds per request, or a range: LOW HIGH')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=None, help='calls per second')
+    parser.add_argument('--handshake', type=float, default=0.0,
+                        help='seconds added to the first call of every connection')
+    parser.add_argument('--bandwidth', type=float, default=None, help='bytes per second')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    def spec(values):
+        return values[0] if len(values) == 1 else tuple(values[:2])
+
+    server = FakeZuvaServer(latency=spec(args.latency), processing_time=spec(args.processing_time),
+                            failure_rate=args.failure_rate, error_rate=args.error_rate,
+                            rate_limit=args.rate_limit, handshake=args.handshake,
+                            bandwidth=args.bandwidth, seed=args.seed,
+                            host=args.host, port=args.port)
+    print(f'Fake Zuva API listening on {server.url}')
+    server.start()
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+        print(dict(server.calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Local cache of the Zuva field catalog.
+
+`spreadsheet.py` downloads all of the ~1300 fields with `sdk.fields.get()`
+on every run, only to look up the ids of a handful of them by name.
+`FieldCatalog` keeps the catalog in a JSON file and only asks Zuva again
+once the file is older than its time-to-live, or when a name that is not in
+the cached catalog is looked up (e.g. a custom field created since):
+
+    catalog = FieldCatalog(sdk)
+    field_ids = catalog.ids(['Title', 'Parties', '"Confidential Information" Definition'])
+    catalog.name(field_ids[0])           # 'Title'
+    catalog.search('confidential')       # fields whose name contains or starts with it
+
+Names are matched exactly first, then ignoring case and the difference
+between straight and curly quotes. `search` and `suggest` help finding a
+field whose exact name is not known.
+"""
+
+import bisect
+import dataclasses
+import difflib
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'zuva')
+DEFAULT_TTL = 24 * 60 * 60
+# A name missing from the cache triggers a refresh, but not more often than this.
+MIN_REFRESH_INTERVAL = 5 * 60
+
+_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+
+def normalize_name(name: str) -> str:
+    """Case and quote-style insensitive form of a field name."""
+    return ' '.join(name.translate(_QUOTES).casefold().split())
+
+
+@dataclasses.dataclass(slots=True)
+class CatalogField:
+    """The parts of a field returned by `sdk.fields.get()` kept in the cache."""
+
+    id: str
+    name: str
+    description: str = None
+    is_custom: bool = None
+
+
+class FieldCatalog:
+    """Field catalog of one Zuva region/account, cached on disk with a time-to-live."""
+
+    def __init__(self, sdk, path: str = None, ttl: float = DEFAULT_TTL):
+        """
+        The cache file defaults to one per API url and token under `~/.cache/zuva`,
+        as custom fields differ between accounts.
+        """
+        self.sdk = sdk
+        self.ttl = ttl
+        if path is None:
+            account = f'{getattr(sdk, "url", "")} {getattr(sdk, "token", "")}'
+            digest = hashlib.sha256(account.encode()).hexdigest()[:16]
+            path = os.path.join(DEFAULT_DIRECTORY, f'fields-{digest}.json')
+        self.path = path
+        self.fetched_at = 0.0
+        self.fields = []
+        self._by_id = {}
+        self._by_name = {}
+        self._by_normalized = {}
+        self._sorted_names = []
+
+        if not self._load() or self.is_stale():
+            self.refresh()
+
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at > self.ttl
+
+    def _load(self) -> bool:
+        """Read the cache file; a missing or malformed one is a cache miss."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                cached = json.load(f)
+            fetched_at = float(cached['fetched_at'])
+            entries = cached['fields']
+            if not isinstance(entries, list) or not all(isinstance(e, list) for e in entries):
+                return False
+            fields = [CatalogField(*entry) for entry in entries]
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        if not all(isinstance(f.id, str) and isinstance(f.name, str) for f in fields):
+            return False
+        self._index(fields, fetched_at)
+        return True
+
+    def refresh(self):
+        """Download the catalog from Zuva and rewrite the cache file."""
+        fields, _ = self.sdk.fields.get()
+        catalog = [CatalogField(f.id, f.name, getattr(f, 'description', None),
+                                getattr(f, 'is_custom', None)) for f in fields]
+        self._index(catalog, time.time())
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': self.fetched_at,
+                       'fields': [dataclasses.astuple(field) for field in catalog]},
+                      f, ensure_ascii=False)
+        os.replace(temporary, self.path)
+
+    def _index(self, fields, fetched_at):
+        self.fields = fields
+        self.fetched_at = fetched_at
+        self._by_id = {f.id: f for f in fields}
+        self._by_name = {}
+        self._by_normalized = {}
+        for f in fields:
+            self._by_name.setdefault(f.name, []).append(f)
+            self._by_normalized.setdefault(normalize_name(f.name), []).append(f)
+        self._sorted_names = sorted(self._by_normalized)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def get(self, field_id: str) -> CatalogField:
+        return self._by_id[field_id]
+
+    def name(self, field_id: str) -> str:
+        return self._by_id[field_id].name
+
+    def _lookup(self, name: str):
+        return self._by_name.get(name) or self._by_normalized.get(normalize_name(name))
+
+    def find(self, name: str):
+        """
+        All fields called `name` (usually exactly one).
+
+        If none is found and the cache has not been refreshed for a few
+        minutes, the catalog is downloaded again before giving up.
+        """
+        found = self._lookup(name)
+        if not found and time.time() - self.fetched_at > MIN_REFRESH_INTERVAL:
+            self.refresh()
+            found = self._lookup(name)
+        return list(found or [])
+
+    def ids(self, names) -> list:
+        """
+        Ids of the fields called `names`, in the same order.
+
+        Raises `KeyError` naming every unknown field, with suggestions.
+        """
+        ids = []
+        missing = []
+        for name in names:
+            found = self.find(name)
+            if found:
+                ids.extend(f.id for f in found)
+            else:
+                missing.append(name)
+        if missing:
+            hints = '; '.join(f'{name!r}: did you mean {self.suggest(name)}?' for name in missing)
+            raise KeyError(f'Unknown field(s): {hints}')
+        return ids
+
+    def search(self, prefix: str, limit: int = 20):
+        """
+        Fields whose normalized name starts with `prefix`, followed by those that contain it.
+
+        The prefix matches are found by bisecting the sorted names.
+        """
+        prefix = normalize_name(prefix)
+        matches = []
+        i = bisect.bisect_left(self._sorted_names, prefix)
+        while i < len(self._sorted_names) and self._sorted_names[i].startswith(prefix):
+            matches.extend(self._by_normalized[self._sorted_names[i]])
+            i += 1
+        if len(matches) < limit:
+            seen = set(id(f) for f in matches)
+            for name in self._sorted_names:
+                if prefix in name and not name.startswith(prefix):
+                    matches.extend(f for f in self._by_normalized[name] if id(f) not in seen)
+        return matches[:limit]
+
+    def suggest(self, name: str, limit: int = 3):
+        """Names of the fields most similar to `name`."""
+        close = difflib.get_close_matches(normalize_name(name), self._sorted_names,
+                                          n=limit, cutoff=0.6)
+        return [self._by_normalized[match][0].name for match in close]
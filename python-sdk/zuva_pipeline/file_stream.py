@@ -0,0 +1,121 @@
+"""
+Uploading large files without reading them into memory.
+
+The tutorials upload with `sdk.file.create(content=f.read())`, which holds
+the whole file in memory while it is sent: a 500 MB scanned exhibit costs
+500 MB of RAM per upload in flight. `FileStream` is an iterable view of a
+file on disk with a length, which `requests` sends block by block with the
+right Content-Length, so memory use does not depend on the size of the file.
+It hashes the content as it goes, so the SHA-256 of what was actually sent
+is known at the end:
+
+    with FileStream(path) as content:
+        file, _ = sdk.file.create(content=content)
+    print(file.id, content.hexdigest())
+
+`upload_stream` wraps that with retries. `POST /files` takes a whole file
+per call, so an upload interrupted halfway cannot continue where it
+stopped; it is sent again from the start of the file, streamed again from
+disk. What does resume is a batch: with an `UploadLedger`, files that were
+already uploaded (by this run or an earlier one) are not sent again.
+"""
+
+import hashlib
+import mmap
+import os
+
+from .retry import call_with_retries
+
+# Bytes read from disk and sent at a time.
+CHUNK_SIZE = 1 << 20
+
+
+class ChecksumMismatch(Exception):
+    """The content sent differs from the content expected, e.g. the file changed during the upload."""
+
+
+class FileStream:
+    """Read-only, hashing view of a file for streaming uploads, one block at a time."""
+
+    def __init__(self, path: str, chunk_size: int = CHUNK_SIZE, use_mmap: bool = False):
+        """
+        With `use_mmap`, blocks are copied out of a memory-mapped view of the
+        file instead of being read from it.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self._file = open(path, 'rb')
+        # Only the bytes present when the upload starts are sent.
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if use_mmap and self.size else None
+        self._position = 0
+        self._digest = hashlib.sha256()
+
+    def __len__(self) -> int:
+        # `requests` sends this as the Content-Length.
+        return self.size - self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    # No `read()`: urllib3 would call it for blocks of 16 KiB, while it sends
+    # the blocks of an iterable as they come.
+    def _next_block(self) -> bytes:
+        size = min(self.chunk_size, self.size - self._position)
+        if self._map is not None:
+            chunk = self._map[self._position:self._position + size]
+        else:
+            chunk = self._file.read(size)
+        self._position += len(chunk)
+        self._digest.update(chunk)
+        return chunk
+
+    def __iter__(self):
+        while chunk := self._next_block():
+            yield chunk
+
+    @property
+    def sent(self) -> int:
+        """Bytes read so far."""
+        return self._position
+
+    def hexdigest(self) -> str:
+        """SHA-256 of the bytes read so far; of the whole file once it has been sent."""
+        return self._digest.hexdigest()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> 'FileStream':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def upload_stream(sdk, path: str, retries: int = 3, sha256: str = None,
+                  chunk_size: int = CHUNK_SIZE, use_mmap: bool = False):
+    """
+    Upload `path` with `sdk.file.create`, streaming it from disk.
+
+    Returns `(file, sha256)`, the SDK's `File` and the SHA-256 of the content
+    sent. A failed attempt is retried from the start of the file. If
+    `sha256` is given and the content sent does not match it,
+    `ChecksumMismatch` is raised (the file is left on Zuva).
+    """
+    def attempt():
+        with FileStream(path, chunk_size, use_mmap) as content:
+            file, _ = sdk.file.create(content=content)
+            if content.sent != content.size:
+                raise ChecksumMismatch(f'{path} got shorter while uploading')
+            return file, content.hexdigest()
+
+    file, digest = call_with_retries(attempt, retries=retries)
+    if sha256 is not None and digest != sha256:
+        raise ChecksumMismatch(f'{path} was uploaded as {digest}, expected {sha256} '
+                               f'(file {file.id})')
+    return file, digest
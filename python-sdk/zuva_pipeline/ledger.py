@@ -0,0 +1,184 @@
+"""
+Remembering which files were already uploaded to Zuva.
+
+Every tutorial uploads all of its documents again each time it is run, and
+`training/upload_files` even contains the same document twice under two
+names. `UploadLedger` records the `file_id` and `expiration` returned by
+`sdk.file.create` against the SHA-256 of the file's content, in a JSON file.
+Uploading a file whose content is in the ledger and has not expired yet
+returns the recorded file id without sending the bytes again; once the file
+has expired on Zuva it is uploaded again and the ledger is updated:
+
+    ledger = UploadLedger(sdk)
+    file = ledger.upload('upload_files/CANADAGOOS-F1Securiti-2152017.PDF')
+    print(file.id, file.expiration, file.reused)
+
+Files are hashed in fixed-size chunks, so hashing never holds a whole file
+in memory; a file is only read in full when it actually has to be uploaded,
+and not even then with `ledger.upload(path, stream=True)`.
+"""
+
+import dataclasses
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from .file_stream import upload_stream
+from .retry import call_with_retries
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'zuva')
+CHUNK_SIZE = 1 << 20
+# A recorded file that expires sooner than this is uploaded again rather than
+# reused, so that it does not disappear while the requests using it run.
+EXPIRY_MARGIN = datetime.timedelta(hours=1)
+
+
+def content_sha256(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """Hex SHA-256 of a file's content, read `chunk_size` bytes at a time."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_expiration(expiration):
+    """
+    The `expiration` of a `File` as an aware `datetime`, or None if it cannot be parsed.
+
+    Zuva returns it as an ISO 8601 string such as `2023-02-07T15:01:58Z`.
+    """
+    if isinstance(expiration, datetime.datetime):
+        parsed = expiration
+    else:
+        try:
+            parsed = datetime.datetime.fromisoformat(str(expiration).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+@dataclasses.dataclass(slots=True)
+class LedgerFile:
+    """
+    A file known to Zuva, as returned by `UploadLedger.upload`.
+
+    It has the `id`, `name` and `expiration` attributes the tutorials use from
+    the SDK's `File`; `reused` tells whether the upload was skipped.
+    """
+
+    id: str
+    name: str
+    expiration: str
+    sha256: str
+    reused: bool = False
+
+
+class UploadLedger:
+    """File ids uploaded to one Zuva region/account, keyed by the SHA-256 of their content."""
+
+    def __init__(self, sdk, path: str = None, expiry_margin=EXPIRY_MARGIN):
+        """
+        The ledger file defaults to one per API url and token under `~/.cache/zuva`,
+        as file ids are only valid for the account that uploaded them.
+        """
+        self.sdk = sdk
+        self.expiry_margin = expiry_margin
+        if path is None:
+            account = f'{getattr(sdk, "url", "")} {getattr(sdk, "token", "")}'
+            digest = hashlib.sha256(account.encode()).hexdigest()[:16]
+            path = os.path.join(DEFAULT_DIRECTORY, f'uploads-{digest}.json')
+        self.path = path
+        # sha256 -> (file_id, expiration)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._content_locks = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = {sha256: tuple(entry) for sha256, entry in json.load(f).items()}
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save(self):
+        # Called with self._lock held.
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(temporary, self.path)
+
+    def is_live(self, expiration, now=None) -> bool:
+        """Whether a file expiring at `expiration` can still be used."""
+        expires = parse_expiration(expiration)
+        if expires is None:
+            return False
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return expires - self.expiry_margin > now
+
+    def lookup(self, sha256: str):
+        """The `(file_id, expiration)` recorded for `sha256` if it is still live, else None."""
+        with self._lock:
+            entry = self.entries.get(sha256)
+        if entry is not None and self.is_live(entry[1]):
+            return entry
+        return None
+
+    def record(self, sha256: str, file_id: str, expiration):
+        with self._lock:
+            self.entries[sha256] = (file_id, str(expiration))
+            self._save()
+
+    def forget(self, file_id: str):
+        """Drop a file id, e.g. after deleting the file with `sdk.file.delete`."""
+        with self._lock:
+            self.entries = {sha256: entry for sha256, entry in self.entries.items()
+                            if entry[0] != file_id}
+            self._save()
+
+    def prune(self):
+        """Drop every expired entry; returns how many were removed."""
+        with self._lock:
+            live = {sha256: entry for sha256, entry in self.entries.items()
+                    if self.is_live(entry[1])}
+            removed = len(self.entries) - len(live)
+            self.entries = live
+            self._save()
+        return removed
+
+    def upload(self, path: str, retries: int = 3, stream: bool = False) -> LedgerFile:
+        """
+        The Zuva file for the content of `path`, uploading it only if needed.
+
+        Safe to call from several threads: files with the same content are
+        uploaded at most once, even when they are uploaded concurrently.
+        With `stream`, the file is sent from disk in blocks and the content
+        sent is checked against the hash it is recorded under.
+        """
+        name = os.path.basename(path)
+        sha256 = content_sha256(path)
+        with self._lock:
+            content_lock = self._content_locks.setdefault(sha256, threading.Lock())
+
+        with content_lock:
+            entry = self.lookup(sha256)
+            if entry is not None:
+                return LedgerFile(entry[0], name, entry[1], sha256, reused=True)
+
+            if stream:
+                file, _ = upload_stream(self.sdk, path, retries=retries, sha256=sha256)
+            else:
+                with open(path, 'rb') as f:
+                    content = f.read()
+                file, _ = call_with_retries(self.sdk.file.create, content=content,
+                                            retries=retries)
+            self.record(sha256, file.id, file.expiration)
+            return LedgerFile(file.id, name, str(file.expiration), sha256)
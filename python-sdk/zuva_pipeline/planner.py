@@ -0,0 +1,146 @@
+"""
+Creating Zuva requests in as few calls as possible.
+
+Every `create` call of the SDK accepts a list of file ids, but `training.py`
+creates its OCR requests one file at a time:
+
+    for example in training_examples:
+        ocr_requests, _ = sdk.ocr.create(file_ids=[example['file_id']])
+
+and `spreadsheet.py` makes its language, classification and extraction calls
+one after the other. `SubmissionPlanner` groups what has to be submitted by
+service (and, for extractions, by field set), splits each group into calls of
+at most `max_files` files, sends those calls concurrently and maps the
+returned requests back to their files:
+
+    planner = SubmissionPlanner(sdk)
+    submission = planner.submit([f.id for f in zuva_files],
+                                [LANGUAGE, CLASSIFICATION, EXTRACTION], field_ids)
+    submission.requests[EXTRACTION][file_id]    # the extraction request of one file
+    tracker.add_all(submission.all())
+
+`plan` accepts arbitrary `(file_id, service, field_ids)` items, e.g. when some
+files only need some of the services.
+"""
+
+import collections
+import concurrent.futures
+import dataclasses
+
+from .results import CLASSIFICATION, EXTRACTION, LANGUAGE
+from .retry import call_with_retries
+
+OCR = 'ocr'
+
+# Most file ids sent in one create call. Larger batches are split.
+MAX_FILES_PER_CALL = 100
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclasses.dataclass(slots=True)
+class PlannedCall:
+    """One `create` call: a service, the files to send and, for extractions, the fields."""
+
+    service: str
+    file_ids: list
+    field_ids: tuple = None
+
+
+@dataclasses.dataclass(slots=True)
+class Submission:
+    """The requests created by `SubmissionPlanner.dispatch`, by service and then file id."""
+
+    requests: dict = dataclasses.field(default_factory=lambda: collections.defaultdict(dict))
+    calls: int = 0
+
+    def all(self) -> list:
+        requests = []
+        for by_file in self.requests.values():
+            for request in by_file.values():
+                requests.extend(request if isinstance(request, list) else [request])
+        return requests
+
+
+class SubmissionPlanner:
+    """Groups files and services into the fewest `create` calls and sends them concurrently."""
+
+    def __init__(self, sdk, max_files: int = MAX_FILES_PER_CALL, max_fields: int = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS, retries: int = 3):
+        """
+        `max_files` (and `max_fields` for extractions) bound the size of each
+        call; `max_workers` calls are in flight at once.
+        """
+        self.sdk = sdk
+        self.max_files = max_files
+        self.max_fields = max_fields
+        self.max_workers = max_workers
+        self.retries = retries
+        self._create = {
+            OCR: lambda file_ids, field_ids: sdk.ocr.create(file_ids=file_ids),
+            LANGUAGE: lambda file_ids, field_ids: sdk.language.create(file_ids=file_ids),
+            CLASSIFICATION: lambda file_ids, field_ids: sdk.classification.create(
+                file_ids=file_ids),
+            EXTRACTION: lambda file_ids, field_ids: sdk.extraction.create(
+                file_ids=file_ids, field_ids=list(field_ids)),
+        }
+
+    def plan(self, items) -> list:
+        """
+        The `PlannedCall`s for `(file_id, service, field_ids)` items.
+
+        Items with the same service and field set share calls, in the order
+        they were given; duplicate items are sent once.
+        """
+        groups = {}
+        for file_id, service, field_ids in items:
+            if service not in self._create:
+                raise ValueError(f'Unknown service {service!r}.')
+            key = (service, tuple(dict.fromkeys(field_ids)) if service == EXTRACTION else None)
+            groups.setdefault(key, {})[file_id] = None
+
+        calls = []
+        for (service, field_ids), file_ids in groups.items():
+            file_ids = list(file_ids)
+            field_chunks = [field_ids]
+            if field_ids is not None and self.max_fields:
+                field_chunks = [field_ids[i:i + self.max_fields]
+                                for i in range(0, len(field_ids), self.max_fields)]
+            for fields in field_chunks:
+                for i in range(0, len(file_ids), self.max_files):
+                    calls.append(PlannedCall(service, file_ids[i:i + self.max_files], fields))
+        return calls
+
+    def dispatch(self, calls) -> Submission:
+        """
+        Send `calls` concurrently and collect the requests they create.
+
+        When an extraction was split into several calls by `max_fields`, a
+        file has one request per call, and `requests[EXTRACTION][file_id]`
+        is a list of them.
+        """
+        submission = Submission()
+        split_fields = collections.Counter(
+            (call.service, file_id) for call in calls for file_id in call.file_ids)
+
+        def send(call):
+            created, _ = call_with_retries(self._create[call.service], call.file_ids,
+                                           call.field_ids, retries=self.retries)
+            return call, created
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for call, created in pool.map(send, calls):
+                submission.calls += 1
+                by_file = submission.requests[call.service]
+                for file_id, request in zip(call.file_ids, created):
+                    file_id = getattr(request, 'file_id', None) or file_id
+                    if split_fields[(call.service, file_id)] > 1:
+                        by_file.setdefault(file_id, []).append(request)
+                    else:
+                        by_file[file_id] = request
+        return submission
+
+    def submit(self, file_ids, services, field_ids=()) -> Submission:
+        """Create a request of every service in `services` for every file."""
+        field_ids = tuple(field_ids)
+        return self.dispatch(self.plan(
+            (file_id, service, field_ids) for service in services for file_id in file_ids))
@@ -0,0 +1,317 @@
+"""
+Keeping Zuva's results for documents that have not changed.
+
+Running `spreadsheet.py` again on the same folder creates language,
+classification and extraction requests for every document again, even
+though the results cannot have changed. `ResultCache` stores results in a
+SQLite database keyed by:
+
+- the SHA-256 of the document's content (as recorded by `UploadLedger`),
+- the service (`ocr_text`, `ocr_layouts`, `language`, `classification`,
+  `extraction`),
+- for extractions, the field id: results are stored one field at a time,
+  so a cached field set is simply the union of its fields,
+- a model version, chosen by the caller (bump it after retraining a custom
+  field, or to ignore results from before a Zuva model update).
+
+`CachingSubmitter` creates requests only for what is missing from the cache.
+For extractions, a document with some of the fields cached only gets a
+request for the other fields, and its cached results are merged back into
+the finished request:
+
+    cache = ResultCache(model_version='2023-02')
+    submitter = CachingSubmitter(sdk, cache, zuva_files)
+    cached, requests = submitter.submit(field_ids)
+    for request in cached:
+        exporter.write_rows(assembler.add(request))
+    tracker.add_all(requests)
+    for request in tracker.as_completed():
+        exporter.write_rows(assembler.add(submitter.complete(request)))
+
+Cached results come back as `CachedRequest`s, which answer the same calls as
+the SDK's finished requests (`is_type`, `is_successful`, `get_results`, ...),
+so `ResultAssembler` handles both alike.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import types
+
+from .results import ALL_SERVICES, CLASSIFICATION, EXTRACTION, LANGUAGE, REQUEST_CLASSES
+
+OCR_TEXT = 'ocr_text'
+OCR_LAYOUTS = 'ocr_layouts'
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'zuva', 'results.sqlite')
+
+
+class ResultCache:
+    """Results of Zuva services, keyed by (content hash, service, field id, model version)."""
+
+    def __init__(self, path: str = DEFAULT_PATH, model_version: str = ''):
+        self.path = path
+        self.model_version = model_version
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS results ('
+                             ' sha256 TEXT, service TEXT, field_id TEXT, model_version TEXT,'
+                             ' value BLOB,'
+                             ' PRIMARY KEY (sha256, service, field_id, model_version))')
+
+    def get(self, sha256: str, service: str, field_id: str = ''):
+        """The stored value, or None."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM results'
+                ' WHERE sha256 = ? AND service = ? AND field_id = ? AND model_version = ?',
+                (sha256, service, field_id, self.model_version)).fetchone()
+        return None if row is None else row[0]
+
+    def put_many(self, entries):
+        """Store `(sha256, service, field_id, value)` tuples in one transaction."""
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                [(sha256, service, field_id, self.model_version, value)
+                 for sha256, service, field_id, value in entries])
+
+    def put(self, sha256: str, service: str, value, field_id: str = ''):
+        self.put_many([(sha256, service, field_id, value)])
+
+    def get_json(self, sha256: str, service: str, field_id: str = ''):
+        value = self.get(sha256, service, field_id)
+        return None if value is None else json.loads(value)
+
+    def extractions(self, sha256: str, field_ids):
+        """
+        Cached extraction results of `field_ids` for one document.
+
+        Returns `{field_id: [result, ...]}` for the cached fields only; a field
+        that found nothing is cached as an empty list.
+        """
+        field_ids = list(field_ids)
+        if not field_ids:
+            return {}
+        placeholders = ', '.join('?' * len(field_ids))
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT field_id, value FROM results'
+                ' WHERE sha256 = ? AND service = ? AND model_version = ?'
+                f' AND field_id IN ({placeholders})',
+                (sha256, EXTRACTION, self.model_version, *field_ids)).fetchall()
+        return {field_id: json.loads(value) for field_id, value in rows}
+
+    def clear(self, sha256: str = None):
+        """Forget every result, or only those of one document."""
+        with self._lock, self._db:
+            if sha256 is None:
+                self._db.execute('DELETE FROM results')
+            else:
+                self._db.execute('DELETE FROM results WHERE sha256 = ?', (sha256,))
+
+    def close(self):
+        self._db.close()
+
+
+def _result_to_json(result) -> dict:
+    return {'field_id': result.field_id, 'text': result.text,
+            'spans': [{'start': getattr(span, 'start', None), 'end': getattr(span, 'end', None),
+                       'page_start': span.page_start, 'page_end': span.page_end}
+                      for span in result.spans]}
+
+
+def _result_from_json(result: dict):
+    return types.SimpleNamespace(
+        field_id=result['field_id'], text=result['text'],
+        spans=[types.SimpleNamespace(**span) for span in result['spans']])
+
+
+class CachedRequest:
+    """A finished request answered from `ResultCache` (or merged with it)."""
+
+    status = 'complete'
+
+    def __init__(self, service: str, file_id: str, results=None, **attributes):
+        self.service = service
+        self.id = f'cached-{service}-{file_id}'
+        self.file_id = file_id
+        self.results = results
+        self.__dict__.update(attributes)
+
+    def is_type(self, cls) -> bool:
+        return REQUEST_CLASSES.get(self.service) is cls
+
+    def is_finished(self) -> bool:
+        return True
+
+    def is_successful(self) -> bool:
+        return True
+
+    def is_failed(self) -> bool:
+        return False
+
+    def update(self):
+        pass
+
+    def get_results(self):
+        return self.results
+
+    def get_text(self) -> str:
+        return self.text
+
+    def get_layouts(self) -> bytes:
+        return self.layouts
+
+
+class CachingSubmitter:
+    """Creates Zuva requests for the results missing from a `ResultCache`."""
+
+    def __init__(self, sdk, cache: ResultCache, files):
+        """
+        `files` need `id` and `sha256` attributes, like the `LedgerFile`s
+        returned by `UploadLedger.upload`.
+        """
+        self.sdk = sdk
+        self.cache = cache
+        self.sha256 = {f.id: f.sha256 for f in files}
+        self.file_ids = list(self.sha256)
+        # request id -> (service, fields or OCR outputs requested,
+        #                cached results to merge, order of all requested fields)
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def submit(self, field_ids=(), services=ALL_SERVICES):
+        """
+        Returns `(cached, requests)`: `CachedRequest`s for the results found in
+        the cache, and the SDK requests created for the others.
+        """
+        cached = []
+        requests = []
+        field_ids = list(dict.fromkeys(field_ids))
+
+        for service, create, attributes in (
+                (LANGUAGE, self.sdk.language.create, ('language',)),
+                (CLASSIFICATION, self.sdk.classification.create, ('classification', 'is_contract'))):
+            if service not in services:
+                continue
+            missing = []
+            for file_id in self.file_ids:
+                value = self.cache.get_json(self.sha256[file_id], service)
+                if value is None:
+                    missing.append(file_id)
+                else:
+                    cached.append(CachedRequest(service, file_id, **dict(zip(attributes, value))))
+            self.hits += len(self.file_ids) - len(missing)
+            self.misses += len(missing)
+            if missing:
+                created, _ = create(file_ids=missing)
+                for request in created:
+                    self._pending[request.id] = (service, None, None, None)
+                requests.extend(created)
+
+        if EXTRACTION in services and field_ids:
+            cached_extractions, groups = self._plan_extractions(field_ids)
+            for file_id in groups.pop(frozenset(), ()):
+                cached.append(CachedRequest(EXTRACTION, file_id,
+                                            self._merge(cached_extractions[file_id], field_ids)))
+            for missing_fields, file_ids in groups.items():
+                missing_fields = [f for f in field_ids if f in missing_fields]
+                created, _ = self.sdk.extraction.create(file_ids=file_ids, field_ids=missing_fields)
+                for request in created:
+                    self._pending[request.id] = (EXTRACTION, missing_fields,
+                                                 cached_extractions[request.file_id], field_ids)
+                requests.extend(created)
+        return cached, requests
+
+    def _plan_extractions(self, field_ids):
+        """
+        The cached results of every file, and the files grouped by the set of
+        fields still missing for them, so each group needs a single request.
+        """
+        cached_extractions = {}
+        groups = {}
+        for file_id in self.file_ids:
+            partial = self.cache.extractions(self.sha256[file_id], field_ids)
+            cached_extractions[file_id] = partial
+            missing = frozenset(f for f in field_ids if f not in partial)
+            groups.setdefault(missing, []).append(file_id)
+            self.hits += len(partial)
+            self.misses += len(missing)
+        return cached_extractions, groups
+
+    @staticmethod
+    def _merge(partial, field_ids):
+        """Results of `partial` in the order of `field_ids`."""
+        return [_result_from_json(result)
+                for field_id in field_ids for result in partial.get(field_id, ())]
+
+    def submit_ocr(self, text=True, layouts=False):
+        """
+        Like `submit` for OCR: returns `(cached, requests)`, where `cached`
+        answers `get_text()` and/or `get_layouts()` from the cache.
+        """
+        services = [service for service, wanted in ((OCR_TEXT, text), (OCR_LAYOUTS, layouts))
+                    if wanted]
+        cached = []
+        missing = []
+        for file_id in self.file_ids:
+            values = {service: self.cache.get(self.sha256[file_id], service)
+                      for service in services}
+            if any(value is None for value in values.values()):
+                missing.append(file_id)
+            else:
+                cached.append(CachedRequest('ocr', file_id, text=values.get(OCR_TEXT),
+                                            layouts=values.get(OCR_LAYOUTS)))
+        self.hits += len(self.file_ids) - len(missing)
+        self.misses += len(missing)
+        requests = []
+        if missing:
+            requests, _ = self.sdk.ocr.create(file_ids=missing)
+            for request in requests:
+                self._pending[request.id] = ('ocr', services, None, None)
+        return cached, requests
+
+    def complete(self, request):
+        """
+        Store the results of a finished request created by `submit` or `submit_ocr`.
+
+        Returns the request to use from then on. For OCR and extraction, it is
+        a `CachedRequest` holding what was just downloaded, so that its
+        `get_text()`, `get_layouts()` and `get_results()` do not call the API
+        again; an extraction that only asked for some of the fields has the
+        cached results of the other fields merged in. Failed requests are
+        returned unchanged and nothing is stored.
+        """
+        service, requested, partial, field_ids = self._pending.pop(request.id, (None,) * 4)
+        if service is None or not request.is_successful():
+            return request
+        sha256 = self.sha256[request.file_id]
+
+        if service == LANGUAGE:
+            self.cache.put(sha256, LANGUAGE, json.dumps([request.language]))
+        elif service == CLASSIFICATION:
+            self.cache.put(sha256, CLASSIFICATION,
+                           json.dumps([request.classification, request.is_contract]))
+        elif service == 'ocr':
+            text = request.get_text() if OCR_TEXT in requested else None
+            layouts = self.sdk.ocr.get_layouts(request_id=request.id).response.content \
+                if OCR_LAYOUTS in requested else None
+            self.cache.put_many([(sha256, output, '', value)
+                                 for output, value in ((OCR_TEXT, text), (OCR_LAYOUTS, layouts))
+                                 if value is not None])
+            return CachedRequest('ocr', request.file_id, text=text, layouts=layouts)
+        else:
+            by_field = {field_id: [] for field_id in requested}
+            for result in request.get_results():
+                by_field.setdefault(result.field_id, []).append(_result_to_json(result))
+            self.cache.put_many([(sha256, EXTRACTION, field_id, json.dumps(results))
+                                 for field_id, results in by_field.items()])
+            return CachedRequest(EXTRACTION, request.file_id,
+                                 self._merge(dict(partial, **by_field), field_ids))
+        return request
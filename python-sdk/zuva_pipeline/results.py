@@ -0,0 +1,138 @@
+"""
+Assembling spreadsheet rows from finished Zuva requests.
+
+`spreadsheet.py` collects language, classification and extraction results
+per file in nested dictionaries and only turns them into rows at the end.
+`ResultAssembler` does the same with prebuilt `file_id` and `field_id`
+dictionaries and a slotted `ExtractionRow` per extracted span, so assembly
+stays linear in the number of results. Rows for a file are handed back as
+soon as all of its requests have finished, so they can be written out while
+other files are still being processed:
+
+    assembler = ResultAssembler(zuva_files, fields)
+    for request in tracker.as_completed():
+        for row in assembler.add(request):
+            writer.write(row)
+"""
+
+import dataclasses
+
+from zdai import DocumentClassificationRequest, FieldExtractionRequest, \
+    LanguageClassificationRequest
+
+LANGUAGE = 'language'
+CLASSIFICATION = 'classification'
+EXTRACTION = 'extraction'
+ALL_SERVICES = (LANGUAGE, CLASSIFICATION, EXTRACTION)
+# The SDK's request class of each service, for `is_type()` of requests that are not the SDK's.
+REQUEST_CLASSES = {
+    LANGUAGE: LanguageClassificationRequest,
+    CLASSIFICATION: DocumentClassificationRequest,
+    EXTRACTION: FieldExtractionRequest,
+}
+
+COLUMNS = ('Filename', 'Language', 'Document Type', 'Contract?',
+           'Field Name', 'Page', 'Text')
+
+
+@dataclasses.dataclass(slots=True)
+class ExtractionRow:
+    """One extracted span of one field in one file, with the file's metadata."""
+
+    filename: str
+    language: str
+    document_type: str
+    is_contract: str
+    field_name: str
+    page_start: int
+    page_end: int
+    text: str
+
+    def values(self) -> tuple:
+        """The row as written to the spreadsheet, in the order of `COLUMNS`."""
+        return (self.filename, self.language, self.document_type, self.is_contract,
+                self.field_name, self.page_start, self.text)
+
+
+@dataclasses.dataclass(slots=True)
+class _FileResults:
+    name: str
+    language: str = None
+    document_type: str = None
+    is_contract: str = None
+    # (field_name, page_start, page_end, text) of every extracted span
+    extractions: list = dataclasses.field(default_factory=list)
+    finished: set = dataclasses.field(default_factory=set)
+
+
+def _service(request) -> str:
+    if request.is_type(LanguageClassificationRequest):
+        return LANGUAGE
+    if request.is_type(DocumentClassificationRequest):
+        return CLASSIFICATION
+    if request.is_type(FieldExtractionRequest):
+        return EXTRACTION
+    raise ValueError(f'{request.id} is not a language, classification or extraction request.')
+
+
+class ResultAssembler:
+    """Turns finished requests into `ExtractionRow`s, one file at a time."""
+
+    def __init__(self, files, fields, services=ALL_SERVICES):
+        """
+        `files` are the uploaded `File`s (with `name` set) and `fields` the
+        fields returned by `sdk.fields.get()`. A file's rows are released once
+        a request of every service in `services` has finished for it.
+        """
+        self.file_names = {f.id: f.name for f in files}
+        self.field_names = {f.id: f.name for f in fields}
+        self.services = frozenset(services)
+        self._files = {}
+        self.failed = []
+
+    def add(self, request):
+        """
+        Record a finished request; returns the rows of its file if that file is now complete.
+
+        Failed requests are kept in `failed` and leave their columns empty.
+        """
+        file_id = request.file_id
+        results = self._files.get(file_id)
+        if results is None:
+            results = self._files[file_id] = _FileResults(self.file_names[file_id])
+
+        service = _service(request)
+        results.finished.add(service)
+        if not request.is_successful():
+            self.failed.append(request)
+        elif service == LANGUAGE:
+            results.language = request.language
+        elif service == CLASSIFICATION:
+            results.document_type = request.classification
+            results.is_contract = 'Yes' if request.is_contract else 'No'
+        else:
+            field_names = self.field_names
+            extractions = results.extractions
+            for result in request.get_results():
+                field_name = field_names[result.field_id]
+                for span in result.spans:
+                    extractions.append((field_name, span.page_start, span.page_end, result.text))
+
+        if results.finished >= self.services:
+            del self._files[file_id]
+            return self._rows(results)
+        return []
+
+    @staticmethod
+    def _rows(results: _FileResults):
+        return [ExtractionRow(results.name, results.language, results.document_type,
+                              results.is_contract, field_name, page_start, page_end, text)
+                for field_name, page_start, page_end, text in results.extractions]
+
+    def flush(self):
+        """Rows of the files that are still missing some results, e.g. after a failure."""
+        rows = []
+        for results in self._files.values():
+            rows.extend(self._rows(results))
+        self._files.clear()
+        return rows
@@ -0,0 +1,81 @@
+"""
+Retrying SDK calls that failed for reasons worth retrying.
+
+Connection problems, timeouts, throttling (HTTP 429) and server errors (5xx)
+usually go away on their own, so calls failing with those are retried with
+exponential backoff and jitter. Anything else (a bad token, an unknown file)
+is raised straight away.
+"""
+
+import asyncio
+import random
+import time
+
+import requests
+
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def status_code(exc: BaseException):
+    """HTTP status code carried by an exception, if any."""
+    response = getattr(exc, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether the failure of an SDK call is likely to go away when retried."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout,
+                        ConnectionError, TimeoutError)):
+        return True
+    return status_code(exc) in TRANSIENT_STATUS_CODES
+
+
+def retry_after(exc: BaseException):
+    """Seconds the server asked us to wait through `Retry-After`, if it did."""
+    return response_retry_after(getattr(exc, 'response', None))
+
+
+def response_retry_after(response):
+    """`Retry-After` of a response, in seconds, or `None`."""
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _delay(exc: BaseException, attempt: int, backoff: float, max_backoff: float) -> float:
+    delay = retry_after(exc)
+    if delay is None:
+        delay = min(backoff * 2 ** attempt, max_backoff)
+        delay *= 1 + random.random() / 2
+    return delay
+
+
+def call_with_retries(fn, *args, retries: int = 3, backoff: float = 1.0,
+                      max_backoff: float = 30.0, **kwargs):
+    """
+    Call `fn(*args, **kwargs)`, retrying transient failures up to `retries` times.
+
+    The n-th retry waits `backoff * 2 ** n` seconds (or what the server asked
+    for with `Retry-After`), capped at `max_backoff`, with up to 50% jitter.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as exc:
+            if attempt == retries or not is_transient(exc):
+                raise
+            time.sleep(_delay(exc, attempt, backoff, max_backoff))
+
+
+async def call_with_retries_async(fn, *args, retries: int = 3, backoff: float = 1.0,
+                                  max_backoff: float = 30.0, **kwargs):
+    """`call_with_retries` for coroutine functions, waiting with `asyncio.sleep`."""
+    for attempt in range(retries + 1):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as exc:
+            if attempt == retries or not is_transient(exc):
+                raise
+            await asyncio.sleep(_delay(exc, attempt, backoff, max_backoff))
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+from .annotation_pool import locate_annotations
+
+TEXT = 'the quick brown fox jumps over the lazy dog. ' * 40
+
+SCRIPT = '''
+import concurrent.futures
+from zuva_pipeline.annotation_pool import locate_in_pool
+
+text = 'the quick brown fox jumps over the lazy dog. ' * 40
+with concurrent.futures.ProcessPoolExecutor(2) as pool:
+    for _ in range(5):
+        print(locate_in_pool(pool, text, ['lazy dog', 'brown fox', 'purple cat']))
+'''
+
+
+def test_locate_in_pool_leaves_stderr_clean():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, '-c', SCRIPT], capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': path}, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stderr == ''
+    assert result.stdout.splitlines() == ['[(35, 43), (10, 19), None]'] * 5
+
+
+def test_locate_annotations_keeps_negative_examples():
+    annotations, missing = locate_annotations(
+        {'a': TEXT, 'b': TEXT}, [('a', 'lazy dog'), ('b', ''), ('a', 'purple cat')],
+        max_workers=2)
+    assert annotations == {'a': [{'start': 35, 'end': 43}], 'b': []}
+    assert missing == [('a', 'purple cat')]
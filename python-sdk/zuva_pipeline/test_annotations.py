@@ -0,0 +1,22 @@
+import time
+
+from .annotations import AnnotationLocator
+
+SENTENCE = 'This Agreement is governed by the laws of the State of New York. '
+TEXT = SENTENCE * 20000
+
+
+def test_fuzzy_match():
+    locator = AnnotationLocator(SENTENCE * 3, max_l_dist=5)
+    match = locator.locate('governed by the lawz of the Stat of New York')
+    assert (match.start, match.distance) == (18, 2)
+
+
+def test_short_annotation_only_matches_exactly():
+    locator = AnnotationLocator(TEXT, max_l_dist=5)
+    started = time.perf_counter()
+    match = locator.locate('York')
+    assert (match.start, match.end, match.distance) == (59, 63, 0)
+    assert locator.locate('Yark') is None
+    # No edit distance over the whole 1.3M character text.
+    assert time.perf_counter() - started < 1
@@ -0,0 +1,64 @@
+import asyncio
+
+from .async_client import AsyncZDAISDK, as_completed
+from .fake_server import FakeZuvaServer
+from .results import ResultAssembler
+
+FIELD_NAMES = ['Title', 'Parties']
+POLLING = dict(initial_delay=0.01, max_delay=0.05)
+
+
+async def assemble(url, contents):
+    async with AsyncZDAISDK(url=url, token='fake') as sdk:
+        files = []
+        for index, content in enumerate(contents):
+            file, _ = await sdk.file.create(content=content)
+            file.name = f'document-{index}.txt'
+            files.append(file)
+        file_ids = [file.id for file in files]
+        fields, _ = await sdk.fields.get()
+        field_ids = [field.id for field in fields if field.name in FIELD_NAMES]
+
+        languages, _ = await sdk.language.create(file_ids=file_ids)
+        classifications, _ = await sdk.classification.create(file_ids=file_ids)
+        extractions, _ = await sdk.extraction.create(file_ids=file_ids, field_ids=field_ids)
+
+        assembler = ResultAssembler(files, fields)
+        rows = []
+        async for request in as_completed(classifications + languages + extractions, **POLLING):
+            for row in assembler.add(request):
+                rows.append(row)
+        return rows, assembler, extractions
+
+
+def run(processing_time):
+    contents = [f'Agreement {i} between the parties, governed by law.'.encode()
+                for i in range(3)]
+    with FakeZuvaServer(processing_time=processing_time) as server:
+        return asyncio.run(assemble(server.url, contents))
+
+
+def test_documented_loop_assembles_rows():
+    rows, assembler, extractions = run(processing_time=0.05)
+    assert rows
+    assert not assembler.failed and not assembler.flush()
+    assert {row.filename for row in rows} <= {f'document-{i}.txt' for i in range(3)}
+    assert {row.field_name for row in rows} <= set(FIELD_NAMES)
+    assert all(row.language == 'English' for row in rows)
+    assert len(rows) == sum(len(result.spans) for request in extractions
+                            for result in request.get_results())
+
+
+def test_requests_finished_when_created_have_results():
+    rows, assembler, _ = run(processing_time=0.0)
+    assert rows and not assembler.failed
+
+
+def test_response_headers_are_case_insensitive():
+    async def fields(url):
+        async with AsyncZDAISDK(url=url, token='fake') as sdk:
+            return await sdk.fields.get()
+
+    with FakeZuvaServer() as server:
+        _, response = asyncio.run(fields(server.url))
+    assert response.headers['content-type'] == response.headers['Content-Type']
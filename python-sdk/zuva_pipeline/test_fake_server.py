@@ -0,0 +1,24 @@
+import requests
+
+from .fake_server import FakeZuvaServer
+
+HEADERS = {'Authorization': 'Bearer fake'}
+
+
+def upload(server, data):
+    response = requests.post(server.url + '/files', data=data, headers=HEADERS)
+    response.raise_for_status()
+    return server.files[response.json()['file_id']]
+
+
+def test_upload_with_content_length():
+    with FakeZuvaServer() as server:
+        assert upload(server, b'hello world') == b'hello world'
+
+
+def test_chunked_upload():
+    parts = [b'hello ', b'chunked ' * 1000, b'world']
+    with FakeZuvaServer() as server:
+        assert upload(server, iter(parts)) == b''.join(parts)
+        # The connection is still usable after the chunked body.
+        assert upload(server, b'next') == b'next'
@@ -0,0 +1,72 @@
+import types
+
+from .result_cache import CachedRequest, CachingSubmitter, ResultCache
+
+
+class FakeRequest:
+    def __init__(self, request_id, file_id, service):
+        self.id = request_id
+        self.file_id = file_id
+        self.service = service
+        self.calls = 0
+
+    def is_successful(self):
+        return True
+
+    def get_text(self):
+        self.calls += 1
+        return f'text of {self.file_id}'
+
+    def get_results(self):
+        self.calls += 1
+        span = types.SimpleNamespace(start=0, end=4, page_start=1, page_end=1)
+        return [types.SimpleNamespace(field_id=field_id, text=self.file_id, spans=[span])
+                for field_id in self.field_ids]
+
+
+class FakeAPI:
+    def __init__(self, service):
+        self.service = service
+        self.created = []
+
+    def create(self, file_ids, field_ids=()):
+        requests = []
+        for file_id in file_ids:
+            request = FakeRequest(f'{self.service}-{len(self.created)}', file_id, self.service)
+            request.field_ids = list(field_ids)
+            self.created.append(request)
+            requests.append(request)
+        return requests, None
+
+    def get_layouts(self, request_id):
+        self.layouts_calls = getattr(self, 'layouts_calls', 0) + 1
+        return types.SimpleNamespace(response=types.SimpleNamespace(content=b'layouts'))
+
+
+def make_submitter():
+    sdk = types.SimpleNamespace(ocr=FakeAPI('ocr'), language=FakeAPI('language'),
+                                classification=FakeAPI('classification'),
+                                extraction=FakeAPI('extraction'))
+    files = [types.SimpleNamespace(id='f1', sha256='a' * 64)]
+    return sdk, CachingSubmitter(sdk, ResultCache(':memory:'), files)
+
+
+def test_completed_extraction_is_answered_from_what_was_downloaded():
+    sdk, submitter = make_submitter()
+    _, [request] = submitter.submit(['title', 'parties'], services=('extraction',))
+    completed = submitter.complete(request)
+    assert isinstance(completed, CachedRequest)
+    assert [result.field_id for result in completed.get_results()] == ['title', 'parties']
+    assert request.calls == 1
+
+    cached, requests = submitter.submit(['title', 'parties'], services=('extraction',))
+    assert not requests and len(cached[0].get_results()) == 2
+
+
+def test_completed_ocr_is_answered_from_what_was_downloaded():
+    sdk, submitter = make_submitter()
+    _, [request] = submitter.submit_ocr(text=True, layouts=True)
+    completed = submitter.complete(request)
+    assert completed.get_text() == 'text of f1'
+    assert completed.get_layouts() == b'layouts'
+    assert request.calls == 1 and sdk.ocr.layouts_calls == 1
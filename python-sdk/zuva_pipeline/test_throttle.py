@@ -0,0 +1,28 @@
+import threading
+import time
+
+import pytest
+
+from .throttle import POLL, Throttle
+
+
+def test_unknown_category_takes_no_slot():
+    throttle = Throttle()
+    with pytest.raises(KeyError):
+        throttle.acquire('unknown')
+    assert throttle.controller.in_flight == 0
+
+
+def test_bucket_wait_does_not_hold_a_slot():
+    throttle = Throttle(rates={POLL: 5}, burst=1)
+    throttle.acquire(POLL)
+    waiting = threading.Thread(target=throttle.acquire, args=(POLL,))
+    waiting.start()
+    time.sleep(0.05)
+    # The second call waits about 0.2 s for a token, without a slot meanwhile.
+    assert throttle.controller.in_flight == 1
+    waiting.join()
+    assert throttle.controller.in_flight == 2
+    throttle.release(POLL)
+    throttle.release(POLL)
+    assert throttle.controller.in_flight == 0
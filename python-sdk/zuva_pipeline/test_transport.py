@@ -0,0 +1,37 @@
+import sys
+import types
+
+import pytest
+import requests
+
+from .transport import PooledSession, patch_sdk_requests, use_session
+
+
+class FakeSDK:
+    def __init__(self, session=None):
+        self.file = types.SimpleNamespace(session=session)
+
+
+def test_use_session_replaces_the_sdk_sessions():
+    sdk = FakeSDK(requests.Session())
+    session = use_session(sdk, PooledSession())
+    assert sdk.file.session is session
+
+
+def test_use_session_refuses_an_sdk_without_session():
+    with pytest.raises(ValueError):
+        use_session(FakeSDK())
+
+
+def test_patch_sdk_requests_is_undone():
+    module = types.ModuleType('fakesdk.api')
+    module.requests = requests
+    sys.modules['fakesdk.api'] = module
+    try:
+        with patch_sdk_requests(PooledSession(), package='fakesdk') as patch:
+            assert module.requests.session is patch.session
+        assert module.requests is requests
+        with pytest.raises(ValueError):
+            patch_sdk_requests(package='notimported')
+    finally:
+        del sys.modules['fakesdk.api']
@@ -0,0 +1,198 @@
+"""
+Staying under the API's rate limits.
+
+Scaling up the tutorials with threads (uploads, creates, polls, downloads)
+eventually runs into throttling: the API answers with HTTP 429 (or 503 when
+overloaded), every thread backs off on its own, and they all come back at
+about the same time. `Throttle` paces the calls of all threads together
+instead:
+
+- each category of call (`UPLOAD`, `CREATE`, `POLL`, `DOWNLOAD`) has its own
+  token bucket of `rates[category]` calls per second;
+- `AIMDController` limits the number of calls in flight and paces them at
+  an overall rate. Each successful call raises both a little (additive
+  increase); a 429 or 503 cuts them by 30% (multiplicative decrease), and a
+  `Retry-After` holds back every call until that time has passed. The rate
+  matters as much as the concurrency: short calls on a handful of
+  connections can easily exceed a limit of calls per second.
+
+So throughput settles just below the server's limit, instead of swinging
+between overload and stalls. A `PooledSession` applies it to every call of
+an SDK, working out the category from the method and path:
+
+    throttle = Throttle(rates={UPLOAD: 5, CREATE: 5, POLL: 20, DOWNLOAD: 10})
+    use_session(sdk, PooledSession(throttle=throttle))
+
+or it can wrap individual calls: `throttle.call(POLL, request.update)`.
+Throttled calls still fail; retry them with `call_with_retries`.
+"""
+
+import collections
+import re
+import threading
+import time
+
+from .retry import retry_after, status_code
+
+UPLOAD = 'upload'
+CREATE = 'create'
+POLL = 'poll'
+DOWNLOAD = 'download'
+
+# Calls per second of each category.
+DEFAULT_RATES = {UPLOAD: 10.0, CREATE: 10.0, POLL: 50.0, DOWNLOAD: 20.0}
+THROTTLED_STATUS_CODES = frozenset({429, 503})
+
+_DOWNLOAD_PATH = re.compile(r'/(text|layouts|results/text|accuracy|metadata|validation-details'
+                            r'|fields)$')
+
+
+def categorize(method: str, path: str) -> str:
+    """The category of an API call, from its HTTP method and URL path."""
+    method = method.upper()
+    path = path.split('?', 1)[0].rstrip('/')
+    if method == 'POST' and path.endswith('/files'):
+        return UPLOAD
+    if method != 'GET':
+        return CREATE
+    if _DOWNLOAD_PATH.search(path):
+        return DOWNLOAD
+    return POLL
+
+
+class TokenBucket:
+    """`rate` calls per second on average, in bursts of up to `burst` calls."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class AIMDController:
+    """Limits the calls in flight and their rate, growing both additively and cutting them multiplicatively."""
+
+    def __init__(self, initial: float = 8, minimum: float = 1, maximum: float = 64,
+                 initial_rate: float = 20.0, minimum_rate: float = 1.0,
+                 maximum_rate: float = 1000.0, increase: float = 1.0, decrease: float = 0.7,
+                 cooldown: float = 1.0):
+        """
+        `limit` calls may be in flight, sent at most `rate` per second. Every
+        successful call adds `increase / limit` to the limit and
+        `increase / rate` to the rate (so the rate grows by about `increase`
+        calls per second every second). A throttled call multiplies both by
+        `decrease`, at most once every `cooldown` seconds: the calls already
+        in flight when the server started throttling are likely to be
+        throttled too.
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.rate = float(initial_rate)
+        self.minimum_rate = minimum_rate
+        self.maximum_rate = maximum_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._next = 0.0
+        self._decreased = float('-inf')
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot, for the call's turn at `rate`, and for any `Retry-After` to pass."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                pause = self.paused_until - now
+                if pause <= 0 and self.in_flight < max(int(self.limit), 1):
+                    break
+                self._condition.wait(pause if pause > 0 else None)
+            self.in_flight += 1
+            # Calls are spaced 1 / rate apart rather than sent in bursts.
+            start = max(now, self._next)
+            self._next = start + 1 / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, throttled: bool = False, retry_after: float = None, failed: bool = False):
+        """
+        Free a slot, adjusting the limits to how the call went. Calls that
+        `failed` for other reasons than throttling leave them as they are.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._decreased >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.rate = max(self.minimum_rate, self.rate * self.decrease)
+                    self._decreased = now
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            elif not failed:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+                self.rate = min(self.maximum_rate, self.rate + self.increase / self.rate)
+            self._condition.notify_all()
+
+
+class Throttle:
+    """Per-category token buckets and an `AIMDController`, shared by all calls."""
+
+    def __init__(self, rates: dict = None, burst: float = None,
+                 controller: AIMDController = None):
+        """
+        `rates` overrides some or all of `DEFAULT_RATES`; `burst` is the
+        bucket size of every category (by default one second of calls).
+        """
+        rates = {**DEFAULT_RATES, **(rates or {})}
+        self.buckets = {category: TokenBucket(rate, burst) for category, rate in rates.items()}
+        self.controller = controller or AIMDController()
+        # Calls made and calls throttled, per category.
+        self.calls = collections.Counter()
+        self.throttled = collections.Counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, category: str):
+        """Block until a call of `category` may be sent."""
+        # The token comes first: a call waiting for its category's rate does
+        # not hold one of the controller's slots, and an unknown category
+        # raises `KeyError` before one is taken.
+        wait = self.buckets[category].reserve()
+        if wait > 0:
+            time.sleep(wait)
+        self.controller.acquire()
+
+    def release(self, category: str, status: int = None, retry_after_seconds: float = None,
+                failed: bool = False):
+        """Report how a call acquired with `acquire` went: its HTTP status, if any."""
+        throttled = status in THROTTLED_STATUS_CODES
+        with self._lock:
+            self.calls[category] += 1
+            if throttled:
+                self.throttled[category] += 1
+        self.controller.release(throttled, retry_after_seconds,
+                                failed=failed or (status or 0) >= 400)
+
+    def call(self, category: str, fn, *args, **kwargs):
+        """Call `fn(*args, **kwargs)` as a call of `category`."""
+        self.acquire(category)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            self.release(category, status_code(exc), retry_after(exc), failed=True)
+            raise
+        self.release(category)
+        return result
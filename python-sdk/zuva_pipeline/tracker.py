@@ -0,0 +1,149 @@
+"""
+Waiting for many Zuva requests to finish.
+
+The tutorials wait for their requests like this:
+
+    while len(requests) > 0:
+        for request in requests:
+            request.update()
+            if request.is_finished():
+                requests.remove(request)
+                ...
+        time.sleep(2)
+
+which calls `update()` on every outstanding request every tick, one after the
+other. `RequestTracker` owns the outstanding requests (OCR, language,
+classification, extraction or field training: anything with `update()` and
+`is_finished()`) and instead:
+
+- polls each request on its own schedule, backing off exponentially while it
+  is still running, so a long extraction is polled a handful of times rather
+  than every two seconds;
+- runs the `update()` calls on a small thread pool, retrying transient errors;
+- hands finished requests back as they finish, through `as_completed()` and/or
+  per-request callbacks.
+
+    tracker = RequestTracker(max_workers=8)
+    tracker.add_all(classifications + languages + extractions)
+    for request in tracker.as_completed():
+        if not request.is_successful():
+            print(f'{request.id} failed.')
+"""
+
+import concurrent.futures
+import heapq
+import itertools
+import threading
+import time
+
+from .retry import call_with_retries
+
+
+class _Tracked:
+    __slots__ = ('request', 'callback', 'delay', 'due')
+
+    def __init__(self, request, callback, delay, due):
+        self.request = request
+        self.callback = callback
+        self.delay = delay
+        self.due = due
+
+
+class RequestTracker:
+    """Polls outstanding requests with per-request backoff on a bounded thread pool."""
+
+    def __init__(self, max_workers: int = 8, initial_delay: float = 2.0,
+                 max_delay: float = 10.0, multiplier: float = 1.5,
+                 on_complete=None, retries: int = 3):
+        """
+        `initial_delay` is the wait before the first poll of a request; each
+        poll that finds it still running multiplies its delay by `multiplier`,
+        up to `max_delay`. `on_complete(request)` is called for every request
+        that finishes, successfully or not.
+        """
+        self.max_workers = max_workers
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.on_complete = on_complete
+        self.retries = retries
+        # Number of update() calls made, to compare with polling every tick.
+        self.api_calls = 0
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, request, callback=None, delay: float = None):
+        """Track `request`; `callback(request)` is called once it has finished."""
+        delay = self.initial_delay if delay is None else delay
+        tracked = _Tracked(request, callback, delay, time.monotonic() + delay)
+        with self._lock:
+            heapq.heappush(self._queue, (tracked.due, next(self._sequence), tracked))
+
+    def add_all(self, requests, callback=None):
+        for request in requests:
+            self.add(request, callback)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def _finish(self, tracked):
+        if tracked.callback is not None:
+            tracked.callback(tracked.request)
+        if self.on_complete is not None:
+            self.on_complete(tracked.request)
+
+    def as_completed(self):
+        """
+        Yield every tracked request as soon as it has finished.
+
+        Requests added while iterating (e.g. from a callback) are picked up
+        too. `update()` errors that are still failing after the retries are
+        raised.
+        """
+        in_flight = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                now = time.monotonic()
+                with self._lock:
+                    while (self._queue and self._queue[0][0] <= now
+                           and len(in_flight) < self.max_workers):
+                        _, _, tracked = heapq.heappop(self._queue)
+                        future = pool.submit(call_with_retries, tracked.request.update,
+                                             retries=self.retries)
+                        in_flight[future] = tracked
+                    next_due = self._queue[0][0] if self._queue else None
+
+                if not in_flight and next_due is None:
+                    return
+
+                # Wake up for whichever comes first: a poll finishing, or the
+                # next request becoming due (if a worker is free to poll it).
+                timeout = None
+                if next_due is not None and len(in_flight) < self.max_workers:
+                    timeout = max(next_due - now, 0)
+                if not in_flight:
+                    time.sleep(timeout)
+                    continue
+                done, _ = concurrent.futures.wait(
+                    in_flight, timeout=timeout,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done:
+                    tracked = in_flight.pop(future)
+                    self.api_calls += 1
+                    future.result()
+                    if tracked.request.is_finished():
+                        self._finish(tracked)
+                        yield tracked.request
+                    else:
+                        tracked.delay = min(tracked.delay * self.multiplier, self.max_delay)
+                        tracked.due = time.monotonic() + tracked.delay
+                        with self._lock:
+                            heapq.heappush(self._queue,
+                                           (tracked.due, next(self._sequence), tracked))
+
+    def wait(self):
+        """Block until every tracked request has finished; returns them in completion order."""
+        return list(self.as_completed())
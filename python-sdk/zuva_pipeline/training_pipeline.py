@@ -0,0 +1,265 @@
+"""
+Preparing training data as a pipeline instead of in stages.
+
+`training.py` works in strict stages: it uploads every file, creates the
+OCR requests, waits until all of them have finished, and only then
+downloads the text of each document and locates its annotations, one
+document at a time. A single slow OCR request holds back all of the
+matching work. `TrainingPipeline` lets every document move on as soon as
+its own previous step is done:
+
+    upload ──> create OCR request ──> wait for OCR ──> get text ──> locate annotations
+          queue                  queue             queue
+
+Each arrow is a bounded queue, so a fast stage cannot get far ahead of a
+slow one. Uploads run on a thread pool; OCR requests are created in one call
+for whatever uploads are waiting; finished OCR requests are picked up by
+`text_workers` threads that download the text and hand it to a process pool
+for the annotation matching, through shared memory (`locate_in_pool`).
+Negative examples, with no annotations to locate, skip the text download.
+Training starts once every annotation has been located, so the whole run
+takes about as long as the slowest document:
+
+    pipeline = TrainingPipeline(sdk, ledger=UploadLedger(sdk), max_l_dist=L_DIST)
+    examples = [(os.path.join(upload_files_directory, example['file_name']),
+                 example['annotation']) for example in training_examples]
+    result = pipeline.run(examples)
+    training_request = pipeline.train(field_id, result)
+"""
+
+import concurrent.futures
+import dataclasses
+import json
+import os
+import queue
+import threading
+import time
+
+from .annotation_pool import locate_in_pool
+from .planner import MAX_FILES_PER_CALL
+from .retry import call_with_retries
+from .tracker import RequestTracker
+from .uploads import iter_uploads
+
+DEFAULT_QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+class _Aborted(Exception):
+    """Raised in a stage when another stage has failed."""
+
+
+@dataclasses.dataclass(slots=True)
+class PipelineResult:
+    """What `TrainingPipeline.run` found for every document."""
+
+    # {file_id: [{'start': ..., 'end': ...}]}, like `annotations_dict` in training.py.
+    annotations_dict: dict = dataclasses.field(default_factory=dict)
+    # path -> file id of every uploaded document.
+    file_ids: dict = dataclasses.field(default_factory=dict)
+    # (path, annotation) pairs not found in the OCR text.
+    missing: list = dataclasses.field(default_factory=list)
+    # Paths whose OCR request failed.
+    failed: list = dataclasses.field(default_factory=list)
+
+    def annotations(self) -> list:
+        """The `annotations` structure of the training request."""
+        return [{'file_id': file_id, 'locations': locations}
+                for file_id, locations in self.annotations_dict.items()]
+
+
+class TrainingPipeline:
+    """Uploads, OCRs and annotates training documents, each document as fast as it can go."""
+
+    def __init__(self, sdk, ledger=None, max_l_dist: int = 5, upload_workers: int = 8,
+                 text_workers: int = 4, match_workers: int = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, tracker: RequestTracker = None,
+                 retries: int = 3):
+        """
+        `ledger` is an optional `UploadLedger`. `match_workers` is the size of
+        the annotation matching process pool (all cores by default), and
+        `queue_size` the capacity of the queues between stages.
+        """
+        self.sdk = sdk
+        self.ledger = ledger
+        self.max_l_dist = max_l_dist
+        self.upload_workers = upload_workers
+        self.text_workers = text_workers
+        self.match_workers = match_workers or os.cpu_count()
+        self.queue_size = queue_size
+        self.tracker = tracker or RequestTracker()
+        self.retries = retries
+        self._error = None
+        # OCR request id -> path
+        self._paths = {}
+
+    def _put(self, q, item):
+        while True:
+            if self._error is not None:
+                raise _Aborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, q):
+        while True:
+            if self._error is not None:
+                raise _Aborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def _close(self, q, readers=1):
+        """Tell the `readers` of `q` that nothing more is coming."""
+        try:
+            for _ in range(readers):
+                self._put(q, _DONE)
+        except _Aborted:
+            pass
+
+    def _stage(self, target, *args):
+        def run():
+            try:
+                target(*args)
+            except _Aborted:
+                pass
+            except BaseException as error:
+                if self._error is None:
+                    self._error = error
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _upload(self, paths, uploaded, result):
+        try:
+            for path, file in iter_uploads(self.sdk, paths, max_workers=self.upload_workers,
+                                           retries=self.retries, ledger=self.ledger):
+                result.file_ids[path] = file.id
+                self._put(uploaded, (path, file.id))
+        finally:
+            self._close(uploaded)
+
+    def _create_ocr(self, uploaded, submitted):
+        try:
+            done = False
+            while not done:
+                batch = [self._get(uploaded)]
+                # Send everything that is already waiting in one call.
+                while len(batch) < MAX_FILES_PER_CALL:
+                    try:
+                        batch.append(uploaded.get_nowait())
+                    except queue.Empty:
+                        break
+                if _DONE in batch:
+                    batch.remove(_DONE)
+                    done = True
+                if batch:
+                    requests, _ = call_with_retries(self.sdk.ocr.create,
+                                                    file_ids=[file_id for _, file_id in batch],
+                                                    retries=self.retries)
+                    for (path, _), request in zip(batch, requests):
+                        self._paths[request.id] = path
+                        self.tracker.add(request)
+        finally:
+            submitted.set()
+
+    def _wait_ocr(self, submitted, finished):
+        try:
+            while True:
+                for request in self.tracker.as_completed():
+                    self._put(finished, request)
+                if submitted.is_set() and not len(self.tracker):
+                    break
+                if self._error is not None:
+                    raise _Aborted()
+                time.sleep(0.05)
+        finally:
+            self._close(finished, self.text_workers)
+
+    def _annotate(self, finished, by_path, match_pool, result, lock):
+        while True:
+            request = self._get(finished)
+            if request is _DONE:
+                return
+            path = self._paths[request.id]
+            if not request.is_successful():
+                with lock:
+                    result.failed.append(path)
+                continue
+            annotations = by_path[path]
+            if not annotations:
+                # A negative example: nothing to locate in its text.
+                continue
+            text = call_with_retries(request.get_text, retries=self.retries)
+            matches = locate_in_pool(match_pool, text, annotations, self.max_l_dist)
+            del text
+            file_id = result.file_ids[path]
+            with lock:
+                for annotation, match in zip(annotations, matches):
+                    if match is None:
+                        result.missing.append((path, annotation))
+                    else:
+                        result.annotations_dict.setdefault(file_id, []).append(
+                            {'start': match[0], 'end': match[1]})
+
+    def run(self, examples) -> PipelineResult:
+        """
+        Upload, OCR and annotate `(path, annotation)` pairs.
+
+        A path may appear several times (one annotation each); a path with
+        only empty annotations is kept as a negative example.
+        """
+        by_path = {}
+        for path, annotation in examples:
+            by_path.setdefault(path, [])
+            if annotation:
+                by_path[path].append(annotation)
+
+        self._error = None
+        self._paths = {}
+        result = PipelineResult()
+        lock = threading.Lock()
+        uploaded = queue.Queue(self.queue_size)
+        finished = queue.Queue(self.queue_size)
+        submitted = threading.Event()
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.match_workers) as match_pool:
+            # Start the worker processes before any of the stage threads.
+            match_pool.submit(int).result()
+            stages = [
+                self._stage(self._upload, list(by_path), uploaded, result),
+                self._stage(self._create_ocr, uploaded, submitted),
+                self._stage(self._wait_ocr, submitted, finished),
+            ]
+            stages += [self._stage(self._annotate, finished, by_path, match_pool, result, lock)
+                       for _ in range(self.text_workers)]
+            for stage in stages:
+                stage.join()
+
+        if self._error is not None:
+            raise self._error
+
+        # Files are in annotations_dict in the order of `examples`.
+        annotations_dict = {}
+        failed = set(result.failed)
+        for path in by_path:
+            file_id = result.file_ids.get(path)
+            # Files with the same content share a file id, and their locations.
+            if file_id is None or path in failed or file_id in annotations_dict:
+                continue
+            locations = result.annotations_dict.get(file_id, [])
+            # A document whose annotations were all missed is not a negative example.
+            if locations or not by_path[path]:
+                annotations_dict.setdefault(file_id, []).extend(locations)
+        result.annotations_dict = annotations_dict
+        return result
+
+    def train(self, field_id: str, result: PipelineResult):
+        """Create the training request of `field_id` with the annotations of `result`."""
+        request, _ = self.sdk.fields.train(field_id=field_id,
+                                           annotations=json.dumps(result.annotations()))
+        return request
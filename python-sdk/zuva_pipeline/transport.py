@@ -0,0 +1,417 @@
+"""
+A pooled, keep-alive HTTP transport for the SDK.
+
+Each call of the SDK goes through `requests`, and nothing makes sure that the
+thousands of small `update()` calls of a large run reuse their connections,
+or that large upload bodies are compressed. `PooledSession` is a
+`requests.Session` with a connection pool of a known size: every call reuses
+an idle connection to the API when there is one, at most `pool_size`
+connections are kept open per host, and threads beyond that wait for a free
+connection instead of opening (and throwing away) extra ones. Request bodies
+of at least `min_compress_size` bytes can be sent gzip-compressed, and gzip
+responses are asked for and decompressed as usual. `use_session` routes the
+calls of an SDK through it:
+
+    session = PooledSession(pool_size=16, compress_requests=True)
+    sdk = ZDAISDK(url=url, token=token)
+    use_session(sdk, session)
+    ...
+    print(session.metrics)
+
+An SDK that calls the `requests` functions directly holds no session, and
+`use_session` refuses it; `patch_sdk_requests` reroutes those calls instead,
+for every SDK in the process until it is undone.
+
+`session.metrics` counts the calls, the connections opened for them and the
+bytes sent and received (as they went over the wire, compressed or not).
+
+With `http2=True` the calls go through `httpx` instead (`pip install
+httpx[http2]`), which multiplexes concurrent calls over a single connection
+to servers that negotiate HTTP/2. Plain `http://` URLs, such as
+`FakeZuvaServer`'s, are always HTTP/1.1.
+"""
+
+import dataclasses
+import gzip
+import sys
+import threading
+import time
+import types
+import urllib.parse
+
+import requests
+from requests.adapters import DEFAULT_POOLSIZE, BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, super_len
+from urllib3 import connectionpool
+
+from .retry import response_retry_after
+from .throttle import Throttle, categorize
+
+DEFAULT_POOL_SIZE = 32
+# Smaller bodies are not worth compressing.
+MIN_COMPRESS_SIZE = 1024
+# Fast compression: text and JSON still shrink about four times.
+COMPRESS_LEVEL = 1
+
+
+@dataclasses.dataclass(slots=True)
+class TransportMetrics:
+    """Counters of a `PooledSession`, safe to update from many threads."""
+
+    requests: int = 0
+    connections: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    compressed_requests: int = 0
+    compressed_responses: int = 0
+    seconds: float = 0.0
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, init=False,
+                                              repr=False, compare=False)
+
+    @property
+    def reused(self) -> int:
+        """Calls that were sent on a connection opened for an earlier call."""
+        return max(self.requests - self.connections, 0)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> 'TransportMetrics':
+        with self._lock:
+            return dataclasses.replace(self)
+
+    def reset(self):
+        with self._lock:
+            for field in dataclasses.fields(self):
+                if field.name != '_lock':
+                    setattr(self, field.name, field.default)
+
+
+def _compress(request, metrics: TransportMetrics, min_size: int):
+    """Gzip the body of a prepared request in place when it is large enough."""
+    body = request.body
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if (not isinstance(body, bytes) or len(body) < min_size
+            or 'Content-Encoding' in request.headers):
+        return
+    request.body = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+    request.headers['Content-Encoding'] = 'gzip'
+    request.headers['Content-Length'] = str(len(request.body))
+    metrics.add(compressed_requests=1)
+
+
+def _body_size(body) -> int:
+    """Size of a request body; taken before sending, which consumes streams."""
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    if body is None:
+        return 0
+    try:
+        # bytes, and streams such as `FileStream` that know what is left to read.
+        return len(body)
+    except TypeError:
+        return super_len(body)
+
+
+class _CountingReader:
+    """Socket file of a response that adds the bytes read from it to `metrics`."""
+
+    def __init__(self, fp, metrics: TransportMetrics):
+        self._fp = fp
+        self._metrics = metrics
+
+    def _counted(self, data: bytes) -> bytes:
+        self._metrics.add(bytes_received=len(data))
+        return data
+
+    def read(self, *args):
+        return self._counted(self._fp.read(*args))
+
+    def read1(self, *args):
+        return self._counted(self._fp.read1(*args))
+
+    def readline(self, *args):
+        return self._counted(self._fp.readline(*args))
+
+    def readinto(self, buffer):
+        count = self._fp.readinto(buffer)
+        self._metrics.add(bytes_received=count or 0)
+        return count
+
+    def __getattr__(self, name):
+        return getattr(self._fp, name)
+
+
+def _count_received(response, metrics: TransportMetrics):
+    """
+    Count the body of `response` as it comes over the wire, whenever it is
+    read: compressed, chunked or streamed, and only as far as it is read.
+    """
+    original = getattr(response.raw, '_fp', None)
+    if getattr(original, 'fp', None) is not None:
+        original.fp = _CountingReader(original.fp, metrics)
+
+
+class PooledAdapter(HTTPAdapter):
+    """`HTTPAdapter` that optionally compresses request bodies and fills in `TransportMetrics`."""
+
+    def __init__(self, metrics: TransportMetrics, pool_size: int = DEFAULT_POOL_SIZE,
+                 pool_connections: int = DEFAULT_POOLSIZE, compress_requests: bool = False,
+                 min_compress_size: int = MIN_COMPRESS_SIZE, max_retries: int = 0):
+        """
+        `pool_size` is the number of connections kept open per host, and
+        `pool_connections` the number of hosts to keep connections to.
+        """
+        self.metrics = metrics
+        self.compress_requests = compress_requests
+        self.min_compress_size = min_compress_size
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_size,
+                         max_retries=max_retries, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        metrics = self.metrics
+
+        def counting(pool_class):
+            class CountingPool(pool_class):
+                def _new_conn(self):
+                    metrics.add(connections=1)
+                    return super()._new_conn()
+            return CountingPool
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': counting(connectionpool.HTTPConnectionPool),
+            'https': counting(connectionpool.HTTPSConnectionPool),
+        }
+
+    def send(self, request, stream=False, **kwargs):
+        if self.compress_requests:
+            _compress(request, self.metrics, self.min_compress_size)
+        sent = _body_size(request.body)
+        started = time.perf_counter()
+        response = super().send(request, stream=stream, **kwargs)
+        _count_received(response, self.metrics)
+        if not stream:
+            response.content
+        self.metrics.add(requests=1, bytes_sent=sent,
+                         compressed_responses=int('Content-Encoding' in response.headers),
+                         seconds=time.perf_counter() - started)
+        return response
+
+
+class HTTP2Adapter(BaseAdapter):
+    """Sends the calls of a `requests.Session` through an HTTP/2 `httpx.Client`."""
+
+    def __init__(self, metrics: TransportMetrics, pool_size: int = DEFAULT_POOL_SIZE,
+                 compress_requests: bool = False, min_compress_size: int = MIN_COMPRESS_SIZE):
+        super().__init__()
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('HTTP/2 requires httpx: pip install httpx[http2]') from None
+        self._httpx = httpx
+        self.metrics = metrics
+        self.compress_requests = compress_requests
+        self.min_compress_size = min_compress_size
+        self._client = httpx.Client(http2=True, limits=httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size))
+
+    def _trace(self, event: str, info: dict):
+        if event == 'connection.connect_tcp.complete':
+            self.metrics.add(connections=1)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        httpx = self._httpx
+        if self.compress_requests:
+            _compress(request, self.metrics, self.min_compress_size)
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        sent = _body_size(request.body)
+        started = time.perf_counter()
+        try:
+            response = self._client.request(request.method, request.url,
+                                            headers=dict(request.headers), content=request.body,
+                                            timeout=timeout, extensions={'trace': self._trace})
+        except httpx.TimeoutException as exc:
+            raise requests.Timeout(exc, request=request) from exc
+        except httpx.TransportError as exc:
+            raise requests.ConnectionError(exc, request=request) from exc
+
+        built = requests.Response()
+        built.status_code = response.status_code
+        built.headers = CaseInsensitiveDict(response.headers.items())
+        built.encoding = get_encoding_from_headers(built.headers)
+        built.reason = response.reason_phrase
+        built.url = request.url
+        built.request = request
+        built.connection = self
+        built.elapsed = response.elapsed
+        built._content = response.content
+        built._content_consumed = True
+        self.metrics.add(requests=1, bytes_sent=sent,
+                         bytes_received=response.num_bytes_downloaded,
+                         compressed_responses=int('Content-Encoding' in response.headers),
+                         seconds=time.perf_counter() - started)
+        return built
+
+    def close(self):
+        self._client.close()
+
+
+class PooledSession(requests.Session):
+    """`requests.Session` with a bounded keep-alive connection pool and `TransportMetrics`."""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, http2: bool = False,
+                 compress_requests: bool = False, min_compress_size: int = MIN_COMPRESS_SIZE,
+                 max_retries: int = 0, throttle: Throttle = None):
+        """
+        `pool_size` is the number of connections kept open to the API, which
+        should be at least the number of threads making calls at the same
+        time. `compress_requests` gzips request bodies of at least
+        `min_compress_size` bytes; the server must accept `Content-Encoding: gzip`.
+        Every call waits for `throttle`, if given.
+        """
+        super().__init__()
+        self.metrics = TransportMetrics()
+        self.throttle = throttle
+        if http2:
+            adapter = HTTP2Adapter(self.metrics, pool_size=pool_size,
+                                   compress_requests=compress_requests,
+                                   min_compress_size=min_compress_size)
+        else:
+            adapter = PooledAdapter(self.metrics, pool_size=pool_size,
+                                    compress_requests=compress_requests,
+                                    min_compress_size=min_compress_size, max_retries=max_retries)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self.headers['Accept-Encoding'] = 'gzip, deflate'
+        self.headers['Connection'] = 'keep-alive'
+
+    def send(self, request, **kwargs):
+        if self.throttle is None:
+            return super().send(request, **kwargs)
+        category = categorize(request.method, urllib.parse.urlsplit(request.url).path)
+        self.throttle.acquire(category)
+        response = None
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            if response is None:
+                self.throttle.release(category, failed=True)
+            else:
+                self.throttle.release(category, response.status_code,
+                                      response_retry_after(response))
+        return response
+
+
+class _SessionModule(types.ModuleType):
+    """Stands in for the `requests` module, sending its calls through a session."""
+
+    def __init__(self, session: requests.Session):
+        super().__init__('requests')
+        self.session = session
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        return self.session.get(url, params=params, **kwargs)
+
+    def options(self, url, **kwargs):
+        return self.session.options(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.session.head(url, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.session.post(url, data=data, json=json, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.session.put(url, data=data, **kwargs)
+
+    def patch(self, url, data=None, **kwargs):
+        return self.session.patch(url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.session.delete(url, **kwargs)
+
+    def __getattr__(self, name):
+        # Exceptions, status codes and everything else come from `requests`.
+        return getattr(requests, name)
+
+
+def use_session(sdk, session: requests.Session = None) -> requests.Session:
+    """
+    Send the HTTP calls of `sdk` through `session` (a new `PooledSession` by default).
+
+    The sessions held by the SDK and its API objects are replaced; nothing
+    outside `sdk` is changed. Raises `ValueError` if it holds none, e.g. when
+    it calls the `requests` functions directly: `patch_sdk_requests` covers
+    that case, for every SDK in the process.
+    """
+    session = session or PooledSession()
+    replaced = 0
+    objects = [sdk] + [value for value in vars(sdk).values() if hasattr(value, '__dict__')]
+    for obj in objects:
+        for name, value in list(vars(obj).items()):
+            if isinstance(value, requests.Session):
+                setattr(obj, name, session)
+                replaced += 1
+    if not replaced:
+        raise ValueError(f'{type(sdk).__name__} holds no requests.Session to replace; '
+                         f'patch_sdk_requests() routes the calls of every SDK instead')
+    return session
+
+
+class SDKRequestsPatch:
+    """What `patch_sdk_requests` replaced, to put it back with `undo()` or as a context manager."""
+
+    def __init__(self, session: requests.Session, replaced: dict):
+        self.session = session
+        # {module: the `requests` it had before}
+        self.replaced = replaced
+
+    def undo(self):
+        for module, original in self.replaced.items():
+            if isinstance(getattr(module, 'requests', None), _SessionModule):
+                module.requests = original
+        self.replaced = {}
+
+    def __enter__(self) -> 'SDKRequestsPatch':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.undo()
+
+
+def patch_sdk_requests(session: requests.Session = None,
+                       package: str = 'zdai') -> SDKRequestsPatch:
+    """
+    Send the calls that the modules of `package` make with the `requests`
+    functions through `session` (a new `PooledSession` by default).
+
+    This changes the `requests` of those modules for the whole process, and
+    so for every SDK in it, until the returned patch is undone:
+
+        with patch_sdk_requests(PooledSession(pool_size=16)) as patch:
+            ...
+        print(patch.session.metrics)
+
+    Raises `ValueError` if none of the modules of `package` use `requests`.
+    """
+    session = session or PooledSession()
+    replaced = {}
+    for name, module in list(sys.modules.items()):
+        if name != package and not name.startswith(package + '.'):
+            continue
+        current = getattr(module, 'requests', None)
+        if current is requests or isinstance(current, _SessionModule):
+            replaced[module] = current
+            module.requests = _SessionModule(session)
+    if not replaced:
+        raise ValueError(f'None of the imported modules of {package!r} use requests')
+    return SDKRequestsPatch(session, replaced)
@@ -0,0 +1,92 @@
+"""
+Uploading many files to Zuva concurrently.
+
+The tutorials upload their documents one after the other:
+
+    for doc in docs:
+        with open(doc, 'rb') as f:
+            file, _ = sdk.file.create(content=f.read())
+
+which is fine for a handful of files, but with thousands of them the script
+spends nearly all of its time waiting on the network. `upload_files` runs the
+same `sdk.file.create` calls on a bounded thread pool instead. A file is only
+read when a worker starts uploading it, so no more than `max_workers` files
+are held in memory at any time, and transient failures are retried. Given an
+`UploadLedger`, files already uploaded (and not expired) are not sent again.
+
+    zuva_files = upload_files(sdk, docs, max_workers=8)
+    for file in zuva_files:
+        print(file.name, file.id, file.expiration)
+"""
+
+import concurrent.futures
+import functools
+import os
+
+from .file_stream import upload_stream
+from .retry import call_with_retries
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def upload_file(sdk, path: str, retries: int = 3, stream: bool = False):
+    """
+    Upload a single file, returning the SDK's `File` with `name` set to the file's basename.
+
+    With `stream`, the file is sent from disk in blocks (see `file_stream.py`)
+    instead of being read into memory first.
+    """
+    if stream:
+        file, _ = upload_stream(sdk, path, retries=retries)
+    else:
+        with open(path, 'rb') as f:
+            content = f.read()
+        file, _ = call_with_retries(sdk.file.create, content=content, retries=retries)
+    file.name = os.path.basename(path)
+    return file
+
+
+def iter_uploads(sdk, paths, max_workers: int = DEFAULT_MAX_WORKERS, retries: int = 3,
+                 ledger=None, stream: bool = False):
+    """
+    Upload `paths` concurrently, yielding `(path, file)` as each upload finishes.
+
+    At most `max_workers` uploads (and file reads) are in flight at once; the
+    next path is only submitted when one of them completes, so `paths` may be
+    a lazy iterable of any length. With a `ledger`, uploads go through
+    `ledger.upload` and yield `LedgerFile`s. With `stream`, files are sent
+    from disk in blocks rather than read into memory.
+    """
+    upload = functools.partial(upload_file, sdk, stream=stream) if ledger is None else \
+        functools.partial(ledger.upload, stream=stream)
+    paths = iter(paths)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+        for path in paths:
+            pending[pool.submit(upload, path, retries)] = path
+            if len(pending) >= max_workers:
+                break
+
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                yield path, future.result()
+                next_path = next(paths, None)
+                if next_path is not None:
+                    pending[pool.submit(upload, next_path, retries)] = next_path
+
+
+def upload_files(sdk, paths, max_workers: int = DEFAULT_MAX_WORKERS, retries: int = 3,
+                 ledger=None, stream: bool = False):
+    """
+    Upload `paths` concurrently and return their `File`s in the order of `paths`.
+
+    Each `File` has its `name` set to the basename of its path, exactly like
+    the `zuva_files` list built by `spreadsheet.py`.
+    """
+    paths = list(paths)
+    files = dict(iter_uploads(sdk, paths, max_workers=max_workers, retries=retries,
+                              ledger=ledger, stream=stream))
+    return [files[path] for path in paths]